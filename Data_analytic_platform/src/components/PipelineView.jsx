@@ -178,8 +178,7 @@ export default function PipelineView() {
         { headers: { 'Content-Type': 'multipart/form-data' } }
       );
       
-      const responseData = response.data.result;
-      const rawData = JSON.parse(responseData);
+      const rawData = response.data.results[response.data.result];
       
       const lastNode = nodes.find(n => n.data.node_type === 'analyze_data');
       if (lastNode && !edges.some(e => e.source === lastNode.id)) {
@@ -576,8 +576,7 @@ export default function PipelinePage() {
         { headers: { 'Content-Type': 'multipart/form-data' } }
       );
       
-      const responseData = response.data.result;
-      const rawData = JSON.parse(responseData); 
+      const rawData = response.data.results[response.data.result];
       
       const lastNode = nodes.find(n => n.type === 'analyze_data');
       if (lastNode && !connections.some(c => c.from === lastNode.id)) {
@@ -5,7 +5,8 @@ import traceback
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
-from app.analysis_utils import read_uploaded_file_to_df
+from app.dataset_cache import dataset_cache
+from app.metrics import instrumented
 
 # Load environment variables
 load_dotenv(dotenv_path="../.env")
@@ -16,14 +17,22 @@ if "GROQ_API_KEY" not in os.environ:
         "GROQ_API_KEY not set. Get a free key at https://console.groq.com"
     )
 
-def create_agent(file_contents: bytes, file_name: str):
+@instrumented("agent.create")
+def create_agent(file_contents: bytes, file_name: str, dataset=None):
     """
     Creates a Pandas DataFrame Agent using Groq (FREE & FAST).
+
+    'dataset' is an already resolved dataset cache entry; its DataFrame is
+    used as is instead of parsing file_contents (the cache may have evicted
+    it since, which does not matter while we hold the entry).
     """
     try:
         print("=" * 50)
         print("Step 1: Reading file into DataFrame...")
-        df = read_uploaded_file_to_df(file_contents, file_name)
+        entry = dataset if dataset is not None else dataset_cache.get_or_load(file_contents, file_name)
+        # The agent runs generated code, so give it a shallow copy: it can add or
+        # replace columns without touching the frame other requests share.
+        df = entry.df.copy(deep=False)
         print(f"✓ DataFrame created successfully. Shape: {df.shape}")
         print(f"Columns: {list(df.columns)}")
         
@@ -60,6 +69,7 @@ def create_agent(file_contents: bytes, file_name: str):
         print("=" * 50)
         return None
 
+@instrumented("agent.query")
 def query_agent(agent, user_question: str) -> str:
     """
     Asks the agent a question and gets a precise quantitative answer.
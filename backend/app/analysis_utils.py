@@ -1,132 +1,241 @@
 import pandas as pd
 import numpy as np
-import io
 from pathlib import Path
-from statsmodels.tsa.arima.model import ARIMA
-from statsmodels.tsa.seasonal import seasonal_decompose
+from app.config import (
+    PARSE_ENGINE,
+    PARSE_DTYPE_BACKEND,
+    CORRELATION_MAX_COLUMNS,
+    CORRELATION_THRESHOLD,
+    CORRELATION_TOP_K,
+    CORRELATION_BLOCK_SIZE,
+    DATETIME_SAMPLE_SIZE,
+)
+from app.ingest import open_binary_source, detect_encoding, source_size
+from app.metrics import bytes_ingested, instrumented
+from app.dataset_profile import DatasetProfile, get_profile, get_approximate_profile, is_numeric_column
+from app.forecasting import forecast_monthly
+from app.frame_memo import frame_memo
+from app.table_query import query_table, table_page
+from app.dtype_compaction import get_compaction_report
+from pandas.api.types import is_string_dtype
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
 
-def read_uploaded_file_to_df(file_contents: bytes, file_name: str) -> pd.DataFrame:
+PARSE_ENGINES = ('c', 'pyarrow')
+
+def _pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _arrow_table_to_pandas(table, dtype_backend: str) -> pd.DataFrame:
+    if dtype_backend == 'pyarrow':
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    df = table.to_pandas()
+    if dtype_backend == 'numpy_nullable':
+        df = df.convert_dtypes(dtype_backend='numpy_nullable')
+    return df
+
+def _read_csv(file_contents, encoding: str, engine: str, dtype_backend: str, columns=None) -> pd.DataFrame:
+    """
+    Parses CSV bytes with the chosen engine, decoding them while reading.
+    With 'columns', the other columns are skipped by the tokenizer instead of parsed.
+    """
+    if engine == 'pyarrow':
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        table = pa_csv.read_csv(
+            open_binary_source(file_contents),
+            read_options=pa_csv.ReadOptions(encoding=encoding, use_threads=True),
+            convert_options=pa_csv.ConvertOptions(include_columns=columns) if columns is not None else None
+        )
+        # Arrow types text that is not valid in the encoding as binary instead of failing
+        if any(pa.types.is_binary(field.type) for field in table.schema):
+            raise UnicodeDecodeError(encoding, b'', 0, 1, "column is not valid text in this encoding")
+        return _arrow_table_to_pandas(table, dtype_backend)
+
+    read_params = {'encoding': encoding}
+    if dtype_backend:
+        read_params['dtype_backend'] = dtype_backend
+    if columns is not None:
+        # A callable, so missing columns are reported by the caller rather than the tokenizer
+        wanted = set(columns)
+        read_params['usecols'] = lambda column: column in wanted
+    return pd.read_csv(open_binary_source(file_contents), **read_params)
+
+def _columns_in_file(file_contents, extension: str, columns):
+    """The requested columns that a Parquet/Feather file has, read from its schema (the rest are reported missing later)."""
+    if columns is None:
+        return None
+    import pyarrow as pa
+    if extension == '.parquet':
+        import pyarrow.parquet as pq
+        names = pq.read_schema(open_binary_source(file_contents)).names
+    else:
+        names = pa.ipc.open_file(open_binary_source(file_contents)).schema.names
+    return [column for column in columns if column in names]
+
+def _read_json(file_contents, encoding: str, engine: str, dtype_backend: str) -> pd.DataFrame:
+    """
+    Parses JSON bytes. The pyarrow engine only understands newline-delimited
+    records (and only utf-8), so anything else goes through pandas.
+    """
+    if engine == 'pyarrow' and encoding in ('utf-8', 'utf-8-sig'):
+        import pyarrow as pa
+        import pyarrow.json as pa_json
+        try:
+            table = pa_json.read_json(
+                open_binary_source(file_contents),
+                read_options=pa_json.ReadOptions(use_threads=True)
+            )
+            return _arrow_table_to_pandas(table, dtype_backend)
+        except pa.ArrowInvalid:
+            pass  # A regular JSON document (array/object), not NDJSON
+
+    read_params = {'encoding': encoding}
+    if dtype_backend:
+        read_params['dtype_backend'] = dtype_backend
+    return pd.read_json(open_binary_source(file_contents), **read_params)
+
+# --- Excel helpers ---
+def _select_sheet(sheet_names: list, sheet_name):
+    """Resolves a sheet name or index (ints or digit strings from a form) to a sheet name."""
+    if sheet_name is None:
+        sheet_name = 0
+    if isinstance(sheet_name, str) and sheet_name not in sheet_names and sheet_name.isdigit():
+        sheet_name = int(sheet_name)
+    if isinstance(sheet_name, int):
+        if not 0 <= sheet_name < len(sheet_names):
+            raise ValueError(f"Sheet index {sheet_name} is out of range; the workbook has {len(sheet_names)} sheet(s).")
+        return sheet_names[sheet_name]
+    if sheet_name not in sheet_names:
+        raise ValueError(f"Sheet '{sheet_name}' not found. Available sheets: {', '.join(sheet_names)}.")
+    return sheet_name
+
+def _read_excel_rows(file_contents, extension: str, sheet_name=0) -> list:
+    """
+    Reads every row of one sheet as a tuple of cell values, opening the
+    workbook exactly once. .xlsx is streamed with openpyxl in read-only mode;
+    legacy .xls goes through xlrd.
+    """
+    if extension == '.xls':
+        import xlrd
+        data = file_contents if isinstance(file_contents, (bytes, bytearray)) else open_binary_source(file_contents).read()
+        book = xlrd.open_workbook(file_contents=data, on_demand=True)
+        try:
+            sheet = book.sheet_by_name(_select_sheet(book.sheet_names(), sheet_name))
+            rows = []
+            for i in range(sheet.nrows):
+                row = []
+                for cell_type, value in zip(sheet.row_types(i), sheet.row_values(i)):
+                    if cell_type in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+                        value = None
+                    elif cell_type == xlrd.XL_CELL_DATE:
+                        value = xlrd.xldate_as_datetime(value, book.datemode)
+                    row.append(value)
+                rows.append(tuple(row))
+            return rows
+        finally:
+            book.release_resources()
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(open_binary_source(file_contents), read_only=True, data_only=True)
+    try:
+        sheet = workbook[_select_sheet(workbook.sheetnames, sheet_name)]
+        return list(sheet.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+def _excel_rows_to_df(rows: list) -> pd.DataFrame:
+    """Builds a DataFrame from raw sheet rows, using the first substantially filled row as the header."""
+    if not rows:
+        return pd.DataFrame()
+
+    # Read-only sheets can report ragged rows; pad them to the widest one
+    max_cols = max(len(row) for row in rows) or 1
+    
+    # Find first row with substantial data (likely the header)
+    header_idx = 0
+    for idx in range(min(10, len(rows))):  # Check first 10 rows
+        non_null = sum(1 for val in rows[idx] if val is not None and str(val).strip())
+        if non_null >= max(2, max_cols * 0.3):  # At least 30% filled or 2 columns
+            header_idx = idx
+            break
+
+    header_row = tuple(rows[header_idx]) + (None,) * (max_cols - len(rows[header_idx]))
+    columns = []
+    for i, val in enumerate(header_row):
+        if val is not None and str(val).strip():
+            columns.append(str(val).strip())
+        else:
+            columns.append(f'Unnamed_{i}')
+
+    data = [
+        row if len(row) == max_cols else tuple(row) + (None,) * (max_cols - len(row))
+        for row in rows[header_idx + 1:]
+    ]
+    return pd.DataFrame.from_records(data, columns=range(max_cols)).set_axis(columns, axis=1)
+
+@instrumented("ingest.read_upload")
+def read_uploaded_file_to_df(file_contents, file_name: str, encoding: str = None,
+                             engine: str = None, dtype_backend: str = None,
+                             sheet_name=0, columns: list = None, row_filters: list = None) -> pd.DataFrame:
     """
     Reads a file's contents into a pandas DataFrame, automatically
     detecting the file type from its extension.
+
+    'file_contents' can be the raw bytes or a binary file object (e.g. the
+    spooled temp file behind an UploadFile). Either way the parsers read the
+    bytes directly, so no decoded copy of the whole file is ever made.
+    'encoding' applies to text formats; by default it is sniffed once from
+    the first few KB of the upload.
+
+    'engine' picks the CSV/JSON parser: "c" (pandas) or "pyarrow"
+    (multi-threaded Arrow reader). 'dtype_backend' is passed on to pandas,
+    e.g. "pyarrow" for Arrow-backed columns. Both default to the
+    PARSE_ENGINE / PARSE_DTYPE_BACKEND settings.
+
+    'sheet_name' picks the Excel sheet, by name or 0-based index.
+
+    'columns' limits the result to those columns, in that order. CSV, Parquet
+    and Feather readers skip the other columns instead of parsing them.
+    'row_filters' (pyarrow (column, op, value) filters) lets the Parquet reader
+    skip row groups that cannot match; other formats ignore it, so callers
+    still filter the rows themselves.
     """
     extension = Path(file_name).suffix.lower()
+    bytes_ingested.inc(source_size(file_contents), format=extension.lstrip('.') or 'none')
     
     try:
+        engine = engine or PARSE_ENGINE
+        dtype_backend = dtype_backend or PARSE_DTYPE_BACKEND
+        if engine not in PARSE_ENGINES:
+            raise ValueError(f"Unsupported parse engine '{engine}'. Use one of: {', '.join(PARSE_ENGINES)}.")
+        if engine == 'pyarrow' and not _pyarrow_available():
+            print("pyarrow is not installed, falling back to the 'c' parse engine.")
+            engine = 'c'
+
         if extension == '.csv':
+            detected_encoding = encoding or detect_encoding(file_contents)
             try:
-                # Try standard utf-8
-                df = pd.read_csv(io.StringIO(file_contents.decode('utf-8')))
+                df = _read_csv(file_contents, detected_encoding, engine, dtype_backend, columns)
             except UnicodeDecodeError:
-                # Fallback to latin-1
-                df = pd.read_csv(io.StringIO(file_contents.decode('latin-1')))
+                if encoding or detected_encoding == 'latin-1':
+                    raise
+                # The sniffed prefix was valid utf-8 but a later byte was not
+                df = _read_csv(file_contents, 'latin-1', engine, dtype_backend, columns)
         
         elif extension in ['.xls', '.xlsx']:
-            # Excel files must be read from bytes
-            # Determine the engine to use
-            if extension == '.xlsx':
-                engine = 'openpyxl'
-            else:
-                # For .xls files, try to use xlrd, but fallback to openpyxl or None
-                engine = None
-                try:
-                    import xlrd
-                    engine = 'xlrd'
-                except ImportError:
-                    # xlrd not installed, try openpyxl or let pandas choose
-                    engine = 'openpyxl'  # openpyxl can sometimes handle .xls
-            
-            # Try multiple approaches to read the Excel file
-            df = None
-            last_error = None
-            
-            # Approach 1: Try reading with header=0 (standard approach)
+            # One pass over the workbook: stream the chosen sheet's rows, detect
+            # the header row from the first few and build the frame from them.
             try:
-                buffer = io.BytesIO(file_contents)
-                read_params = {
-                    'io': buffer,
-                    'sheet_name': 0,
-                    'header': 0,
-                }
-                if engine:
-                    read_params['engine'] = engine
-                    
-                df = pd.read_excel(**read_params)
-            except Exception as e1:
-                last_error = e1
-                # Approach 2: Try reading without header, then detect it
-                try:
-                    buffer = io.BytesIO(file_contents)
-                    read_params = {
-                        'io': buffer,
-                        'sheet_name': 0,
-                        'header': None,  # No header
-                    }
-                    if engine:
-                        read_params['engine'] = engine
-                    else:
-                        # Try without engine specification
-                        pass
-                    
-                    df_temp = pd.read_excel(**read_params)
-                    
-                    # Find first row with substantial data (likely the header)
-                    header_idx = 0
-                    max_cols = len(df_temp.columns) if len(df_temp.columns) > 0 else 1
-                    for idx in range(min(10, len(df_temp))):  # Check first 10 rows
-                        row = df_temp.iloc[idx]
-                        non_null = row.notna().sum()
-                        if non_null >= max(2, max_cols * 0.3):  # At least 30% filled or 2 columns
-                            header_idx = idx
-                            break
-                    
-                    # Use the detected header row
-                    if header_idx >= 0 and header_idx < len(df_temp):
-                        # Set the header row - safely get column values
-                        header_row = df_temp.iloc[header_idx]
-                        new_columns = []
-                        for i, val in enumerate(header_row):
-                            if pd.notna(val) and str(val).strip():
-                                new_columns.append(str(val).strip())
-                            else:
-                                new_columns.append(f'Unnamed_{i}')
-                        df_temp.columns = new_columns[:len(df_temp.columns)]
-                        # Skip the header row and any rows before it
-                        if header_idx + 1 < len(df_temp):
-                            df = df_temp.iloc[header_idx + 1:].copy().reset_index(drop=True)
-                        else:
-                            df = df_temp.iloc[header_idx:].copy().reset_index(drop=True)
-                    else:
-                        df = df_temp.copy()
-                    last_error = None
-                except Exception as e2:
-                    last_error = e2
-                    # Approach 3: Try with openpyxl engine regardless of extension
-                    try:
-                        buffer = io.BytesIO(file_contents)
-                        df = pd.read_excel(
-                            buffer,
-                            sheet_name=0,
-                            header=0,
-                            engine='openpyxl'
-                        )
-                        last_error = None
-                    except Exception as e3:
-                        last_error = e3
-                        # Approach 4: Try without specifying engine (let pandas decide)
-                        try:
-                            buffer = io.BytesIO(file_contents)
-                            df = pd.read_excel(
-                                buffer,
-                                sheet_name=0,
-                                header=0
-                            )
-                            last_error = None
-                        except Exception as e4:
-                            last_error = e4
-            
-            if df is None:
-                error_msg = str(last_error) if last_error else "Unknown error"
+                rows = _read_excel_rows(file_contents, extension, sheet_name)
+            except Exception as e:
+                error_msg = str(e).rstrip('.')
                 # Provide more helpful error message
                 if 'tokenizing' in error_msg.lower():
                     raise ValueError(
@@ -139,6 +248,8 @@ def read_uploaded_file_to_df(file_contents: bytes, file_name: str) -> pd.DataFra
                         f"Error reading Excel file '{file_name}': {error_msg}. "
                         f"Please ensure the file is a valid Excel file (.xls or .xlsx) and not corrupted."
                     )
+
+            df = _excel_rows_to_df(rows)
             
             # Clean up the dataframe: remove completely empty rows and columns
             df = df.dropna(how='all').dropna(axis=1, how='all')
@@ -168,23 +279,31 @@ def read_uploaded_file_to_df(file_contents: bytes, file_name: str) -> pd.DataFra
             df.columns = new_columns
         
         elif extension == '.json':
-            # JSON is text
-            df = pd.read_json(io.StringIO(file_contents.decode('utf-8')))
+            # JSON is text, but the parser can decode it while reading the bytes
+            df = _read_json(file_contents, encoding or detect_encoding(file_contents), engine, dtype_backend)
         
         elif extension == '.parquet':
             # Parquet is binary
-            df = pd.read_parquet(io.BytesIO(file_contents))
+            df = pd.read_parquet(open_binary_source(file_contents), filters=row_filters or None,
+                                 columns=_columns_in_file(file_contents, extension, columns))
             
         elif extension == '.feather':
             # Feather is binary
-            df = pd.read_feather(io.BytesIO(file_contents))
+            df = pd.read_feather(open_binary_source(file_contents),
+                                 columns=_columns_in_file(file_contents, extension, columns))
             
         elif extension == '.h5':
             # HDF5 is binary
-            df = pd.read_hdf(io.BytesIO(file_contents))
+            df = pd.read_hdf(open_binary_source(file_contents))
             
         else:
             raise ValueError(f"Unsupported file type: {extension}")
+
+        if columns is not None:
+            missing = [column for column in columns if column not in df.columns]
+            if missing:
+                raise ValueError(f"Column '{missing[0]}' not found in file.")
+            df = df[list(columns)]
         
         # Final validation: ensure we have a valid dataframe
         if df.empty:
@@ -205,55 +324,150 @@ def read_uploaded_file_to_df(file_contents: bytes, file_name: str) -> pd.DataFra
 
 
 # --- Helper function for finding anomalies ---
-def get_anomalies(df, numeric_col):
-    """Finds anomalies in a numeric column using the IQR method."""
-    if df[numeric_col].dtype not in ['int64', 'float64']:
+def get_anomalies(df, numeric_col, profile: DatasetProfile = None):
+    """
+    Finds anomalies in a numeric column using the IQR method.
+    With a profile, its quartiles and outlier count are used (the quartiles
+    are estimated from a sample for an ApproximateProfile).
+    """
+    if not is_numeric_column(df[numeric_col].dtype):
         return [] # Can't find anomalies in non-numeric data
         
-    Q1 = df[numeric_col].quantile(0.25)
-    Q3 = df[numeric_col].quantile(0.75)
+    if profile is not None:
+        Q1, Q3 = profile.quartiles(numeric_col)
+    else:
+        Q1 = df[numeric_col].quantile(0.25)
+        Q3 = df[numeric_col].quantile(0.75)
     IQR = Q3 - Q1
     lower_bound = Q1 - 1.5 * IQR
     upper_bound = Q3 + 1.5 * IQR
     
-    anomalies = df[(df[numeric_col] < lower_bound) | (df[numeric_col] > upper_bound)]
+    if profile is not None:
+        anomaly_count = profile.count_outside(numeric_col, lower_bound, upper_bound)
+    else:
+        anomaly_count = len(df[(df[numeric_col] < lower_bound) | (df[numeric_col] > upper_bound)])
     
     # Format for the insights panel
     return [
-        f"Found {len(anomalies)} anomalies (outliers) in '{numeric_col}'."
+        f"Found {anomaly_count} anomalies (outliers) in '{numeric_col}'."
     ]
 
+# --- Helpers for correlations ---
+def _standardize_columns(values: np.ndarray) -> np.ndarray:
+    """Centers each column and scales it to unit norm, so Z.T @ Z is the correlation matrix."""
+    centered = values - values.mean(axis=0)
+    norms = np.sqrt(np.einsum('ij,ij->j', centered, centered))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return centered / norms  # constant columns become NaN, like pandas .corr()
+
+def compute_correlation_values(numeric_df: pd.DataFrame) -> np.ndarray:
+    """
+    Pearson correlation matrix of the columns as a NumPy array.
+
+    Without missing values this is a single BLAS matrix product over the
+    standardized data; with missing values it falls back to pandas'
+    pairwise-complete .corr() so the numbers stay the same.
+    """
+    values = numeric_df.to_numpy(dtype='float64', na_value=np.nan)
+    if np.isnan(values).any():
+        return numeric_df.corr().to_numpy()
+
+    z = _standardize_columns(values)
+    corr = z.T @ z
+    np.clip(corr, -1.0, 1.0, out=corr)
+    diagonal = np.diagonal(corr).copy()
+    np.fill_diagonal(corr, np.where(np.isnan(diagonal), np.nan, 1.0))
+    return corr
+
+def _top_pairs(rows: np.ndarray, cols: np.ndarray, values: np.ndarray, top_k: int = None):
+    """Orders candidate pairs strongest first and keeps at most top_k of them."""
+    order = np.argsort(-np.abs(values), kind='stable')
+    if top_k is not None:
+        order = order[:top_k]
+    return rows[order], cols[order], values[order]
+
+def find_strong_correlations(corr: np.ndarray, threshold: float = CORRELATION_THRESHOLD, top_k: int = None):
+    """
+    Returns (row_indices, col_indices, values) of the pairs in the upper
+    triangle of 'corr' whose absolute correlation is above threshold,
+    strongest first. Each pair is reported once and the diagonal is skipped.
+    """
+    with np.errstate(invalid='ignore'):
+        mask = np.triu(np.abs(corr) > threshold, k=1)
+    rows, cols = np.nonzero(mask)
+    return _top_pairs(rows, cols, corr[rows, cols], top_k)
+
+def find_strong_correlations_blockwise(numeric_df: pd.DataFrame, threshold: float = CORRELATION_THRESHOLD,
+                                       top_k: int = None, block_size: int = CORRELATION_BLOCK_SIZE):
+    """
+    Same result as find_strong_correlations, but never builds the full
+    k x k matrix: the standardized data is multiplied block by block and
+    only pairs above threshold are kept. Used for very wide datasets.
+    Frames with missing values fall back to the full pairwise matrix.
+    """
+    values = numeric_df.to_numpy(dtype='float64', na_value=np.nan)
+    if np.isnan(values).any():
+        return find_strong_correlations(numeric_df.corr().to_numpy(), threshold, top_k)
+
+    z = _standardize_columns(values)
+    n_cols = z.shape[1]
+    found_rows, found_cols, found_values = [], [], []
+    for start_i in range(0, n_cols, block_size):
+        block_i = z[:, start_i:start_i + block_size]
+        for start_j in range(start_i, n_cols, block_size):
+            block = block_i.T @ z[:, start_j:start_j + block_size]
+            with np.errstate(invalid='ignore'):
+                mask = np.abs(block) > threshold
+            if start_i == start_j:
+                mask = np.triu(mask, k=1)
+            rows, cols = np.nonzero(mask)
+            found_rows.append(rows + start_i)
+            found_cols.append(cols + start_j)
+            found_values.append(np.clip(block[rows, cols], -1.0, 1.0))
+
+        # Keep the candidate list small on very wide, highly correlated data
+        if top_k is not None and sum(len(v) for v in found_values) > top_k:
+            pruned = _top_pairs(np.concatenate(found_rows), np.concatenate(found_cols),
+                                np.concatenate(found_values), top_k)
+            found_rows, found_cols, found_values = [pruned[0]], [pruned[1]], [pruned[2]]
+
+    if not found_values:
+        return np.array([], dtype=int), np.array([], dtype=int), np.array([])
+    return _top_pairs(np.concatenate(found_rows), np.concatenate(found_cols),
+                      np.concatenate(found_values), top_k)
+
+def _format_correlation_insight(row_col, col, corr_value) -> str:
+    corr_type = "positive" if corr_value > 0 else "negative"
+    return f"Found a strong {corr_type} correlation ({corr_value:.2f}) between '{col}' and '{row_col}'."
+
 # --- Helper function for finding correlations ---
-def get_correlations(correlation_matrix):
-    """Finds strong correlations from the matrix."""
-    correlations = []
-    for col in correlation_matrix:
-        for idx in correlation_matrix.index:
-            if col != idx and abs(correlation_matrix.loc[idx, col]) > 0.75:
-                corr_value = correlation_matrix.loc[idx, col]
-                corr_type = "positive" if corr_value > 0 else "negative"
-                insight = f"Found a strong {corr_type} correlation ({corr_value:.2f}) between '{idx}' and '{col}'."
-                # Add insight only once (avoid duplicates)
-                if not any(f"between '{col}' and '{idx}'" in s for s in correlations):
-                     correlations.append(insight)
-    return correlations
-
-# --- Original Function (Unchanged) ---
-def get_kpis(df):
+def get_correlations(correlation_matrix, threshold: float = CORRELATION_THRESHOLD, top_k: int = CORRELATION_TOP_K):
+    """Finds the strongest correlations (at most top_k) from the matrix."""
+    if correlation_matrix is None or correlation_matrix.empty:
+        return []
+    columns = correlation_matrix.columns
+    rows, cols, values = find_strong_correlations(correlation_matrix.to_numpy(), threshold, top_k)
+    return [
+        _format_correlation_insight(columns[i], columns[j], value)
+        for i, j, value in zip(rows.tolist(), cols.tolist(), values.tolist())
+    ]
+
+# --- KPIs ---
+@instrumented("analysis.get_kpis")
+def get_kpis(df, profile: DatasetProfile = None):
     """Calculates all the Key Performance Indicators."""
-    total_records = len(df)
+    profile = profile or DatasetProfile(df)
+    total_records = profile.n_rows
     
-    total_cells = np.prod(df.shape)
-    missing_values = df.isnull().sum().sum()
-    valid_cells = total_cells - missing_values
-    data_quality_score = (valid_cells / total_cells) * 100 if total_cells > 0 else 0
+    missing_values = profile.missing_values
+    data_quality_score = profile.completeness
     
-    total_columns = len(df.columns)
-    numeric_cols = df.select_dtypes(include=np.number).columns
-    categorical_cols = df.select_dtypes(include='object').columns
+    total_columns = profile.n_cols
+    numeric_cols = profile.numeric_columns
+    categorical_cols = profile.categorical_columns
     
-    anomalies = df.duplicated().sum()
-    anomalies_percent = (anomalies / total_records) * 100 if total_records > 0 else 0
+    anomalies = profile.duplicate_count
+    anomalies_percent = profile.duplicate_percent
 
     return {
         "totalRecords": f"{total_records:,}",
@@ -268,8 +482,14 @@ def get_kpis(df):
     }
 
 # --- UPGRADED FUNCTION ---
-def get_actionable_insights(df, kpis, correlation_matrix):
-    """Generates simple text-based insights."""
+@instrumented("analysis.get_actionable_insights")
+def get_actionable_insights(df, kpis, correlation_matrix, profile: DatasetProfile = None, strong_correlations: list = None):
+    """
+    Generates simple text-based insights.
+
+    'strong_correlations' is the pre-computed list from get_correlation_matrix;
+    when it is missing the pairs are looked up in correlation_matrix.
+    """
     insights = [
         {"id": "i1", "insight": f"Analysis complete for {kpis['totalRecords']} records."},
         {"id": "i2", "insight": f"Data Quality Score is {kpis['dataQuality']}. Check 'Data Health' for details on missing values."},
@@ -279,46 +499,64 @@ def get_actionable_insights(df, kpis, correlation_matrix):
     
     # --- New AI Insights ---
     # 1. Add Correlation Insights
-    corr_insights = get_correlations(correlation_matrix)
+    if strong_correlations is not None:
+        corr_insights = [_format_correlation_insight(a, b, value) for a, b, value in strong_correlations]
+    else:
+        corr_insights = get_correlations(correlation_matrix)
     for i, insight in enumerate(corr_insights, 1):
         insights.append({"id": f"c{i}", "insight": insight})
 
     # 2. Add Anomaly Insights (check first 2 numeric columns)
-    numeric_cols = df.select_dtypes(include=np.number).columns
+    numeric_cols = (profile or DatasetProfile(df)).numeric_columns
     for i, col in enumerate(numeric_cols[:2]):
-        anomaly_insights = get_anomalies(df, col)
+        anomaly_insights = get_anomalies(df, col, profile)
         for j, insight in enumerate(anomaly_insights, 1):
             insights.append({"id": f"a{i}{j}", "insight": insight})
             
     return insights
 
-# --- Original Function (Unchanged) ---
-def get_data_dictionary(df):
-    """Generates a list of all columns, their types, and missing %."""
+# --- Data dictionary ---
+@instrumented("analysis.get_data_dictionary")
+def get_data_dictionary(df, profile: DatasetProfile = None):
+    """
+    Generates a list of all columns, their types, missing % and memory use.
+    For a frame loaded with compact_dtypes, each compacted column also
+    reports its original type and memory.
+    """
+    profile = profile or DatasetProfile(df)
+    compaction = get_compaction_report(df) if df is not None else None
+    compacted_columns = compaction['columns'] if compaction else {}
     dictionary = []
-    total_records = len(df)
-    for col in df.columns:
-        col_type = str(df[col].dtype)
-        missing_count = df[col].isnull().sum()
+    total_records = profile.n_rows
+    for col, dtype, missing_count, memory in zip(profile.columns, profile.dtypes, profile.null_counts,
+                                                 profile.memory_usage):
+        col_type = str(dtype)
         missing_percent = (missing_count / total_records) * 100 if total_records > 0 else 0
         
-        dictionary.append({
+        entry = {
             "id": col,
             "columnName": col,
             "columnType": col_type,
-            "metric": f"{missing_percent:.1f}% missing"
-        })
+            "metric": f"{missing_percent:.1f}% missing",
+            "memoryBytes": int(memory)
+        }
+        change = compacted_columns.get(str(col))
+        if change:
+            entry["originalType"] = change["from"]
+            entry["memoryBytesBefore"] = change["bytesBefore"]
+        dictionary.append(entry)
     return dictionary
 
-# --- Original Function (Unchanged) ---
-def get_column_distribution(df, target_column=None):
+# --- Column distribution ---
+@instrumented("analysis.get_column_distribution")
+def get_column_distribution(df, target_column=None, profile: DatasetProfile = None):
     if df.empty or len(df.columns) == 0:
         return {"columnName": "N/A", "chartData": []}
     
     col_to_analyze = target_column
     
     if col_to_analyze is None:
-        categorical_cols = df.select_dtypes(include='object').columns
+        categorical_cols = (profile or DatasetProfile(df)).categorical_columns
         if len(categorical_cols) > 0:
             col_to_analyze = categorical_cols[0]
         else:
@@ -327,7 +565,10 @@ def get_column_distribution(df, target_column=None):
     if col_to_analyze not in df.columns:
         raise ValueError(f"Column '{col_to_analyze}' not found in file.")
 
-    counts = df[col_to_analyze].value_counts().nlargest(10).to_dict()
+    if profile is not None:
+        counts = profile.top_values(col_to_analyze, 10).to_dict()
+    else:
+        counts = df[col_to_analyze].value_counts().nlargest(10).to_dict()
     chart_data = [{"name": str(key), "value": int(val)} for key, val in counts.items()]
     
     return {
@@ -336,33 +577,80 @@ def get_column_distribution(df, target_column=None):
     }
 
 # --- NEW FORECASTING FUNCTION ---
-def get_forecasting(monthly_data):
-    """Generates a 12-month forecast based on monthly data."""
-    if len(monthly_data) < 12: # Need at least 12 data points to forecast
-        return []
-        
-    try:
-        # We need to ensure the index has a frequency
-        monthly_data.index.freq = 'ME'
-        
-        # Decompose to find seasonality (optional, but good)
-        decompose_result = seasonal_decompose(monthly_data, model='additive')
-        
-        # Simple ARIMA model (p,d,q) - (1,1,1) is a common starting point
-        # (P,D,Q,m) - (1,1,1,12) for seasonal component
-        model = ARIMA(monthly_data, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12))
-        model_fit = model.fit()
-        
-        # Forecast 12 steps (months) ahead
-        forecast = model_fit.forecast(steps=12)
-        
-        # Format for ECharts
-        forecast_data = [{"name": date.strftime('%Y-%m-%d'), "value": f_val} for date, f_val in forecast.items()]
-        return forecast_data
-        
-    except Exception as e:
-        print(f"Error during forecasting: {e}")
-        return [] # Return empty if forecasting fails
+def get_forecasting(monthly_data, model: str = None, time_budget: float = None):
+    """
+    Generates a 12-month forecast based on monthly data.
+
+    See app.forecasting.forecast_monthly for the models, the per-series
+    cache and the time budget.
+    """
+    forecast_data, _ = forecast_monthly(monthly_data, model=model, time_budget=time_budget)
+    return forecast_data
+
+# --- Helpers for finding the datetime column ---
+def _infer_datetime_format(values: pd.Series):
+    """
+    strftime format that parses the given (sample of) values best, or None.
+
+    Candidates are guessed from the first non-null value both month-first and
+    day-first, since a value like 01/02/2020 fits either; a format is only
+    returned if it parses at least 90% of the non-null values.
+    """
+    first_valid = values.first_valid_index()
+    if first_valid is None or not is_string_dtype(values.dtype):
+        return None
+    first_value = str(values.loc[first_valid])
+    candidates = {guess_datetime_format(first_value), guess_datetime_format(first_value, dayfirst=True)}
+    candidates.discard(None)
+
+    best_format, best_parsed = None, 0
+    for date_format in sorted(candidates):
+        parsed = pd.to_datetime(values, format=date_format, errors='coerce').notna().sum()
+        if parsed > best_parsed:
+            best_format, best_parsed = date_format, parsed
+    if best_parsed < 0.9 * values.notna().sum():
+        return None
+    return best_format
+
+def _to_datetime(values: pd.Series, date_format: str = None) -> pd.Series:
+    """pd.to_datetime(errors='coerce'), with an explicit format when one was inferred."""
+    if date_format is not None:
+        return pd.to_datetime(values, format=date_format, errors='coerce')
+    return pd.to_datetime(values, errors='coerce')
+
+def _sample_rows(values: pd.Series, sample_size: int) -> pd.Series:
+    """Up to sample_size evenly spaced values, so a column is judged by its whole length."""
+    if len(values) <= sample_size:
+        return values
+    positions = np.unique(np.linspace(0, len(values) - 1, sample_size).astype(np.int64))
+    return values.iloc[positions]
+
+def detect_datetime_column(df: pd.DataFrame, sample_size: int = DATETIME_SAMPLE_SIZE):
+    """
+    Finds the column to use as the time axis and returns (column, format).
+
+    Columns whose name contains "date" or "time" are tried first, then every
+    text column, as before. Each candidate is judged on an evenly spaced
+    sample of sample_size rows: it qualifies when the sample parses to at
+    least two distinct timestamps. The strftime format inferred from its
+    first value is returned, so the chosen column can be converted in one
+    fast pass. The result is memoized per frame.
+    """
+    def _detect():
+        name_matches = [col for col in df.columns if 'date' in str(col).lower() or 'time' in str(col).lower()]
+        text_columns = [col for col, dtype in df.dtypes.items() if is_string_dtype(dtype) and col not in name_matches]
+        for col in name_matches + text_columns:
+            try:
+                sample = _sample_rows(df[col], sample_size)
+                date_format = _infer_datetime_format(sample.dropna())
+                parsed = _to_datetime(sample, date_format)
+                if not parsed.isnull().all() and parsed.nunique() > 1:
+                    return col, date_format # Found it!
+            except Exception:
+                continue # Try next column
+        return None, None
+
+    return frame_memo.get_or_compute(df, ('datetime_column', sample_size), _detect)
 
 # --- UPGRADED FUNCTION ---
 # ... (all your other functions like get_kpis, get_forecasting, etc. are fine) ...
@@ -370,65 +658,59 @@ def get_forecasting(monthly_data):
 # ... (keep all your other functions like get_kpis, get_anomalies, etc.) ...
 
 # --- REPLACE THIS ENTIRE FUNCTION ---
-def get_time_series_data(df, target_column=None):
+@instrumented("analysis.get_time_series_data")
+def get_time_series_data(df, target_column=None, forecast_model: str = None):
     """
     Finds the first datetime column (or uses target_column) and aggregates by month.
+    'forecast_model' overrides the FORECAST_MODEL setting for the forecast line.
     """
     if df.empty:
         return {"timeColumn": None, "seriesData": [], "xAxisData": []}
-        
+
     date_col = target_column
     
     # --- NEW "AUTO-GUESS" LOGIC ---
     if date_col is None:
-        # First, look for column names that contain "date" or "time"
-        for col in df.columns:
-            if 'date' in col.lower() or 'time' in col.lower():
-                try:
-                    temp_col = pd.to_datetime(df[col], errors='coerce')
-                    if not temp_col.isnull().all() and temp_col.nunique() > 1:
-                        date_col = col # Found it!
-                        df[date_col] = temp_col
-                        break
-                except Exception:
-                    continue # Try next column
-        
-        # If still not found, try converting *all* object columns
-        if date_col is None:
-             for col in df.select_dtypes(include='object').columns:
-                try:
-                    temp_col = pd.to_datetime(df[col], errors='coerce')
-                    if not temp_col.isnull().all() and temp_col.nunique() > 1:
-                        date_col = col # Found it!
-                        df[date_col] = temp_col
-                        break
-                except Exception:
-                    continue
+        date_col, date_format = detect_datetime_column(df)
     # --- END OF NEW LOGIC ---
     else:
         # User provided a column, we MUST try to convert it
         if target_column not in df.columns:
             raise ValueError(f"Time column '{target_column}' not found in file.")
-        try:
-            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-            if df[date_col].isnull().all():
-                date_col = None # Conversion failed for all rows
-        except Exception:
-            date_col = None # Conversion failed
+        date_format = _infer_datetime_format(_sample_rows(df[date_col], DATETIME_SAMPLE_SIZE).dropna())
 
     if date_col is None:
         # If still no date column, return empty
         return {"timeColumn": None, "seriesData": [], "xAxisData": []}
 
+    try:
+        # Only the chosen column is fully converted, once per frame; the
+        # caller's frame is never modified.
+        timestamps = frame_memo.get_or_compute(
+            df, ('datetime_values', date_col),
+            lambda: _to_datetime(df[date_col], date_format)
+        )
+    except Exception:
+        timestamps = None # Conversion failed
+    if timestamps is None or timestamps.isnull().all():
+        # Conversion failed for all rows
+        return {"timeColumn": None, "seriesData": [], "xAxisData": []}
+
     # Aggregate by month-end frequency ('ME')
-    monthly_counts = df.set_index(date_col).resample('ME').size()
-    
+    monthly_counts = pd.Series(0, index=pd.DatetimeIndex(timestamps)).resample('ME').size()
+    return format_time_series(date_col, monthly_counts, forecast_model)
+
+def format_time_series(date_col, monthly_counts: pd.Series, forecast_model: str = None):
+    """
+    Builds the time-series chart payload (actual counts plus forecast) from
+    the month-end indexed record counts of date_col.
+    """
     # --- Prepare data for ECharts ---
     actual_data_values = monthly_counts.tolist()
     actual_data_dates = [date.strftime('%Y-%m-%d') for date in monthly_counts.index]
     
     # --- Call the forecasting function ---
-    forecast_results = get_forecasting(monthly_counts) # This returns a list of objects
+    forecast_results, forecast_model_used = forecast_monthly(monthly_counts, model=forecast_model) # This returns a list of objects
     
     forecast_data_values = [item['value'] for item in forecast_results]
     forecast_data_dates = [item['name'] for item in forecast_results]
@@ -461,29 +743,68 @@ def get_time_series_data(df, target_column=None):
     return {
         "timeColumn": date_col,
         "seriesData": series_data,
-        "xAxisData": all_dates
+        "xAxisData": all_dates,
+        "forecastModel": forecast_model_used
     }
 
 # --- NEW CORRELATION FUNCTION ---
-def get_correlation_matrix(df):
-    """Generates a correlation matrix for all numeric columns."""
-    numeric_df = df.select_dtypes(include=np.number)
+@instrumented("analysis.get_correlation_matrix")
+def get_correlation_matrix(df, profile: DatasetProfile = None, max_columns: int = CORRELATION_MAX_COLUMNS,
+                           threshold: float = CORRELATION_THRESHOLD, top_k: int = CORRELATION_TOP_K):
+    """
+    Generates a correlation matrix for all numeric columns.
+
+    Besides the heatmap data, the result carries 'strong', the top_k pairs
+    whose absolute correlation is above threshold, as (column, column, value)
+    tuples. With more than max_columns numeric columns (0 means no cap) the
+    heatmap only covers the first max_columns of them, while the strong pairs
+    are still searched over every column, block by block. A k-column heatmap
+    is k*k cells, so an uncapped 2000-column one is 4M triples to build and send.
+    """
+    numeric_df = df[(profile or DatasetProfile(df)).numeric_columns]
     if numeric_df.empty:
-        return {"columns": [], "data": []}
-        
-    correlation_matrix = numeric_df.corr()
-    
-    # Format for ECharts Heatmap
-    columns = correlation_matrix.columns.tolist()
-    data = []
-    for i in range(len(columns)):
-        for j in range(len(columns)):
-            data.append([i, j, round(correlation_matrix.iloc[i, j], 3)])
-            
-    return {"columns": columns, "data": data, "matrix": correlation_matrix}
+        return {"columns": [], "data": [], "matrix": pd.DataFrame(), "strong": []}
+
+    all_columns = numeric_df.columns
+    capped = bool(max_columns) and len(all_columns) > max_columns
+    if capped:
+        numeric_df = numeric_df.iloc[:, :max_columns]
+
+    corr = compute_correlation_values(numeric_df)
+    columns = numeric_df.columns.tolist()
+    correlation_matrix = pd.DataFrame(corr, index=numeric_df.columns, columns=numeric_df.columns)
+
+    if capped:
+        rows, cols, values = find_strong_correlations_blockwise(df[all_columns], threshold, top_k)
+    else:
+        rows, cols, values = find_strong_correlations(corr, threshold, top_k)
+    strong = [
+        (all_columns[i], all_columns[j], value)
+        for i, j, value in zip(rows.tolist(), cols.tolist(), values.tolist())
+    ]
+
+    return {"columns": columns, "data": heatmap_data(corr), "matrix": correlation_matrix, "strong": strong}
+
+def heatmap_data(corr: np.ndarray) -> np.ndarray:
+    """
+    Formats a correlation matrix for the ECharts heatmap: an (n*n, 3) array of
+    [row, col, value] triples. The response layer writes it straight from
+    NumPy as nested JSON lists (NaN as null), with no Python object per cell.
+    """
+    n_cols = corr.shape[0]
+    triples = np.empty((n_cols * n_cols, 3))
+    triples[:, 0], triples[:, 1] = np.divmod(np.arange(n_cols * n_cols), n_cols)
+    triples[:, 2] = np.round(corr, 3).ravel()
+    return triples
 
-# --- Original Function (Unchanged) ---
-def get_table_data(df):
+# --- Table pages ---
+@instrumented("analysis.get_table_data")
+def get_table_data(df, offset: int = 0, limit: int = 100, sort: str = None, filters: list = None):
+    """
+    Column definitions plus one page of rows (the first 100 by default).
+    'sort' is "col:asc,other:desc" and 'filters' a list of "col:op:value";
+    see app.table_query for how pages are served from cached sort orders.
+    """
     column_defs = []
     for col in df.columns:
         column_defs.append({
@@ -494,30 +815,75 @@ def get_table_data(df):
             "resizable": True,
         })
     
-    df_head = df.head(100).replace({np.nan: None})
-    row_data = df_head.to_dict(orient='records')
+    page = query_table(df, offset=offset, limit=limit, sort=sort, filters=filters)
     
-    return {"columnDefs": column_defs, "rowData": row_data}
+    return {"columnDefs": column_defs, **page}
 
-# --- Original Function (Unchanged) ---
-def get_data_health(df):
+@instrumented("analysis.get_table_page")
+def get_table_page(df, offset: int = 0, limit: int = 100, sort: str = None, filters: list = None):
+    """get_table_data's page with the rows as a DataFrame under "rows", for Arrow responses."""
+    return table_page(df, offset=offset, limit=limit, sort=sort, filters=filters)
+
+# --- Data health ---
+@instrumented("analysis.get_data_health")
+def get_data_health(df, profile: DatasetProfile = None):
     if df.empty:
         return [
             {"metric": "Completeness", "value": "0%", "status": "negative"},
             {"metric": "Uniqueness", "value": "0%", "status": "negative"},
         ]
         
-    total_records = len(df)
-    missing_values = df.isnull().sum().sum()
-    total_cells = np.prod(df.shape)
-    completeness = (total_cells - missing_values) / total_cells * 100 if total_cells > 0 else 0
+    profile = profile or DatasetProfile(df)
+    missing_values = profile.missing_values
+    completeness = profile.completeness
     
-    duplicates = df.duplicated().sum()
-    duplicate_percent = (duplicates / total_records) * 100 if total_records > 0 else 0
+    duplicates = profile.duplicate_count
+    duplicate_percent = profile.duplicate_percent
 
     return [
         {"metric": "Completeness", "value": f"{completeness:.1f}%", "status": "positive" if completeness > 95 else "neutral"},
         {"metric": "Uniqueness", "value": f"{(100 - duplicate_percent):.1f}%", "status": "positive" if duplicate_percent == 0 else "negative"},
         {"metric": "Total Duplicates", "value": f"{duplicates:,}", "status": "positive" if duplicates == 0 else "negative"},
         {"metric": "Missing Values", "value": f"{missing_values:,}", "status": "positive" if missing_values == 0 else "negative"},
-    ]
\ No newline at end of file
+    ]
+
+# --- Full dashboard ---
+@instrumented("analysis.get_dashboard_data")
+def get_dashboard_data(df, col_dist_target=None, col_time_target=None, forecast_model: str = None,
+                       approximate: bool = False):
+    """
+    Runs every dashboard section over df and returns the combined payload
+    used by /api/v1/analyze and the analyze_data workflow node.
+
+    With approximate=True, duplicates, distinct counts, anomaly quartiles,
+    correlations and the top-10 distribution are estimated with sketches and
+    a row sample (see ApproximateProfile), and the payload gains an
+    "approximation" section with their 95% error bounds.
+    """
+    # One profile pass feeds the KPI, dictionary and health sections
+    profile = get_approximate_profile(df) if approximate else get_profile(df)
+    kpis = get_kpis(df, profile)
+    # Correlations over the profile's sample, which is the whole frame for an exact profile
+    correlation_result = get_correlation_matrix(profile.sample, profile)
+    time_series_result = get_time_series_data(df, target_column=col_time_target, forecast_model=forecast_model)
+    insights = get_actionable_insights(df, kpis, correlation_result['matrix'], profile,
+                                       strong_correlations=correlation_result['strong'])
+
+    column_dist = get_column_distribution(df, target_column=col_dist_target, profile=profile)
+
+    result = {
+        "kpiData": kpis,
+        "insights": insights,
+        "dictionary": get_data_dictionary(df, profile),
+        "columnDist": column_dist,
+        "timeSeries": time_series_result,
+        "tableData": get_table_data(df),
+        "dataHealth": get_data_health(df, profile),
+        "correlationMatrix": {
+            "columns": correlation_result['columns'],
+            "data": correlation_result['data']
+        }
+    }
+    if approximate:
+        result["approximation"] = profile.approximation(column_dist['columnName'])
+    return result
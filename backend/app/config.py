@@ -0,0 +1,142 @@
+# backend/app/config.py
+import os
+import tempfile
+from dotenv import load_dotenv
+
+# Same ../.env that main.py and ai_agent.py load; loading it here as well means
+# settings are available no matter which module gets imported first.
+load_dotenv(dotenv_path="../.env")
+
+
+def _env_float(name: str, default: float) -> float:
+    """Reads a float setting from the environment, falling back to default."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return float(value)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Reads a true/false setting ("1", "true", "yes", "on") from the environment."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    """Reads an integer setting from the environment, falling back to default."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+# --- Dataset cache ---
+# Memory budget for parsed DataFrames kept by app.dataset_cache (bytes).
+DATASET_CACHE_MAX_BYTES = _env_int("DATASET_CACHE_MAX_BYTES", 2 * 1024 ** 3)
+
+# --- File parsing ---
+# Parser used by read_uploaded_file_to_df for CSV/JSON: "c" (pandas default)
+# or "pyarrow" (multi-threaded Arrow reader, falls back to "c" if missing).
+PARSE_ENGINE = os.getenv("PARSE_ENGINE", "c")
+# Optional pandas dtype_backend for parsed frames: "", "numpy_nullable" or "pyarrow".
+PARSE_DTYPE_BACKEND = os.getenv("PARSE_DTYPE_BACKEND", "") or None
+
+# --- Correlations ---
+# Heatmap column cap (0 = no cap); past it, strong pairs are found block-wise.
+CORRELATION_MAX_COLUMNS = _env_int("CORRELATION_MAX_COLUMNS", 0)
+# |r| above which a pair is reported as an insight, and how many to report.
+CORRELATION_THRESHOLD = _env_float("CORRELATION_THRESHOLD", 0.75)
+CORRELATION_TOP_K = _env_int("CORRELATION_TOP_K", 10)
+# Columns per block when searching strong pairs without the full matrix.
+CORRELATION_BLOCK_SIZE = _env_int("CORRELATION_BLOCK_SIZE", 256)
+
+# --- Forecasting ---
+# Default model for time-series forecasts: "arima", "holt_winters" or "seasonal_naive".
+FORECAST_MODEL = os.getenv("FORECAST_MODEL", "arima")
+# Seconds to wait for a slow model before answering with seasonal naive (0 = no limit).
+FORECAST_TIME_BUDGET = _env_float("FORECAST_TIME_BUDGET", 2.0)
+# Forecasts kept in memory, keyed by the hash of the monthly series.
+FORECAST_CACHE_SIZE = _env_int("FORECAST_CACHE_SIZE", 256)
+# Threads that finish slow fits in the background after the budget ran out.
+FORECAST_BACKGROUND_WORKERS = _env_int("FORECAST_BACKGROUND_WORKERS", 2)
+
+# --- Time series ---
+# Rows per candidate column looked at when auto-detecting the date column.
+DATETIME_SAMPLE_SIZE = _env_int("DATETIME_SAMPLE_SIZE", 1000)
+
+# --- Execution pools ---
+# Threads running parsing/analysis/workflows, and how many more requests may wait.
+EXECUTION_MAX_WORKERS = _env_int("EXECUTION_MAX_WORKERS", os.cpu_count() or 4)
+EXECUTION_MAX_QUEUE = _env_int("EXECUTION_MAX_QUEUE", 32)
+# Same for AI agent creation and queries.
+AGENT_MAX_WORKERS = _env_int("AGENT_MAX_WORKERS", 4)
+AGENT_MAX_QUEUE = _env_int("AGENT_MAX_QUEUE", 16)
+
+# --- Table ---
+# Largest page the table endpoint returns in one request.
+TABLE_MAX_PAGE_SIZE = _env_int("TABLE_MAX_PAGE_SIZE", 1000)
+# Sort orders kept per dataset (one row-position array each), most recently used first.
+TABLE_SORT_CACHE_SIZE = _env_int("TABLE_SORT_CACHE_SIZE", 4)
+
+# --- Approximate analytics ---
+# Rows sampled for quantiles, correlations and top-value candidates in approximate mode.
+APPROXIMATE_SAMPLE_SIZE = _env_int("APPROXIMATE_SAMPLE_SIZE", 100_000)
+# HyperLogLog registers (2**precision) used for approximate distinct counts.
+HLL_PRECISION = _env_int("HLL_PRECISION", 14)
+# Count-min sketch size used for approximate top-value counts.
+COUNT_MIN_WIDTH = _env_int("COUNT_MIN_WIDTH", 65536)
+COUNT_MIN_DEPTH = _env_int("COUNT_MIN_DEPTH", 5)
+
+# --- Out-of-core analysis ---
+# Where uploads analyzed out of core are spilled as memory-mapped Arrow files.
+OUT_OF_CORE_SPILL_DIR = os.getenv("OUT_OF_CORE_SPILL_DIR", os.path.join(tempfile.gettempdir(), "dataset_spill"))
+# Rows per record batch when spilling and analyzing out of core.
+OUT_OF_CORE_BATCH_ROWS = _env_int("OUT_OF_CORE_BATCH_ROWS", 262_144)
+# Codec spill files are written with ('lz4', 'zstd', or empty for none); batches are decompressed as read.
+OUT_OF_CORE_SPILL_COMPRESSION = os.getenv("OUT_OF_CORE_SPILL_COMPRESSION", "lz4")
+# Most spilled uploads kept at once; the least recently used are deleted beyond it.
+OUT_OF_CORE_MAX_DATASETS = _env_int("OUT_OF_CORE_MAX_DATASETS", 16)
+# Disk space all spilled uploads may take together (bytes); 0 means no limit.
+OUT_OF_CORE_SPILL_MAX_BYTES = _env_int("OUT_OF_CORE_SPILL_MAX_BYTES", 20 * 1024 ** 3)
+
+# --- Dtype compaction ---
+# Compact dtypes of every loaded dataset (uploads can also opt in per request).
+COMPACT_DTYPES = _env_bool("COMPACT_DTYPES", False)
+# Text columns with at most this many distinct values per value become 'category'.
+COMPACT_CATEGORY_MAX_RATIO = _env_float("COMPACT_CATEGORY_MAX_RATIO", 0.5)
+
+# --- Workflows ---
+# Threads running independent workflow branches side by side (1 = one node at a time).
+WORKFLOW_MAX_WORKERS = _env_int("WORKFLOW_MAX_WORKERS", 4)
+# Node results kept for reuse by later runs of a changed pipeline (0 = no reuse).
+WORKFLOW_NODE_CACHE_SIZE = _env_int("WORKFLOW_NODE_CACHE_SIZE", 64)
+# DataFrame memory those results may hold (bytes); it also counts against DATASET_CACHE_MAX_BYTES.
+WORKFLOW_NODE_CACHE_MAX_BYTES = _env_int("WORKFLOW_NODE_CACHE_MAX_BYTES", 512 * 1024 ** 2)
+# Turn on pandas copy-on-write (pandas 2.x) so pass-through nodes share buffers instead of copying.
+WORKFLOW_COPY_ON_WRITE = _env_bool("WORKFLOW_COPY_ON_WRITE", True)
+# Run pipelines as optimized lazy plans by default (column/filter pushdown into the loader).
+WORKFLOW_COMPILED = _env_bool("WORKFLOW_COMPILED", False)
+# Run pipelines chunk by chunk by default, in bounded memory (takes precedence over WORKFLOW_COMPILED).
+WORKFLOW_STREAMING = _env_bool("WORKFLOW_STREAMING", False)
+
+# --- Metrics ---
+# Record stage latencies, row counts and memory for /metrics.
+METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+# Add a Server-Timing header listing the stages each response went through.
+METRICS_TIMING_HEADERS = _env_bool("METRICS_TIMING_HEADERS", False)
+
+# --- Background jobs ---
+# Where submitted jobs run: "local" (a thread pool in this process) or "celery".
+JOBS_BROKER = os.getenv("JOBS_BROKER", "local").lower()
+# Jobs run at once by the local broker, and how many more may wait.
+JOBS_MAX_WORKERS = _env_int("JOBS_MAX_WORKERS", 2)
+JOBS_MAX_QUEUE = _env_int("JOBS_MAX_QUEUE", 64)
+# Seconds a finished job's status and result are kept.
+JOBS_RESULT_TTL = _env_int("JOBS_RESULT_TTL", 3600)
+# Where job uploads are stored until the job has read them (shared with Celery workers).
+JOBS_SPOOL_DIR = os.getenv("JOBS_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "dataset_jobs"))
+# Celery broker and result backend for JOBS_BROKER=celery.
+JOBS_CELERY_BROKER_URL = os.getenv("JOBS_CELERY_BROKER_URL", "redis://localhost:6379/0")
+JOBS_CELERY_RESULT_BACKEND = os.getenv("JOBS_CELERY_RESULT_BACKEND", "redis://localhost:6379/1")
@@ -2,12 +2,16 @@
 from .workflow.nodes.load_csv_node import LoadCSVNode
 from .workflow.nodes.clean_data_node import CleanDataNode
 from .workflow.nodes.analyze_data_node import AnalyzeDataNode
+from .workflow.nodes.select_columns_node import SelectColumnsNode
+from .workflow.nodes.filter_rows_node import FilterRowsNode
 
 # --- This is the "phonebook" mapping the string name to the Python class ---
 NODE_REGISTRY = {
     "load_csv": LoadCSVNode,
     "clean_data": CleanDataNode,
     "analyze_data": AnalyzeDataNode,
+    "select_columns": SelectColumnsNode,
+    "filter_rows": FilterRowsNode,
 }
 
 def get_node_class(node_type: str):
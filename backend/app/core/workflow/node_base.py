@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 import pandas as pd
 
+from .streaming import ChunkStream
+
 class NodeBase(ABC):
     """
     Abstract base class for all workflow nodes.
@@ -8,9 +10,20 @@ class NodeBase(ABC):
     This acts as a contract, ensuring that every node we create
     has the same foundational structure.
     """
-    def __init__(self, node_id: str, node_type: str):
+    # Whether results may be reused across runs by the node result cache;
+    # nodes whose output is not determined by their inputs and config set False
+    cacheable = True
+
+    # Whether the node can run as part of a compiled (lazy) plan, see plan()
+    supports_plan = False
+
+    # Whether execute_stream() works chunk by chunk rather than through the whole-frame adapter
+    supports_stream = False
+
+    def __init__(self, node_id: str, node_type: str, config: dict = None):
         self.node_id = node_id
         self.node_type = node_type
+        self.config = config or {} # The node's settings from the Pipeline Builder ('data' minus the label)
         self.data = None # To store the result after execution
 
     @abstractmethod
@@ -25,4 +38,35 @@ class NodeBase(ABC):
         It must return a pandas DataFrame.
         """
         pass
-    
\ No newline at end of file
+
+    def result_cacheable(self, result) -> bool:
+        """
+        Whether this particular result may go into the node result cache
+        (only asked of cacheable nodes). Nodes override it for results that
+        are not final, e.g. a forecast answered by a fallback model.
+        """
+        return True
+    
+
+    def plan(self, inputs: dict):
+        """
+        Compiled-mode counterpart of execute(): takes LazyFrame inputs and
+        returns a LazyFrame describing this node's result without computing
+        it. Only called on nodes with supports_plan = True.
+        """
+        raise NotImplementedError(f"Node type '{self.node_type}' cannot be compiled into a plan.")
+
+    def execute_stream(self, inputs: dict):
+        """
+        Streaming counterpart of execute(): 'inputs' maps input handle IDs to
+        ChunkStreams. Nodes that produce rows return a ChunkStream; sinks
+        return their result.
+
+        This default is the adapter for whole-frame nodes: it collects each
+        input stream into one DataFrame, calls execute() and hands a
+        DataFrame result on as a stream.
+        """
+        frames = {handle: value.collect() if isinstance(value, ChunkStream) else value
+                  for handle, value in inputs.items()}
+        result = self.execute(frames)
+        return ChunkStream.of(result) if isinstance(result, pd.DataFrame) else result
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from app.config import WORKFLOW_NODE_CACHE_SIZE, WORKFLOW_NODE_CACHE_MAX_BYTES
+from app.dataset_cache import dataset_cache
+from app.frame_memo import frame_memo
+
+# Node data fields that only matter to the Pipeline Builder canvas
+UI_ONLY_FIELDS = ('label',)
+
+
+def node_config(node_data: dict) -> dict:
+    """The part of a node's 'data' that can change its result."""
+    return {key: value for key, value in (node_data or {}).items() if key not in UI_ONLY_FIELDS}
+
+
+def node_cache_key(node_type: str, config: dict, upstream: dict) -> str:
+    """
+    Key of a node result: its type and config plus the keys of the results
+    it reads, by input handle. A load node's "upstream" is the dataset id
+    (the hash of the uploaded bytes), so a key changes exactly when the
+    node or anything before it in the graph changes.
+    """
+    payload = json.dumps(
+        {"type": node_type, "config": config, "upstream": upstream},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def result_nbytes(result) -> int:
+    """
+    Memory held by a node result. DataFrames report their own; reports
+    (analyze_data's dashboard and other dicts and lists) are walked,
+    counting the arrays, frames and strings they hold.
+    """
+    if isinstance(result, pd.DataFrame):
+        return frame_memo.get_or_compute(
+            result, 'nbytes', lambda: int(result.memory_usage(index=True, deep=True).sum())
+        )
+    if isinstance(result, (pd.Series, pd.Index)):
+        return int(result.memory_usage(deep=True))
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, dict):
+        return sys.getsizeof(result) + sum(result_nbytes(key) + result_nbytes(value) for key, value in result.items())
+    if isinstance(result, (list, tuple)):
+        return sys.getsizeof(result) + sum(result_nbytes(value) for value in result)
+    return sys.getsizeof(result)
+
+
+class NodeResultCache:
+    """
+    LRU cache of workflow node results shared by all runs, so re-running a
+    pipeline after changing its last node reuses the unchanged prefix
+    (the cleaned frame, ...) instead of recomputing it.
+
+    Bounded by max_entries and by the memory its results hold: at most
+    max_bytes, and never more than the dataset cache's budget has left
+    (see DatasetCache.add_dependent). A result that does not fit is not kept.
+
+    Cached DataFrames are shared between runs and must be treated as read-only,
+    like those of the dataset cache.
+    """
+    def __init__(self, max_entries: int = WORKFLOW_NODE_CACHE_SIZE,
+                 max_bytes: int = WORKFLOW_NODE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (result, nbytes), oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        """Returns (True, result) on a hit and (False, None) on a miss."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return True, self._entries[key][0]
+
+    def put(self, key: str, result):
+        if self.max_entries <= 0:
+            return
+        nbytes = result_nbytes(result)
+        # Read before taking our lock: the dataset cache calls shrink_to under its own
+        max_bytes = min(self.max_bytes, dataset_cache.available_bytes())
+        if nbytes > max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result, nbytes)
+            self._total_bytes += nbytes
+            self._evict(max_bytes)
+
+    def shrink_to(self, max_bytes: int):
+        """Evicts least recently used results until at most max_bytes are held."""
+        with self._lock:
+            self._evict(max_bytes)
+
+    def _evict(self, max_bytes: int):
+        while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > max_bytes):
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._total_bytes -= nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "totalBytes": self._total_bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Shared by every WorkflowExecutor in this process
+node_result_cache = NodeResultCache()
+dataset_cache.add_dependent(node_result_cache)
@@ -1,23 +1,17 @@
-import pandas as pd
 from ..node_base import NodeBase  # <-- THIS LINE IS FIXED (uses '..')
 
 # --- This import is tricky. 'app.analysis_utils' is correct ---
 # We go up two levels ('..') from 'nodes' to 'core', then one more ('...') to 'app'
 # But 'app' is our main package, so we import from the top-level 'app' module.
-from app.analysis_utils import (  # <-- THIS LINE IS FIXED
-    get_kpis,
-    get_actionable_insights,
-    get_data_dictionary,
-    get_column_distribution,
-    get_time_series_data,
-    get_table_data,
-    get_data_health,
-    get_correlation_matrix
-)
+from app.analysis_utils import get_dashboard_data  # <-- THIS LINE IS FIXED
+from app.forecasting import is_provisional
+from app.out_of_core import OutOfCoreDataset, get_out_of_core_dashboard, spill_chunks
 
 class AnalyzeDataNode(NodeBase):
-    def __init__(self, node_id: str, node_type: str):
-        super().__init__(node_id, node_type)
+    supports_stream = True
+
+    def __init__(self, node_id: str, node_type: str, config: dict = None):
+        super().__init__(node_id, node_type, config)
 
     def execute(self, inputs: dict) -> dict:
         input_df = inputs.get('input_1')
@@ -27,25 +21,32 @@ class AnalyzeDataNode(NodeBase):
         
         print(f"[{self.node_id}] Running full analysis...")
 
-        kpis = get_kpis(input_df)
-        correlation_result = get_correlation_matrix(input_df)
-        insights = get_actionable_insights(input_df, kpis, correlation_result['matrix'])
-        time_series_result = get_time_series_data(input_df, target_column=None)
-        column_dist_result = get_column_distribution(input_df, target_column=None)
-
-        response_data = {
-            "kpiData": kpis,
-            "insights": insights,
-            "dictionary": get_data_dictionary(input_df),
-            "columnDist": column_dist_result,
-            "timeSeries": time_series_result,
-            "tableData": get_table_data(input_df),
-            "dataHealth": get_data_health(input_df),
-            "correlationMatrix": {
-                "columns": correlation_result['columns'],
-                "data": correlation_result['data']
-            }
-        }
+        response_data = get_dashboard_data(input_df)
         
         self.data = response_data
-        return self.data
\ No newline at end of file
+        return self.data
+
+    def result_cacheable(self, result) -> bool:
+        # A fallback forecast is replaced once the configured model is fitted
+        return not is_provisional(None, result.get('timeSeries', {}).get('forecastModel'))
+
+    def execute_stream(self, inputs: dict) -> dict:
+        """
+        Folds the stream into a temporary memory-mapped Arrow file, one chunk at
+        a time, and analyzes it like an out-of-core upload: counts, correlations
+        and duplicates are accumulated batch by batch, quartiles come from a
+        reservoir sample (see the "approximation" section).
+        """
+        input_stream = inputs.get('input_1')
+
+        if input_stream is None:
+            raise ValueError(f"[{self.node_id}] No input DataFrame provided.")
+
+        print(f"[{self.node_id}] Running streaming analysis...")
+
+        path = spill_chunks(input_stream, f"workflow-{self.node_id}")
+        try:
+            self.data = get_out_of_core_dashboard(OutOfCoreDataset(self.node_id, path.name, path))
+        finally:
+            path.unlink(missing_ok=True)
+        return self.data
@@ -1,9 +1,14 @@
 import pandas as pd
 from ..node_base import NodeBase  # <-- THIS LINE IS FIXED (uses '..')
+from app.row_hashing import SeenRowHashes, drop_duplicates_hashed, row_hashes
+from ..streaming import ChunkStream
 
 class CleanDataNode(NodeBase):
-    def __init__(self, node_id: str, node_type: str):
-        super().__init__(node_id, node_type)
+    supports_plan = True
+    supports_stream = True
+
+    def __init__(self, node_id: str, node_type: str, config: dict = None):
+        super().__init__(node_id, node_type, config)
 
     def execute(self, inputs: dict) -> pd.DataFrame:
         input_df = inputs.get('input_1')
@@ -13,8 +18,33 @@ class CleanDataNode(NodeBase):
         
         print(f"[{self.node_id}] Cleaning data. Shape before: {input_df.shape}")
         
-        self.data = input_df.drop_duplicates()
+        # Hash-based: reuses row hashes already computed for this frame (e.g. by the
+        # analysis profile) and leaves them cached for the de-duplicated result
+        self.data = drop_duplicates_hashed(input_df)
         
         print(f"[{self.node_id}] Cleaning data. Shape after: {self.data.shape}")
         
-        return self.data
\ No newline at end of file
+        return self.data
+
+    def plan(self, inputs: dict):
+        return inputs['input_1'].distinct()
+
+    def execute_stream(self, inputs: dict):
+        """Drops repeated rows chunk by chunk, remembering the hash of every row kept so far."""
+        input_stream = inputs.get('input_1')
+
+        if input_stream is None:
+            raise ValueError(f"[{self.node_id}] No input DataFrame provided.")
+
+        def _distinct_chunks():
+            seen = SeenRowHashes()
+            rows_before = 0
+            for chunk in input_stream:
+                rows_before += len(chunk)
+                if len(chunk.columns) == 0:
+                    yield chunk
+                    continue
+                yield chunk[seen.first_seen(row_hashes(chunk))]
+            print(f"[{self.node_id}] Cleaned stream: {rows_before} rows -> {len(seen)} rows")
+
+        return ChunkStream(_distinct_chunks)
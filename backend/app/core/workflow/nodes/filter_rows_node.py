@@ -0,0 +1,42 @@
+import pandas as pd
+from ..node_base import NodeBase
+from app.table_query import filter_mask, parse_filters
+
+class FilterRowsNode(NodeBase):
+    """
+    Keeps the rows matching every filter in the node's 'filters' setting,
+    written like the table endpoint's: "column:operator:value" with operator
+    one of eq, ne, lt, le, gt, ge, contains.
+    """
+    supports_plan = True
+    supports_stream = True
+
+    def __init__(self, node_id: str, node_type: str, config: dict = None):
+        super().__init__(node_id, node_type, config)
+
+    def _filters(self) -> tuple:
+        filters = parse_filters(self.config.get('filters'))
+        if not filters:
+            raise ValueError(f"[{self.node_id}] No filters configured.")
+        return filters
+
+    def _filter(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df[filter_mask(df, self._filters())]
+
+    def execute(self, inputs: dict) -> pd.DataFrame:
+        input_df = inputs.get('input_1')
+
+        if input_df is None:
+            raise ValueError(f"[{self.node_id}] No input DataFrame provided.")
+
+        self.data = self._filter(input_df)
+        print(f"[{self.node_id}] Filtered rows: {len(input_df)} -> {len(self.data)}")
+        return self.data
+
+    def plan(self, inputs: dict):
+        return inputs['input_1'].filter(self._filters())
+
+    def execute_stream(self, inputs: dict):
+        if inputs.get('input_1') is None:
+            raise ValueError(f"[{self.node_id}] No input DataFrame provided.")
+        return inputs['input_1'].map(self._filter)
@@ -1,26 +1,85 @@
 import pandas as pd
 import io
+from pathlib import Path
 from ..node_base import NodeBase
-from app.analysis_utils import read_uploaded_file_to_df # <-- 1. IMPORT NEW HELPER
+from app.dataset_cache import dataset_cache # <-- 1. PARSED UPLOADS ARE SHARED VIA THE DATASET CACHE
+from app.out_of_core import OUT_OF_CORE_EXTENSIONS, iter_upload_chunks
+from ..plan import LazyFrame, ScanSource
+from ..streaming import ChunkStream
 
 class LoadCSVNode(NodeBase):
-    def __init__(self, node_id: str, node_type: str):
-        super().__init__(node_id, node_type)
+    # Parsed uploads already live in the dataset cache, under its memory budget
+    cacheable = False
+    supports_plan = True
+    supports_stream = True
+
+    def __init__(self, node_id: str, node_type: str, config: dict = None):
+        super().__init__(node_id, node_type, config)
 
     def execute(self, inputs: dict) -> pd.DataFrame:
         """
         Reads the user's uploaded file contents into a pandas DataFrame.
+
+        If the upload was already parsed (by /api/v1/analyze, /api/v1/chat or an
+        earlier run) the cached DataFrame is reused instead of parsing again.
         """
         file_contents = inputs.get('file_contents')
         file_name = inputs.get('file_name') # <-- 2. GET THE FILENAME
-        
+        dataset_id = inputs.get('dataset_id')
+
+        entry = dataset_cache.get(dataset_id) if dataset_id else None
+        if entry is not None:
+            print(f"[{self.node_id}] Using cached dataset {dataset_id[:12]} ({entry.file_name}).")
+            self.data = entry.df
+            return self.data
+
         if file_contents is None or file_name is None:
             raise ValueError(f"[{self.node_id}] No file contents or filename provided for Load node.")
         
         print(f"[{self.node_id}] Loading data from user-uploaded file: {file_name}...")
         
         # --- 3. THIS IS THE CHANGE ---
-        self.data = read_uploaded_file_to_df(file_contents, file_name)
+        self.data = dataset_cache.get_or_load(file_contents, file_name).df
         # --- END OF CHANGE ---
             
-        return self.data
\ No newline at end of file
+        return self.data
+
+    def plan(self, inputs: dict):
+        """
+        Starts a lazy plan. An upload that is already parsed is scanned from the
+        dataset cache; otherwise the file is read later, and only the columns
+        and rows the rest of the plan needs.
+        """
+        dataset_id = inputs.get('dataset_id')
+        entry = dataset_cache.get(dataset_id) if dataset_id else None
+        if entry is not None:
+            return LazyFrame(ScanSource(df=entry.df))
+
+        if inputs.get('file_contents') is None or inputs.get('file_name') is None:
+            raise ValueError(f"[{self.node_id}] No file contents or filename provided for Load node.")
+        return LazyFrame(ScanSource(file_contents=inputs['file_contents'], file_name=inputs['file_name']))
+
+    def execute_stream(self, inputs: dict):
+        """
+        Streams the upload in chunks. CSV, Parquet, Feather and Arrow files are
+        read batch by batch and never parsed whole; other formats, and uploads
+        already in the dataset cache, are sliced from the parsed DataFrame.
+        """
+        file_contents = inputs.get('file_contents')
+        file_name = inputs.get('file_name')
+        dataset_id = inputs.get('dataset_id')
+
+        entry = dataset_cache.get(dataset_id) if dataset_id else None
+        if entry is not None:
+            print(f"[{self.node_id}] Streaming cached dataset {dataset_id[:12]} ({entry.file_name}).")
+            return ChunkStream.of(entry.df)
+
+        if file_contents is None or file_name is None:
+            raise ValueError(f"[{self.node_id}] No file contents or filename provided for Load node.")
+
+        if Path(file_name).suffix.lower() not in OUT_OF_CORE_EXTENSIONS:
+            return ChunkStream.of(dataset_cache.get_or_load(file_contents, file_name).df)
+        print(f"[{self.node_id}] Streaming data from user-uploaded file: {file_name}...")
+        # Every consumer re-opens the stream, possibly on its own node thread;
+        # iter_upload_chunks opens a reader with its own position each time
+        return ChunkStream(lambda: iter_upload_chunks(file_contents, file_name))
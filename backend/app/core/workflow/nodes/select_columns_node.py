@@ -0,0 +1,41 @@
+import pandas as pd
+from ..node_base import NodeBase
+
+class SelectColumnsNode(NodeBase):
+    """Keeps only the columns listed in the node's 'columns' setting, in that order."""
+    supports_plan = True
+    supports_stream = True
+
+    def __init__(self, node_id: str, node_type: str, config: dict = None):
+        super().__init__(node_id, node_type, config)
+
+    def _columns(self) -> list:
+        columns = self.config.get('columns')
+        if not columns:
+            raise ValueError(f"[{self.node_id}] No columns selected.")
+        return list(columns)
+
+    def _select(self, df: pd.DataFrame) -> pd.DataFrame:
+        columns = self._columns()
+        for column in columns:
+            if column not in df.columns:
+                raise ValueError(f"Column '{column}' not found in file.")
+        return df[columns]
+
+    def execute(self, inputs: dict) -> pd.DataFrame:
+        input_df = inputs.get('input_1')
+
+        if input_df is None:
+            raise ValueError(f"[{self.node_id}] No input DataFrame provided.")
+
+        self.data = self._select(input_df)
+        print(f"[{self.node_id}] Selected {len(self.data.columns)} of {len(input_df.columns)} columns.")
+        return self.data
+
+    def plan(self, inputs: dict):
+        return inputs['input_1'].select(self._columns())
+
+    def execute_stream(self, inputs: dict):
+        if inputs.get('input_1') is None:
+            raise ValueError(f"[{self.node_id}] No input DataFrame provided.")
+        return inputs['input_1'].map(self._select)
@@ -0,0 +1,163 @@
+import threading
+
+import pandas as pd
+
+from app.analysis_utils import read_uploaded_file_to_df
+from app.ingest import open_binary_source
+from app.row_hashing import drop_duplicates_hashed
+from app.table_query import filter_mask
+
+# Filter operators the Parquet reader can use to skip row groups. 'ne' is left
+# out: pyarrow drops missing values for it, while filter_mask keeps NaN rows.
+_PARQUET_OPERATORS = {'eq': '==', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>='}
+
+
+class ScanSource:
+    """Where a plan's rows come from: an already-parsed DataFrame or an upload not parsed yet."""
+    def __init__(self, df: pd.DataFrame = None, file_contents=None, file_name: str = None):
+        self.df = df
+        self.file_contents = file_contents
+        self.file_name = file_name
+
+    def describe(self) -> str:
+        return "cached frame" if self.df is not None else self.file_name
+
+    def read(self, columns: list = None, filters: tuple = ()) -> pd.DataFrame:
+        """The source restricted to 'columns' (all when None); 'filters' may let the reader skip rows."""
+        if self.df is not None:
+            if columns is None:
+                return self.df
+            for column in columns:
+                if column not in self.df.columns:
+                    raise ValueError(f"Column '{column}' not found in file.")
+            return self.df[columns]
+        return read_uploaded_file_to_df(self.file_contents, self.file_name, columns=columns,
+                                        row_filters=self._parquet_filters(filters))
+
+    def _parquet_filters(self, filters: tuple) -> list:
+        """The filters the Parquet reader can use, with values typed like their column."""
+        if not filters or not self.file_name.lower().endswith('.parquet'):
+            return None
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pq.read_schema(open_binary_source(self.file_contents))
+        pushed = []
+        for column, op, value in filters:
+            if op not in _PARQUET_OPERATORS or column not in schema.names:
+                continue
+            field_type = schema.field(column).type
+            if pa.types.is_integer(field_type) or pa.types.is_floating(field_type):
+                try:
+                    typed = float(value)
+                except ValueError:
+                    continue
+            elif pa.types.is_string(field_type) or pa.types.is_large_string(field_type):
+                typed = value
+            else:
+                continue  # Booleans, dates, ...: filtered after reading only
+            pushed.append((column, _PARQUET_OPERATORS[op], typed))
+        return pushed or None
+
+
+class LazyFrame:
+    """
+    A workflow result that has not been computed yet: a scan followed by
+    row-wise steps ('select', 'filter', 'distinct'). Nodes in a compiled run
+    pass these along instead of DataFrames; the plan is optimized and run
+    once, when a node that needs real data (a sink such as analyze_data)
+    asks for it with collect().
+    """
+    def __init__(self, source: ScanSource, steps: tuple = ()):
+        self.source = source
+        self.steps = steps
+        self._result = None
+        self._lock = threading.Lock()
+
+    # --- Building ---
+    def select(self, columns: list) -> 'LazyFrame':
+        return LazyFrame(self.source, self.steps + (('select', tuple(columns)),))
+
+    def filter(self, filters: tuple) -> 'LazyFrame':
+        return LazyFrame(self.source, self.steps + (('filter', tuple(filters)),))
+
+    def distinct(self) -> 'LazyFrame':
+        return LazyFrame(self.source, self.steps + (('distinct',),))
+
+    # --- Optimizing ---
+    def optimize(self) -> tuple:
+        """
+        Returns (scan_columns, filters, steps), the plan to actually run:
+
+        - every filter moves to the scan, fused into one mask: filters only
+          look at single rows, so they commute with column selection and with
+          removing duplicate rows (duplicates match or fail together);
+        - the scan reads only the columns of the first selection plus the
+          ones filters need, unless a 'distinct' runs first and needs them all;
+        - consecutive selections fuse into the last one.
+        """
+        filters = []
+        steps = []
+        scan_columns = None
+        visible = None  # Columns available at this point of the plan, when known
+        seen_distinct = False
+        for step in self.steps:
+            if step[0] == 'filter':
+                for column, _, _ in step[1]:
+                    if visible is not None and column not in visible:
+                        raise ValueError(f"Column '{column}' not found in file.")
+                filters.extend(step[1])
+            elif step[0] == 'select':
+                columns = list(step[1])
+                if visible is not None:
+                    for column in columns:
+                        if column not in visible:
+                            raise ValueError(f"Column '{column}' not found in file.")
+                elif not seen_distinct:
+                    scan_columns = columns
+                visible = set(columns)
+                if steps and steps[-1][0] == 'select':
+                    steps.pop()
+                steps.append(('select', columns))
+            else:
+                seen_distinct = True
+                steps.append(step)
+
+        if scan_columns is not None:
+            extra = [column for column, _, _ in filters if column not in scan_columns]
+            scan_columns = scan_columns + list(dict.fromkeys(extra))
+        return scan_columns, tuple(filters), steps
+
+    def explain(self) -> str:
+        scan_columns, filters, steps = self.optimize()
+        parts = [f"scan {self.source.describe()} columns={scan_columns or 'all'}"]
+        if filters:
+            parts.append("filter " + " and ".join(f"{c} {op} {v!r}" for c, op, v in filters))
+        parts.extend(f"select {step[1]}" if step[0] == 'select' else step[0] for step in steps)
+        return " -> ".join(parts)
+
+    # --- Running ---
+    @property
+    def collected(self):
+        """The DataFrame from collect(), or None while the plan has not run."""
+        return self._result
+
+    def collect(self) -> pd.DataFrame:
+        """Runs the optimized plan; the result is kept, so several sinks share one run."""
+        with self._lock:
+            if self._result is None:
+                print(f"Plan: {self.explain()}")
+                self._result = self._run()
+            return self._result
+
+    def _run(self) -> pd.DataFrame:
+        scan_columns, filters, steps = self.optimize()
+        df = self.source.read(scan_columns, filters)
+        if filters:
+            df = df[filter_mask(df, filters)]
+        for step in steps:
+            if step[0] == 'select':
+                df = df[step[1]]
+            else:
+                df = drop_duplicates_hashed(df)
+        return df
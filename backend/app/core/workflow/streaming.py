@@ -0,0 +1,41 @@
+import pandas as pd
+
+from app.config import OUT_OF_CORE_BATCH_ROWS
+
+
+class ChunkStream:
+    """
+    A workflow result in streaming mode: a recipe for the result's rows as a
+    sequence of DataFrame chunks with the same columns and dtypes.
+
+    Nothing runs until the stream is iterated, and each iteration runs the
+    producing nodes again from the source, one chunk at a time. So a chain
+    like load -> clean -> analyze keeps a single chunk in flight, and a
+    stream read by two nodes is produced twice instead of being buffered.
+    """
+    def __init__(self, open_chunks):
+        self._open_chunks = open_chunks  # () -> iterator of DataFrames
+
+    def __iter__(self):
+        return iter(self._open_chunks())
+
+    @classmethod
+    def of(cls, df: pd.DataFrame, chunk_rows: int = OUT_OF_CORE_BATCH_ROWS) -> 'ChunkStream':
+        """A stream over a DataFrame that is already in memory, in slices of chunk_rows."""
+        def _slices():
+            if len(df) == 0:
+                yield df
+            for start in range(0, len(df), chunk_rows):
+                yield df.iloc[start:start + chunk_rows]
+        return cls(_slices)
+
+    def map(self, transform) -> 'ChunkStream':
+        """A stream of transform(chunk) for every chunk of this one."""
+        return ChunkStream(lambda: (transform(chunk) for chunk in self))
+
+    def collect(self) -> pd.DataFrame:
+        """The whole stream as one DataFrame (what whole-frame nodes are given)."""
+        chunks = list(self)
+        if len(chunks) == 1:
+            return chunks[0]
+        return pd.concat(chunks)
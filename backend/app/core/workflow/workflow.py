@@ -1,16 +1,72 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
 import networkx as nx
 import pandas as pd
 from ..registry import get_node_class  # Import from parent 'core' directory (go up one level with ..)
-from fastapi.encoders import jsonable_encoder
-import json
+
+from app.config import WORKFLOW_COPY_ON_WRITE, WORKFLOW_MAX_WORKERS
+from app.dataset_cache import DatasetCache
+from app.metrics import record_stage, workflow_peak_memory
+from .node_cache import node_cache_key, node_config, node_result_cache, result_nbytes
+from .plan import LazyFrame
+from .streaming import ChunkStream
+
+# Runs the independent branches of a workflow; shared by all workflows
+# so the total number of node threads stays bounded. Threads rather than
+# processes: node inputs and outputs are DataFrames that would otherwise be
+# pickled across process boundaries, and pandas/NumPy release the GIL in their
+# heavy loops.
+_node_pool = ThreadPoolExecutor(max_workers=max(WORKFLOW_MAX_WORKERS, 1), thread_name_prefix="workflow-node")
+
+# With copy-on-write, column selections and other pass-through results share
+# their parent's buffers instead of copying them. Always on from pandas 3.
+if WORKFLOW_COPY_ON_WRITE and int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+def _result_bytes(result) -> int:
+    """Memory held by a node result (see result_nbytes)."""
+    if isinstance(result, LazyFrame):
+        result = result.collected
+    return result_nbytes(result)
+
+
+class WorkflowCancelled(Exception):
+    """Raised by run() when its cancel_event was set before every node had started."""
+
 
 class WorkflowExecutor:
-    def __init__(self, nodes: list, edges: list, file_contents: bytes, file_name: str): # <-- 1. ADD file_name
+    def __init__(self, nodes: list, edges: list, file_contents: bytes, file_name: str, dataset_id: str = None, # <-- 1. ADD file_name
+                 compiled: bool = False, streaming: bool = False, on_event=None, cancel_event=None,
+                 keep_frames: bool = False):
         self.graph = self._build_graph(nodes, edges)
         self.node_instances = self._instantiate_nodes(nodes)
         self.file_contents = file_contents
         self.file_name = file_name # <-- 2. STORE file_name
+        self.dataset_id = dataset_id # Lets load nodes reuse an already-parsed upload
+        # Compiled mode: nodes that support it build a lazy plan, which is optimized
+        # and run only when a node that needs a DataFrame (e.g. analyze_data) reads it
+        self.compiled = compiled
+        # Streaming mode: results flow as chunk streams (execute_stream), so only
+        # a chunk at a time is in memory; takes precedence over compiled mode
+        self.streaming = streaming
+        # Called with a dict for every node started/finished/failed; may be called from node threads
+        self.on_event = on_event
+        # threading.Event checked before each node starts (background jobs set it to cancel)
+        self.cancel_event = cancel_event
+        # Leave DataFrame results of nodes without children as DataFrames (for Arrow responses)
+        self.keep_frames = keep_frames
+        self.node_configs = {node['id']: node_config(node.get('data')) for node in nodes}
         self.execution_results = {}
+        self.sink_results = {} # Encoded (JSON-ready) result of every node without children
+        # Nodes still to read each result; intermediates are freed when this reaches 0
+        self._consumers_left = {node_id: self.graph.out_degree(node_id) for node_id in self.graph.nodes}
+        self.peak_memory_bytes = 0 # Largest total size of the results held at once during run()
+        self.cache_hits = [] # Ids of the nodes whose result came from the node result cache
+        self._cache_hit_ids = set()
+        self._node_keys = {}
 
     # ... (Your _build_graph and _instantiate_nodes functions are unchanged) ...
     def _build_graph(self, nodes: list, edges: list) -> nx.DiGraph:
@@ -35,51 +91,253 @@ class WorkflowExecutor:
                  raise ValueError(f"Node {node_id} is missing 'node_type' in 'data' field.")
             
             node_class = get_node_class(node_type)
-            instances[node_id] = node_class(node_id=node_id, node_type=node_type)
+            instances[node_id] = node_class(node_id=node_id, node_type=node_type,
+                                            config=node_config(node_data.get('data')))
         return instances
 
 
-    def run(self) -> str:
-        execution_order = list(nx.topological_sort(self.graph))
-        
-        print(f"Execution order: {execution_order}")
+    def _inputs_for(self, node_id: str) -> dict:
+        node_instance = self.node_instances[node_id]
+        inputs_for_this_node = {}
+
+        if node_instance.node_type == 'load_csv':
+            if self.file_contents is None and self.dataset_id is None:
+                raise ValueError("Workflow started but no file was provided.")
+            inputs_for_this_node['file_contents'] = self.file_contents
+            inputs_for_this_node['file_name'] = self.file_name # <-- 3. PASS file_name
+            inputs_for_this_node['dataset_id'] = self.dataset_id
+        else:
+            # Handle both 'input' and 'input_1' handle IDs for compatibility
+            # ('input' is mapped to 'input_1' for backend compatibility)
+            for input_handle_id, parent_id in self._input_handles(node_id):
+                inputs_for_this_node[input_handle_id] = self.execution_results.get(parent_id)
+        return inputs_for_this_node
+
+    def _input_handles(self, node_id: str):
+        """Yields (input handle, parent id) pairs, as they are passed to execute()."""
+        for parent_id in self.graph.predecessors(node_id):
+            edge_data = self.graph.get_edge_data(parent_id, node_id)
+            target_handle = edge_data.get('targetHandle', 'input')
+            yield ('input_1' if target_handle == 'input' else target_handle), parent_id
 
+    def _compute_node_keys(self, execution_order: list):
+        """Result-cache key of every node, from its type, config and upstream keys."""
         for node_id in execution_order:
             node_instance = self.node_instances[node_id]
-            inputs_for_this_node = {}
-
             if node_instance.node_type == 'load_csv':
-                if self.file_contents is None:
-                    raise ValueError("Workflow started but no file was provided.")
-                inputs_for_this_node['file_contents'] = self.file_contents
-                inputs_for_this_node['file_name'] = self.file_name # <-- 3. PASS file_name
+                dataset_id = self.dataset_id
+                if dataset_id is None and self.file_contents is not None:
+                    dataset_id = DatasetCache.compute_id(self.file_contents, self.file_name)
+                upstream = {"dataset": dataset_id}
+                if self.streaming:
+                    # Streaming sinks return different (partly sampled) reports
+                    upstream["streaming"] = True
             else:
-                parent_node_ids = list(self.graph.predecessors(node_id))
-                
-                for parent_id in parent_node_ids:
-                    edge_data = self.graph.get_edge_data(parent_id, node_id)
-                    parent_result = self.execution_results.get(parent_id)
-                    # Handle both 'input' and 'input_1' handle IDs for compatibility
-                    target_handle = edge_data.get('targetHandle', 'input')
-                    # Map 'input' to 'input_1' for backend compatibility
-                    input_handle_id = 'input_1' if target_handle == 'input' else target_handle
-                    inputs_for_this_node[input_handle_id] = parent_result
-
-            print(f"--- Executing Node: {node_instance.node_type} ({node_id}) ---")
-            result = node_instance.execute(inputs_for_this_node)
-            
-            self.execution_results[node_id] = result
+                upstream = {handle: self._node_keys[parent_id] for handle, parent_id in self._input_handles(node_id)}
+            self._node_keys[node_id] = node_cache_key(node_instance.node_type, self.node_configs.get(node_id), upstream)
 
-        final_result = self.execution_results.get(execution_order[-1])
-        
-        if isinstance(final_result, dict):
-            print("Final result is a dict, using jsonable_encoder...")
-            encoded_result = jsonable_encoder(final_result)
-            return json.dumps(encoded_result)
-
-        if isinstance(final_result, pd.DataFrame):
-            print("Final result is a DataFrame, using pandas .to_json()...")
-            return final_result.to_json(orient='records')
+    def _execute_node(self, node_id: str, inputs: dict):
+        node_instance = self.node_instances[node_id]
+        if self.compiled and not self.streaming and node_instance.supports_plan:
+            print(f"--- Planning Node: {node_instance.node_type} ({node_id}) ---")
+            return node_instance.plan(inputs)
+
+        key = self._node_keys.get(node_id)
+        if key is not None and node_instance.cacheable:
+            hit, result = node_result_cache.get(key)
+            if hit:
+                print(f"--- Reusing cached result: {node_instance.node_type} ({node_id}) ---")
+                node_instance.data = result
+                self._cache_hit_ids.add(node_id)
+                return result
+
+        print(f"--- Executing Node: {node_instance.node_type} ({node_id}) ---")
+        if self.streaming:
+            result = node_instance.execute_stream(inputs)
+        else:
+            # Nodes outside the plan get real DataFrames
+            inputs = {handle: value.collect() if isinstance(value, LazyFrame) else value
+                      for handle, value in inputs.items()}
+            result = node_instance.execute(inputs)
+        # A stream only describes how to produce rows; there is nothing to keep
+        if (key is not None and node_instance.cacheable and not isinstance(result, ChunkStream)
+                and node_instance.result_cacheable(result)):
+            node_result_cache.put(key, result)
+        return result
+
+    @staticmethod
+    def _encode_result(result, keep_frames: bool = False):
+        """
+        A node's output as JSON-ready Python values. The response layer
+        (app.serialization) writes them once, NumPy values included, so the
+        client gets nested JSON rather than a JSON string inside JSON.
+        With keep_frames, DataFrames are returned as they are.
+        """
+        if isinstance(result, (LazyFrame, ChunkStream)):
+            result = result.collect()
+
+        if isinstance(result, dict):
+            return result
+
+        if isinstance(result, pd.DataFrame):
+            return result if keep_frames else WorkflowExecutor._frame_records(result)
+
+        return result
+
+    @staticmethod
+    def _frame_records(df: pd.DataFrame) -> list:
+        """
+        df as a list of row dicts in pandas' records format (string keys,
+        epoch-millisecond dates, missing values as null), built column by
+        column in one pass rather than through a JSON round trip.
+        """
+        names = [str(name) for name in df.columns]
+        if not names:
+            return [{} for _ in range(len(df))]
+        columns = []
+        for _, column in df.items():
+            if column.dtype.kind == 'M':
+                if getattr(column.dtype, 'tz', None) is not None:
+                    column = column.dt.tz_convert(None)
+                values = column.to_numpy(dtype='datetime64[ms]').view('int64').astype(object)
+            elif column.dtype.kind == 'm':
+                values = column.to_numpy(dtype='timedelta64[ms]').view('int64').astype(object)
+            else:
+                values = column.to_numpy(dtype=object)
+            missing = column.isna().to_numpy()
+            if missing.any():
+                values[missing] = None
+            columns.append(values)
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+    def _emit(self, event: str, node_id: str, **fields):
+        if self.on_event is not None:
+            node_type = self.node_instances[node_id].node_type
+            self.on_event({"event": event, "nodeId": node_id, "nodeType": node_type, **fields})
+
+    def _run_node(self, node_id: str, inputs: dict):
+        """
+        _execute_node plus progress events with timings and row counts. Results
+        of nodes without children are encoded here, on the node's thread, so
+        each sink's output is ready (and reported) as soon as that node ends.
+        """
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise WorkflowCancelled(f"Workflow cancelled before node {node_id} started.")
+        self._emit("started", node_id)
+        start = time.perf_counter()
+        try:
+            result = self._execute_node(node_id, inputs)
+            if self.graph.out_degree(node_id) == 0:
+                self.sink_results[node_id] = self._encode_result(result, self.keep_frames)
+        except Exception as e:
+            self._emit("failed", node_id, elapsedMs=round((time.perf_counter() - start) * 1000, 1), error=str(e))
+            raise
+
+        elapsed = time.perf_counter() - start
+        frame = result.collected if isinstance(result, LazyFrame) else result
+        record_stage(f"workflow.{self.node_instances[node_id].node_type}", elapsed, frame)
+        shape = frame.shape if isinstance(frame, pd.DataFrame) else (None, None)
+        finished = {
+            "elapsedMs": round(elapsed * 1000, 1),
+            "rows": shape[0],
+            "columns": shape[1],
+            "cached": node_id in self._cache_hit_ids,
+        }
+        if node_id in self.sink_results:
+            finished["result"] = self._encode_result(self.sink_results[node_id])
+        self._emit("finished", node_id, **finished)
+        return result
+
+    def _store_result(self, node_id: str, result):
+        """Keeps a node's result for its children and frees the inputs it no longer needs."""
+        self.execution_results[node_id] = result
+        # The node's inputs are still alive here; results shared by several nodes count once
+        live = {id(value): value for value in self.execution_results.values()}
+        self.peak_memory_bytes = max(self.peak_memory_bytes, sum(_result_bytes(value) for value in live.values()))
+
+        for parent_id in self.graph.predecessors(node_id):
+            self._consumers_left[parent_id] -= 1
+            if self._consumers_left[parent_id] == 0:
+                # Last reader has run: drop the executor's and the node's references
+                del self.execution_results[parent_id]
+                self.node_instances[parent_id].data = None
+
+    def _run_concurrently(self, execution_order: list):
+        """
+        Runs the graph on the node pool, starting each node as soon as all of
+        its parents have finished, so independent branches run side by side
+        and the run takes about as long as its slowest path.
+
+        Results are stored per node id, so they do not depend on completion
+        order. After a failure no new nodes are started; once the running ones
+        finish, the error of the failing node that comes first in
+        execution_order is raised.
+        """
+        position = {node_id: i for i, node_id in enumerate(execution_order)}
+        waiting_on = {node_id: self.graph.in_degree(node_id) for node_id in execution_order}
+        ready = [node_id for node_id in execution_order if waiting_on[node_id] == 0]
+        running = {}  # Future -> node id
+        errors = {}  # node id -> exception
+
+        while ready or running:
+            if not errors:
+                for node_id in ready:
+                    future = _node_pool.submit(contextvars.copy_context().run, self._run_node,
+                                               node_id, self._inputs_for(node_id))
+                    running[future] = node_id
+            ready = []
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: position[running[f]]):
+                node_id = running.pop(future)
+                if future.exception() is not None:
+                    errors[node_id] = future.exception()
+                    continue
+                self._store_result(node_id, future.result())
+                for child_id in self.graph.successors(node_id):
+                    waiting_on[child_id] -= 1
+                    if waiting_on[child_id] == 0:
+                        ready.append(child_id)
+            ready.sort(key=position.get)
+
+        if errors:
+            raise errors[min(errors, key=position.get)]
+
+    def run(self):
+        execution_order = list(nx.topological_sort(self.graph))
         
-        print(f"Final result is an unknown type: {type(final_result)}")
-        return json.dumps(jsonable_encoder(final_result))
\ No newline at end of file
+        print(f"Execution order: {execution_order}")
+        self._compute_node_keys(execution_order)
+
+        if WORKFLOW_MAX_WORKERS > 1 and len(execution_order) > 1:
+            self._run_concurrently(execution_order)
+        else:
+            for node_id in execution_order:
+                self._store_result(node_id, self._run_node(node_id, self._inputs_for(node_id)))
+
+        self.cache_hits = [node_id for node_id in execution_order if node_id in self._cache_hit_ids]
+        print(f"Workflow peak intermediate memory: {self.peak_memory_bytes:,} bytes")
+        workflow_peak_memory.observe(self.peak_memory_bytes)
+        # Sinks in execution order; the last node in that order is always one of them
+        self.sink_results = {node_id: self.sink_results[node_id]
+                             for node_id in execution_order if node_id in self.sink_results}
+        return self.sink_results[execution_order[-1]]
+
+    def summary(self, include_results: bool = True) -> dict:
+        """
+        The /workflow/run/ response for a finished run(): "result" is the id of
+        the sink run() returned, "results" the output of every sink by node id.
+        Without include_results the outputs are left out, for clients that
+        already got each one in its node's "finished" event.
+        """
+        summary = {"success": True, "result": next(reversed(self.sink_results))}
+        if include_results:
+            summary["results"] = {node_id: self._encode_result(value) for node_id, value in self.sink_results.items()}
+        return {
+            **summary,
+            "datasetId": self.dataset_id,
+            "cacheHits": self.cache_hits,
+            "peakMemoryBytes": self.peak_memory_bytes,
+        }
@@ -0,0 +1,173 @@
+# backend/app/dataset_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from app.analysis_utils import read_uploaded_file_to_df, detect_datetime_column
+from app.dtype_compaction import compact_dtypes
+from app.frame_memo import frame_memo
+from app.ingest import iter_source_chunks
+from app.config import DATASET_CACHE_MAX_BYTES, COMPACT_DTYPES
+
+
+class CachedDataset:
+    """A parsed upload held by the DatasetCache."""
+    def __init__(self, dataset_id: str, file_name: str, df: pd.DataFrame, nbytes: int):
+        self.dataset_id = dataset_id
+        self.file_name = file_name
+        self.df = df
+        self.nbytes = nbytes
+
+
+class DatasetCache:
+    """
+    Content-addressed cache of parsed DataFrames.
+
+    Uploads are keyed by a hash of their bytes (plus the file extension, since
+    that decides how they are parsed), so the analyze, workflow and chat
+    endpoints parse the same file only once. Entries are evicted in LRU order
+    once the total DataFrame memory exceeds max_bytes.
+
+    Cached frames are shared between requests and must be treated as read-only.
+    """
+    def __init__(self, max_bytes: int = DATASET_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # dataset_id -> CachedDataset, oldest first
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self._load_locks = {}  # dataset_id -> Lock, so one upload is parsed once
+        self._dependents = []  # Caches of results derived from datasets, sharing max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def compute_id(file_contents, file_name: str, **read_options) -> str:
+        """
+        Returns the dataset id for an upload: a hash of its extension, any
+        non-default read options (e.g. the Excel sheet) and its bytes.
+
+        'file_contents' may be bytes or a binary file; files are hashed chunk by
+        chunk so a large spooled upload is never read into memory at once.
+        """
+        digest = hashlib.sha256()
+        digest.update(Path(file_name).suffix.lower().encode('utf-8'))
+        for key, value in sorted(read_options.items()):
+            if value is not None:
+                digest.update(f'|{key}={value}'.encode('utf-8'))
+        digest.update(b'\0')
+        for chunk in iter_source_chunks(file_contents):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def get(self, dataset_id: str):
+        """Returns the CachedDataset for dataset_id, or None if it is not cached."""
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is not None:
+                self._entries.move_to_end(dataset_id)
+                self.hits += 1
+            return entry
+
+    def get_or_load(self, file_contents, file_name: str, **read_options) -> CachedDataset:
+        """
+        Returns the cached dataset for this upload, parsing it on a miss.
+        'file_contents' may be bytes or a binary file object; read_options
+        (e.g. sheet_name) are passed on to read_uploaded_file_to_df, except
+        compact_dtypes, which runs app.dtype_compaction on the parsed frame
+        (None means the COMPACT_DTYPES setting). Compacted and plain loads
+        of one upload are cached separately.
+        """
+        compact = read_options.pop('compact_dtypes', None)
+        if compact is None:
+            compact = COMPACT_DTYPES
+        read_options = {key: value for key, value in read_options.items() if value is not None}
+        dataset_id = self.compute_id(file_contents, file_name, compact_dtypes=compact or None, **read_options)
+
+        with self._lock:
+            entry = self.get(dataset_id)
+            if entry is not None:
+                return entry
+            load_lock = self._load_locks.setdefault(dataset_id, threading.Lock())
+
+        try:
+            with load_lock:
+                # Another request may have parsed the same upload while we waited
+                entry = self.get(dataset_id)
+                if entry is not None:
+                    return entry
+
+                df = read_uploaded_file_to_df(file_contents, file_name, **read_options)
+                if compact:
+                    df = self._compact(df)
+                entry = CachedDataset(
+                    dataset_id=dataset_id,
+                    file_name=file_name,
+                    df=df,
+                    nbytes=int(df.memory_usage(index=True, deep=True).sum())
+                )
+                # Workflow memory accounting reads the same figure
+                frame_memo.set(df, 'nbytes', entry.nbytes)
+
+                with self._lock:
+                    self.misses += 1
+                    self._entries[dataset_id] = entry
+                    self._total_bytes += entry.nbytes
+                    self._evict()
+        finally:
+            # Also after a failed parse, so the lock does not outlive the request
+            with self._lock:
+                if self._load_locks.get(dataset_id) is load_lock:
+                    del self._load_locks[dataset_id]
+
+        print(f"Dataset cache: parsed '{file_name}' as {dataset_id[:12]} "
+              f"({entry.nbytes:,} bytes, {len(self._entries)} cached)")
+        return entry
+
+    @staticmethod
+    def _compact(df: pd.DataFrame) -> pd.DataFrame:
+        # The time-series column stays text so it is parsed the same way as before
+        date_column, _ = detect_datetime_column(df)
+        compacted, report = compact_dtypes(df, skip_columns=(date_column,) if date_column is not None else ())
+        frame_memo.set(compacted, 'compaction_report', report)
+        print(f"Dataset cache: compacted dtypes from {report['bytesBefore']:,} "
+              f"to {report['bytesAfter']:,} bytes ({len(report['columns'])} columns changed)")
+        return compacted
+
+    def add_dependent(self, cache):
+        """
+        Makes 'cache' (e.g. the workflow node result cache) share this cache's
+        memory budget. It needs a shrink_to(max_bytes) method; parsed datasets
+        take precedence, so dependents shrink first when the budget runs out.
+        """
+        self._dependents.append(cache)
+
+    def available_bytes(self) -> int:
+        """Budget left after the cached datasets, for dependent caches."""
+        with self._lock:
+            return max(self.max_bytes - self._total_bytes, 0)
+
+    def _evict(self):
+        for dependent in self._dependents:
+            dependent.shrink_to(max(self.max_bytes - self._total_bytes, 0))
+        # Drop least recently used entries until we fit, always keeping the newest one
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._total_bytes -= evicted.nbytes
+            print(f"Dataset cache: evicted {evicted.dataset_id[:12]} ({evicted.file_name})")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "totalBytes": self._total_bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Shared by every endpoint and workflow node in this process
+dataset_cache = DatasetCache()
@@ -0,0 +1,210 @@
+# backend/app/dataset_profile.py
+import math
+from functools import cached_property
+
+import pandas as pd
+from pandas.api.types import (
+    is_bool_dtype,
+    is_numeric_dtype,
+    is_string_dtype,
+    CategoricalDtype,
+)
+
+from app.config import APPROXIMATE_SAMPLE_SIZE, HLL_PRECISION, COUNT_MIN_WIDTH, COUNT_MIN_DEPTH
+from app.frame_memo import frame_memo
+from app.row_hashing import column_hashes, count_duplicates
+from app import sketches
+
+
+def is_numeric_column(dtype) -> bool:
+    """Numeric in the np.number sense: ints and floats (NumPy, nullable or Arrow), not bools."""
+    return is_numeric_dtype(dtype) and not is_bool_dtype(dtype)
+
+
+def is_categorical_column(dtype) -> bool:
+    """Text-like columns: object, string (any backend) and category."""
+    return is_string_dtype(dtype) or isinstance(dtype, CategoricalDtype)
+
+
+class DatasetProfile:
+    """
+    Column-level facts about a DataFrame, computed in one sweep.
+
+    get_kpis, get_data_health, get_data_dictionary and friends used to run
+    their own isnull()/duplicated()/select_dtypes() scans over the same frame.
+    Build one profile per frame and pass it to them instead; each function
+    then only formats numbers that were already computed.
+    """
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+        self.n_rows = len(df)
+        self.n_cols = len(df.columns)
+        self.total_cells = self.n_rows * self.n_cols
+        self.columns = list(df.columns)
+        self.dtypes = df.dtypes
+
+        # One vectorized null scan over every block instead of one per caller
+        self.null_counts = df.isna().sum()
+        self.missing_values = int(self.null_counts.sum())
+        self.duplicate_count = self._count_duplicates(df)
+
+        self.numeric_columns = [col for col, dtype in self.dtypes.items() if is_numeric_column(dtype)]
+        self.categorical_columns = [col for col, dtype in self.dtypes.items() if is_categorical_column(dtype)]
+
+    def _count_duplicates(self, df: pd.DataFrame) -> int:
+        # Row hashes are cached per frame and shared with CleanDataNode's de-duplication
+        return count_duplicates(df)
+
+    @cached_property
+    def distinct_counts(self) -> pd.Series:
+        """Number of distinct non-null values per column (computed on first use)."""
+        return self._df.nunique()
+
+    @cached_property
+    def memory_usage(self) -> pd.Series:
+        """Bytes held by each column, including the strings objects point to."""
+        return self._df.memory_usage(index=False, deep=True)
+
+    @property
+    def completeness(self) -> float:
+        """Percentage of non-missing cells."""
+        if self.total_cells == 0:
+            return 0
+        return (self.total_cells - self.missing_values) / self.total_cells * 100
+
+    @property
+    def duplicate_percent(self) -> float:
+        return (self.duplicate_count / self.n_rows) * 100 if self.n_rows > 0 else 0
+
+    @property
+    def sample(self) -> pd.DataFrame:
+        """Rows that sample-based statistics (e.g. correlations) are computed from: all of them."""
+        return self._df
+
+    def quartiles(self, column) -> tuple:
+        """(Q1, Q3) of a numeric column."""
+        q1, q3 = self._df[column].quantile([0.25, 0.75])
+        return q1, q3
+
+    def count_outside(self, column, lower, upper) -> int:
+        """Number of values of a numeric column below lower or above upper."""
+        values = self._df[column]
+        return int(((values < lower) | (values > upper)).sum())
+
+    def top_values(self, column, n: int = 10) -> pd.Series:
+        """The n most frequent values of a column with their counts."""
+        return self._df[column].value_counts().nlargest(n)
+
+    def approximation(self, distribution_column=None) -> dict:
+        """Error bounds of the numbers above: none, they are exact."""
+        return {"exact": True, "totalRows": self.n_rows, "sampledRows": self.n_rows}
+
+
+class ApproximateProfile(DatasetProfile):
+    """
+    DatasetProfile for very large frames, built from sketches instead of
+    exact scans. Null counts and row counts stay exact (they are cheap);
+    everything else is estimated, with 95% error bounds from approximation():
+
+    - duplicates: exact count over a hash-selected subset of rows, scaled up;
+    - distinct counts: one HyperLogLog per column;
+    - quartiles: quantiles of a uniform row sample (DKW rank bound);
+    - top values: candidates from the sample, counted with a count-min sketch.
+    """
+    def __init__(self, df: pd.DataFrame, sample_size: int = APPROXIMATE_SAMPLE_SIZE):
+        self._sample = df.take(sketches.sample_positions(len(df), sample_size))
+        self.sample_size = len(self._sample)
+        self._sketches = {}  # column -> CountMinSketch, built when its top values are asked for
+        self._distinct = {}  # column -> HyperLogLog, filled by _count_duplicates
+        super().__init__(df)
+
+    def _count_duplicates(self, df: pd.DataFrame) -> int:
+        # Hash every column once: the hashes feed the per-column distinct
+        # counters and are combined into the row hashes for duplicates
+        row_hashes = []
+        for column, (_, values) in zip(self.columns, df.items()):
+            hashes = column_hashes(values)
+            counter = sketches.HyperLogLog(HLL_PRECISION)
+            counter.add_hashes(hashes[values.notna().to_numpy()])
+            self._distinct[column] = counter
+            row_hashes.append(hashes)
+        if not row_hashes:
+            self.duplicate_error = 0
+            return 0
+        duplicate_count, self.duplicate_error = sketches.estimate_duplicates(
+            sketches.combine_hashes(row_hashes), self.sample_size / self.n_rows
+        )
+        return duplicate_count
+
+    @property
+    def sample(self) -> pd.DataFrame:
+        """Uniform random sample of the rows."""
+        return self._sample
+
+    @cached_property
+    def distinct_counts(self) -> pd.Series:
+        """Estimated number of distinct non-null values per column."""
+        return pd.Series({column: counter.count() for column, counter in self._distinct.items()}, dtype='int64')
+
+    def quartiles(self, column) -> tuple:
+        q1, q3 = self.sample[column].quantile([0.25, 0.75])
+        return q1, q3
+
+    def _count_min(self, column) -> sketches.CountMinSketch:
+        if column not in self._sketches:
+            values = self._df[column]
+            sketch = sketches.CountMinSketch(COUNT_MIN_WIDTH, COUNT_MIN_DEPTH)
+            sketch.add_hashes(column_hashes(values.dropna()))
+            self._sketches[column] = sketch
+        return self._sketches[column]
+
+    def top_values(self, column, n: int = 10) -> pd.Series:
+        # A value frequent in the file is frequent in the sample; count a few
+        # times more candidates than needed over the whole column
+        candidates = self.sample[column].value_counts().nlargest(5 * n).index
+        if len(candidates) == 0:
+            return pd.Series(dtype='int64')
+        # Hashed as the column's dtype, so each candidate hashes like its cells
+        counts = self._count_min(column).estimate(column_hashes(pd.Series(candidates, dtype=self.dtypes[column])))
+        return pd.Series(counts, index=candidates).nlargest(n)
+
+    def approximation(self, distribution_column=None) -> dict:
+        distinct_error = self._distinct[self.columns[0]].relative_error if self.columns else 0
+        bounds = {
+            "exact": False,
+            "confidence": sketches.CONFIDENCE,
+            "totalRows": self.n_rows,
+            "sampledRows": self.sample_size,
+            "duplicates": {"estimate": self.duplicate_count, "error": self.duplicate_error},
+            "distinctCounts": {
+                str(column): {"estimate": int(count), "error": int(round(count * distinct_error))}
+                for column, count in self.distinct_counts.items()
+            },
+            # Fraction of rows by which the IQR fences used for anomalies may be off
+            "quantileRankError": round(sketches.quantile_rank_error(self.sample_size), 6),
+            "correlationError": round(sketches.correlation_error(self.sample_size), 6),
+        }
+        if distribution_column in self._sketches:
+            sketch = self._sketches[distribution_column]
+            bounds["distribution"] = {
+                "column": distribution_column,
+                "maxOvercount": int(math.ceil(sketch.error)),
+                "confidence": round(sketch.confidence, 4),
+            }
+        return bounds
+
+
+def get_profile(df: pd.DataFrame) -> DatasetProfile:
+    """Returns the DatasetProfile for df, computed once per frame."""
+    return frame_memo.get_or_compute(df, 'profile', lambda: DatasetProfile(df))
+
+
+def get_approximate_profile(df: pd.DataFrame, sample_size: int = APPROXIMATE_SAMPLE_SIZE) -> DatasetProfile:
+    """
+    Returns an ApproximateProfile for df, or the exact profile when the frame
+    is no larger than the sample (estimating would not save anything).
+    """
+    if len(df) <= sample_size:
+        return get_profile(df)
+    return frame_memo.get_or_compute(df, ('approximate_profile', sample_size),
+                                     lambda: ApproximateProfile(df, sample_size))
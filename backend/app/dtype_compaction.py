@@ -0,0 +1,105 @@
+# backend/app/dtype_compaction.py
+import numpy as np
+import pandas as pd
+from pandas.api.types import (
+    is_bool_dtype,
+    is_float_dtype,
+    is_integer_dtype,
+    is_string_dtype,
+)
+
+from app.config import COMPACT_CATEGORY_MAX_RATIO
+from app.frame_memo import frame_memo
+
+_TRUE_VALUES = frozenset(('true', 'yes', 't', 'y'))
+_FALSE_VALUES = frozenset(('false', 'no', 'f', 'n'))
+
+
+def _column_bytes(values: pd.Series) -> int:
+    return int(values.memory_usage(index=False, deep=True))
+
+
+def _downcast_float(values: pd.Series) -> pd.Series:
+    """float32 when every value survives the round trip exactly, else the column unchanged."""
+    if values.dtype == np.float32:
+        return values
+    narrowed = values.astype(np.float32)
+    original = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    round_trip = narrowed.to_numpy(dtype=np.float64, na_value=np.nan)
+    same = (round_trip == original) | (np.isnan(round_trip) & np.isnan(original))
+    return narrowed if same.all() else values
+
+
+def _parse_booleans(values: pd.Series):
+    """The column as booleans if every non-null value is a true/false word, else None."""
+    non_null = values.dropna()
+    if non_null.empty:
+        return None
+    words = pd.Series(non_null.unique()).astype(str).str.strip().str.lower()
+    if not words.isin(_TRUE_VALUES | _FALSE_VALUES).all():
+        return None
+    mapped = values.astype(str).str.strip().str.lower().isin(_TRUE_VALUES)
+    if non_null.size == values.size:
+        return mapped.astype(bool)
+    return mapped.astype('boolean').mask(values.isna())
+
+
+def _compact_column(values: pd.Series, category_max_ratio: float) -> pd.Series:
+    dtype = values.dtype
+    if is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return values
+    if is_integer_dtype(dtype):
+        return pd.to_numeric(values, downcast='integer')
+    if is_float_dtype(dtype):
+        return _downcast_float(values)
+    if is_string_dtype(dtype):
+        booleans = _parse_booleans(values)
+        if booleans is not None:
+            return booleans
+        n_values = values.count()
+        if n_values and values.nunique() <= category_max_ratio * n_values:
+            return values.astype('category')
+    return values
+
+
+def compact_dtypes(df: pd.DataFrame, category_max_ratio: float = COMPACT_CATEGORY_MAX_RATIO,
+                   skip_columns=()):
+    """
+    Returns (compacted_df, report). The input frame is not modified.
+
+    - integers are downcast to the smallest integer type holding their range;
+    - floats become float32 only when that loses nothing;
+    - text columns holding only true/false/yes/no become booleans;
+    - other text columns with at most category_max_ratio distinct values
+      per non-null value become 'category'.
+
+    Columns in skip_columns are left alone. The report gives the frame's
+    memory before and after, and the old and new dtype of every column
+    that changed.
+    """
+    columns = {}
+    changes = {}
+    bytes_before = bytes_after = int(df.index.memory_usage(deep=True))
+    for column, values in df.items():
+        compacted = values if column in skip_columns else _compact_column(values, category_max_ratio)
+        before = _column_bytes(values)
+        after = _column_bytes(compacted) if compacted is not values else before
+        bytes_before += before
+        bytes_after += after
+        columns[column] = compacted
+        if compacted.dtype != values.dtype:
+            changes[str(column)] = {
+                "from": str(values.dtype),
+                "to": str(compacted.dtype),
+                "bytesBefore": before,
+                "bytesAfter": after,
+            }
+
+    result = pd.DataFrame(columns, index=df.index) if changes else df
+    report = {"bytesBefore": bytes_before, "bytesAfter": bytes_after, "columns": changes}
+    return result, report
+
+
+def get_compaction_report(df: pd.DataFrame):
+    """The report of the compact_dtypes run that produced df, or None if it was not compacted."""
+    return frame_memo.get(df, 'compaction_report')
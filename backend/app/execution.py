@@ -0,0 +1,78 @@
+# backend/app/execution.py
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from app.config import (
+    EXECUTION_MAX_WORKERS,
+    EXECUTION_MAX_QUEUE,
+    AGENT_MAX_WORKERS,
+    AGENT_MAX_QUEUE,
+)
+
+
+class ExecutionPool:
+    """
+    Runs blocking work (pandas parsing, analysis, workflows, LLM calls) on a
+    bounded thread pool so it never blocks the event loop.
+
+    At most max_workers calls run at once and at most max_queue more wait
+    for a worker. Anything beyond that is rejected straight away with a 503,
+    so an overloaded server answers quickly instead of piling up requests.
+    Threads are used rather than processes: pandas/NumPy release the GIL in
+    their heavy kernels, and the dataset cache and AI agents live in this
+    process's memory.
+    """
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0  # running + waiting
+
+    def _try_acquire(self) -> bool:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                return False
+            self._in_flight += 1
+            return True
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) on the pool and awaits its result."""
+        if not self._try_acquire():
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy processing other requests. Please try again shortly.",
+                headers={"Retry-After": "5"}
+            )
+        try:
+            loop = asyncio.get_running_loop()
+            # Carry context variables (e.g. per-request state) into the worker thread
+            context = contextvars.copy_context()
+            call = functools.partial(context.run, fn, *args, **kwargs)
+            return await loop.run_in_executor(self._executor, call)
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "maxWorkers": self.max_workers,
+                "maxQueue": self.max_queue,
+                "inFlight": self._in_flight,
+            }
+
+
+# CPU-bound work: parsing, analysis and workflow runs
+analysis_pool = ExecutionPool("analysis", EXECUTION_MAX_WORKERS, EXECUTION_MAX_QUEUE)
+# Slow, mostly I/O-bound LLM agent calls get their own pool so they cannot starve analysis
+agent_pool = ExecutionPool("agent", AGENT_MAX_WORKERS, AGENT_MAX_QUEUE)
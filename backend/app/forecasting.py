@@ -0,0 +1,174 @@
+# backend/app/forecasting.py
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import numpy as np
+import pandas as pd
+
+from app.config import (
+    FORECAST_MODEL,
+    FORECAST_TIME_BUDGET,
+    FORECAST_CACHE_SIZE,
+    FORECAST_BACKGROUND_WORKERS,
+)
+
+FORECAST_MODELS = ('arima', 'holt_winters', 'seasonal_naive')
+# Models that are cheap enough to always run inline
+FAST_MODELS = ('seasonal_naive', 'holt_winters')
+FALLBACK_MODEL = 'seasonal_naive'
+
+SEASON_LENGTH = 12  # Monthly data, yearly seasonality
+
+
+# --- Models ---
+# Each takes a month-end indexed series and returns the forecast as a series.
+def _fit_arima(series: pd.Series, steps: int) -> pd.Series:
+    from statsmodels.tsa.arima.model import ARIMA
+    # Simple ARIMA model (p,d,q) - (1,1,1) is a common starting point
+    # (P,D,Q,m) - (1,1,1,12) for seasonal component
+    model = ARIMA(series, order=(1, 1, 1), seasonal_order=(1, 1, 1, SEASON_LENGTH))
+    return model.fit().forecast(steps=steps)
+
+def _fit_holt_winters(series: pd.Series, steps: int) -> pd.Series:
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    # statsmodels needs two full seasons to estimate a seasonal component
+    seasonal = 'add' if len(series) >= 2 * SEASON_LENGTH else None
+    model = ExponentialSmoothing(
+        series.astype(float),
+        trend='add',
+        seasonal=seasonal,
+        seasonal_periods=SEASON_LENGTH if seasonal else None,
+    )
+    return model.fit().forecast(steps)
+
+def _seasonal_naive(series: pd.Series, steps: int) -> pd.Series:
+    # Each future month repeats the same month of the last observed year
+    last_season = series.to_numpy(dtype=float)[-SEASON_LENGTH:]
+    values = np.resize(last_season, steps)
+    index = pd.date_range(series.index[-1], periods=steps + 1, freq='ME')[1:]
+    return pd.Series(values, index=index)
+
+_MODEL_FUNCTIONS = {
+    'arima': _fit_arima,
+    'holt_winters': _fit_holt_winters,
+    'seasonal_naive': _seasonal_naive,
+}
+
+
+# --- Cache ---
+_cache = OrderedDict()  # (series hash, model, steps) -> (formatted forecast, model used)
+_cache_lock = threading.RLock()  # Re-entrant: a done callback can run while submitting
+_pending = {}  # cache key -> Future of a slow fit still running in the background
+_background = ThreadPoolExecutor(max_workers=FORECAST_BACKGROUND_WORKERS, thread_name_prefix="forecast")
+
+def series_hash(series: pd.Series) -> str:
+    """Hash of a monthly series' dates and values; equal series share forecasts."""
+    digest = hashlib.sha256()
+    digest.update(series.index.asi8.tobytes())
+    digest.update(series.to_numpy(dtype='float64').tobytes())
+    return digest.hexdigest()
+
+def _cache_get(key):
+    with _cache_lock:
+        value = _cache.get(key)
+        if value is not None:
+            _cache.move_to_end(key)
+        return value
+
+def _cache_put(key, value):
+    with _cache_lock:
+        _cache[key] = value
+        _cache.move_to_end(key)
+        while len(_cache) > FORECAST_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def _run_model(model: str, series: pd.Series, steps: int) -> list:
+    forecast = _MODEL_FUNCTIONS[model](series, steps)
+    # Format for ECharts
+    return [{"name": date.strftime('%Y-%m-%d'), "value": float(f_val)} for date, f_val in forecast.items()]
+
+def _fallback(model: str, series: pd.Series, steps: int):
+    """(forecast, model used) for a series whose 'model' fit failed."""
+    if model != FALLBACK_MODEL:
+        try:
+            return _run_model(FALLBACK_MODEL, series, steps), FALLBACK_MODEL
+        except Exception as e:
+            print(f"Error during forecasting ({FALLBACK_MODEL}): {e}")
+    return [], None
+
+
+def is_provisional(requested_model: str, model_used: str) -> bool:
+    """
+    True when forecast_monthly answered with another model than the one
+    requested: the fallback, while a slow fit is still running (or for good
+    once the fit failed). Such a forecast must not be memoized past the
+    forecast cache, which is updated when the fit completes.
+    """
+    return model_used is not None and model_used != (requested_model or FORECAST_MODEL)
+
+
+def forecast_monthly(monthly_data: pd.Series, model: str = None, steps: int = 12, time_budget: float = None):
+    """
+    Forecasts 'steps' months ahead and returns (forecast_data, model_used).
+
+    Results are cached by the hash of the monthly series, so re-analyzing
+    the same data never refits. A slow model (ARIMA) runs in a background
+    thread: if it does not finish within time_budget seconds, the seasonal
+    naive forecast is returned now and the ARIMA result is cached when it
+    completes, so the next request for the same series gets it. A fit that
+    fails is answered, and cached, with the seasonal naive forecast too.
+    A time_budget of 0 or less waits for the model however long it takes.
+    """
+    model = model or FORECAST_MODEL
+    if model not in FORECAST_MODELS:
+        raise ValueError(f"Unknown forecast model '{model}'. Use one of: {', '.join(FORECAST_MODELS)}.")
+    if len(monthly_data) < SEASON_LENGTH:  # Need at least 12 data points to forecast
+        return [], None
+    time_budget = FORECAST_TIME_BUDGET if time_budget is None else time_budget
+
+    series = monthly_data.copy()
+    # We need to ensure the index has a frequency
+    series.index.freq = 'ME'
+    key = (series_hash(series), model, steps)
+
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    if model in FAST_MODELS:
+        try:
+            result = _run_model(model, series, steps), model
+        except Exception as e:
+            print(f"Error during forecasting ({model}): {e}")
+            result = _fallback(model, series, steps)
+        _cache_put(key, result)
+        return result
+
+    with _cache_lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _background.submit(_run_model, model, series, steps)
+            _pending[key] = future
+
+            def _store(done, key=key, series=series):
+                if done.exception() is None:
+                    _cache_put(key, (done.result(), key[1]))
+                else:
+                    print(f"Error during forecasting ({key[1]}): {done.exception()}")
+                    _cache_put(key, _fallback(key[1], series, key[2]))
+                with _cache_lock:
+                    _pending.pop(key, None)
+            future.add_done_callback(_store)
+
+    try:
+        result = future.result(timeout=time_budget if time_budget > 0 else None)
+        return result, model
+    except FutureTimeoutError:
+        print(f"Forecast ({model}) exceeded its {time_budget}s budget; using {FALLBACK_MODEL} "
+              f"for now, the {model} result will be cached when it finishes.")
+        return forecast_monthly(monthly_data, model=FALLBACK_MODEL, steps=steps)
+    except Exception:
+        # Already logged by the done callback, which may still be caching the fallback
+        return _cache_get(key) or _fallback(model, series, steps)
@@ -0,0 +1,61 @@
+# backend/app/frame_memo.py
+import threading
+import weakref
+
+import pandas as pd
+
+
+class FrameMemo:
+    """
+    Memoizes values derived from a DataFrame (row hashes, profiles, sort
+    orders, ...) for as long as that exact frame object is alive.
+
+    Entries are keyed by the frame's identity, not its contents, and are
+    dropped automatically when the frame is garbage collected. This relies
+    on the rule that shared frames (e.g. from the dataset cache) are never
+    mutated in place: any transformation produces a new frame.
+    """
+    def __init__(self):
+        self._entries = {}  # id(df) -> (weakref to df, {key: value})
+        self._lock = threading.Lock()
+
+    def _values_for(self, df: pd.DataFrame, create: bool):
+        frame_id = id(df)
+        entry = self._entries.get(frame_id)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+        if not create:
+            return None
+
+        def _forget(_ref, frame_id=frame_id):
+            with self._lock:
+                current = self._entries.get(frame_id)
+                if current is not None and current[0] is _ref:
+                    del self._entries[frame_id]
+
+        values = {}
+        self._entries[frame_id] = (weakref.ref(df, _forget), values)
+        return values
+
+    def get(self, df: pd.DataFrame, key, default=None):
+        with self._lock:
+            values = self._values_for(df, create=False)
+            return default if values is None else values.get(key, default)
+
+    def set(self, df: pd.DataFrame, key, value):
+        with self._lock:
+            self._values_for(df, create=True)[key] = value
+        return value
+
+    def get_or_compute(self, df: pd.DataFrame, key, compute):
+        """Returns the memoized value for (df, key), calling compute() on a miss."""
+        with self._lock:
+            values = self._values_for(df, create=False)
+            if values is not None and key in values:
+                return values[key]
+        # Computed outside the lock so slow work on one frame does not block others
+        return self.set(df, key, compute())
+
+
+# Shared by the analysis helpers
+frame_memo = FrameMemo()
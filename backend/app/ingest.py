@@ -0,0 +1,155 @@
+# backend/app/ingest.py
+import codecs
+import io
+import threading
+import weakref
+
+from fastapi import UploadFile
+
+# Size of the chunks used when streaming over an upload
+CHUNK_SIZE = 1024 * 1024
+
+# How much of a text upload detect_encoding looks at
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# Byte-order marks, longest first so UTF-32 is not mistaken for UTF-16
+_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+class _SourceReader(io.RawIOBase):
+    """
+    A read-only view of a shared upload file with a position of its own.
+
+    Workflow branches on different threads read the same upload at once (a
+    compiled plan per sink, a chunk stream per consumer). Seeking the shared
+    file directly would make them move each other's position, so every read
+    here seeks and reads under the file's lock instead.
+    """
+    def __init__(self, source, lock: threading.Lock):
+        self._source = source
+        self._lock = lock
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        with self._lock:
+            self._source.seek(self._position)
+            data = self._source.read(len(buffer))
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        else:
+            with self._lock:
+                position = self._source.seek(0, io.SEEK_END) + offset
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._position = position
+        return position
+
+    def tell(self) -> int:
+        return self._position
+
+
+# One lock per shared upload file, dropped with the file
+_source_locks = weakref.WeakKeyDictionary()
+_source_locks_guard = threading.Lock()
+
+def _lock_for(source) -> threading.Lock:
+    with _source_locks_guard:
+        lock = _source_locks.get(source)
+        if lock is None:
+            lock = _source_locks[source] = threading.Lock()
+        return lock
+
+
+def open_binary_source(source):
+    """
+    Returns a binary file-like object positioned at the start of the upload.
+
+    'source' is either the raw upload bytes or an already-open binary file
+    (such as the SpooledTemporaryFile behind a FastAPI UploadFile). Bytes are
+    wrapped in a BytesIO, which shares the buffer instead of copying it; files
+    get a buffered reader with its own position over the spool (see
+    _SourceReader), so the parser reads straight from it and several readers
+    may use the same upload at once.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return io.BufferedReader(_SourceReader(source, _lock_for(source)), buffer_size=CHUNK_SIZE)
+
+
+def iter_source_chunks(source, chunk_size: int = CHUNK_SIZE):
+    """Yields the upload in chunks without ever holding all of it in memory."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for start in range(0, len(view), chunk_size):
+            yield view[start:start + chunk_size]
+        return
+
+    reader = open_binary_source(source)
+    while True:
+        chunk = reader.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def source_size(source) -> int:
+    """Size of the upload in bytes, without reading it."""
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    if isinstance(source, memoryview):
+        return source.nbytes
+    return open_binary_source(source).seek(0, io.SEEK_END)
+
+
+def detect_encoding(source, sample_size: int = ENCODING_SAMPLE_SIZE) -> str:
+    """
+    Guesses a text upload's encoding from its first bytes, in a single pass.
+
+    A byte-order mark wins; otherwise the prefix is checked as utf-8 (a
+    multi-byte character cut off at the end of the sample is fine) and
+    anything that is not valid utf-8 is treated as latin-1.
+    """
+    stream = open_binary_source(source)
+    prefix = stream.read(sample_size)
+    stream.seek(0)
+
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding
+
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(prefix, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+async def spool_upload(file: UploadFile):
+    """
+    Returns the upload as a rewound binary file instead of one big bytes object.
+
+    Starlette already streams multipart uploads into a SpooledTemporaryFile
+    (kept in memory while small, moved to disk once large), so handing that
+    file to the parser keeps peak memory close to 1x the upload size.
+    """
+    await file.seek(0)
+    return file.file
@@ -0,0 +1,434 @@
+# backend/app/jobs.py
+import contextlib
+import json
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from app.analysis_utils import get_dashboard_data
+from app.config import (
+    COMPACT_DTYPES,
+    JOBS_BROKER,
+    JOBS_CELERY_BROKER_URL,
+    JOBS_CELERY_RESULT_BACKEND,
+    JOBS_MAX_QUEUE,
+    JOBS_MAX_WORKERS,
+    JOBS_RESULT_TTL,
+    JOBS_SPOOL_DIR,
+    WORKFLOW_COMPILED,
+    WORKFLOW_STREAMING,
+)
+from app.core.workflow.workflow import WorkflowCancelled, WorkflowExecutor
+from app.dataset_cache import DatasetCache, dataset_cache
+from app.ingest import iter_source_chunks
+from app.out_of_core import get_out_of_core_dataset, load_out_of_core, get_out_of_core_dashboard
+from app.serialization import dumps, loads
+
+# Job states reported by every broker
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+def save_job_input(file_contents, job_id: str, file_name: str) -> str:
+    """
+    Copies an upload to JOBS_SPOOL_DIR and returns the path. Request uploads
+    are closed once the response is sent, so a job reads this copy instead;
+    it is deleted when the job ends.
+    """
+    spool_dir = Path(JOBS_SPOOL_DIR)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    path = spool_dir / f"{job_id}{Path(file_name).suffix.lower()}"
+    with open(path, 'wb') as out:
+        for chunk in iter_source_chunks(file_contents):
+            out.write(chunk)
+    return str(path)
+
+def _remove_input(input_path: str):
+    if input_path:
+        Path(input_path).unlink(missing_ok=True)
+
+
+# ----------------------------
+# Job handlers
+# ----------------------------
+class JobCancelled(Exception):
+    """Raised inside a job that noticed it was cancelled."""
+
+
+class JobContext:
+    """What a job handler runs with: its parameters, its stored upload and a way to report progress."""
+    def __init__(self, job_id: str, kind: str, params: dict, input_path: str = None, file_name: str = None,
+                 cancel_event: threading.Event = None, on_progress=None):
+        self.job_id = job_id
+        self.kind = kind
+        self.params = params
+        self.input_path = input_path
+        self.file_name = file_name
+        self.cancel_event = cancel_event
+        self.on_progress = on_progress  # Called with the job's progress dict, from any thread
+
+    def open_input(self):
+        """The stored upload as an open binary file (None when the job has no upload)."""
+        if self.input_path is None:
+            return contextlib.nullcontext(None)
+        return open(self.input_path, 'rb')
+
+    def check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise JobCancelled(f"Job {self.job_id} was cancelled.")
+
+    def resolve_dataset(self, upload):
+        """The cached dataset for the job's dataset_id, or its upload parsed through the dataset cache."""
+        dataset_id = self.params.get('dataset_id')
+        if dataset_id:
+            entry = dataset_cache.get(dataset_id)
+            if entry is not None:
+                return entry
+        if upload is None:
+            if dataset_id:
+                raise ValueError(f"Dataset '{dataset_id}' not found. Please upload the file again.")
+            raise ValueError("Please upload a file or provide a dataset_id.")
+        return dataset_cache.get_or_load(upload, self.file_name, sheet_name=self.params.get('sheet_name'),
+                                         compact_dtypes=self.params.get('compact_dtypes'))
+
+
+def run_analyze_job(context: JobContext) -> dict:
+    """The /api/v1/analyze response, computed in the background."""
+    params = context.params
+    options = {
+        "col_dist_target": params.get('col_dist_target'),
+        "col_time_target": params.get('col_time_target'),
+        "forecast_model": params.get('forecast_model'),
+    }
+    with context.open_input() as upload:
+        if params.get('out_of_core'):
+            dataset = get_out_of_core_dataset(params['dataset_id']) if params.get('dataset_id') else None
+            if dataset is None:
+                if upload is None:
+                    raise ValueError("Please upload the file again.")
+                dataset = load_out_of_core(upload, context.file_name)
+            context.check_cancelled()
+            return {"datasetId": dataset.dataset_id, **get_out_of_core_dashboard(dataset, **options)}
+
+        dataset = context.resolve_dataset(upload)
+    context.check_cancelled()
+    response_data = get_dashboard_data(dataset.df, approximate=bool(params.get('approximate')), **options)
+    return {"datasetId": dataset.dataset_id, **response_data}
+
+
+def run_workflow_job(context: JobContext) -> dict:
+    """
+    The /workflow/run/ response, computed in the background. Progress counts
+    the pipeline's finished nodes; cancelling stops the run before its next node.
+    """
+    params = context.params
+    compiled = WORKFLOW_COMPILED if params.get('compiled') is None else params['compiled']
+    streaming = WORKFLOW_STREAMING if params.get('streaming') is None else params['streaming']
+    compact = COMPACT_DTYPES if params.get('compact_dtypes') is None else params['compact_dtypes']
+    pipeline_data = json.loads(params['pipeline_json'])
+    nodes_list = pipeline_data.get('nodes', [])
+
+    progress = {"nodesFinished": 0, "nodesTotal": len(nodes_list), "runningNodes": []}
+    progress_lock = threading.Lock()
+
+    def on_event(event: dict):
+        with progress_lock:
+            if event["event"] == "started":
+                progress["runningNodes"].append(event["nodeId"])
+            else:
+                progress["runningNodes"].remove(event["nodeId"])
+                progress["nodesFinished"] += event["event"] == "finished"
+            snapshot = {**progress, "runningNodes": list(progress["runningNodes"])}
+        if context.on_progress is not None:
+            context.on_progress(snapshot)
+
+    with context.open_input() as upload:
+        dataset_id = params.get('dataset_id')
+        file_name, file_contents = context.file_name, None
+        if ((compiled or streaming) and upload is not None and params.get('sheet_name') is None and not compact
+                and not (dataset_id and dataset_cache.get(dataset_id))):
+            # Same as prepare_workflow: plans and streams read the upload themselves
+            file_contents = upload
+            dataset_id = DatasetCache.compute_id(upload, context.file_name)
+        else:
+            dataset = context.resolve_dataset(upload)
+            file_name, dataset_id = dataset.file_name, dataset.dataset_id
+
+        executor = WorkflowExecutor(
+            nodes=nodes_list,
+            edges=pipeline_data.get('edges', []),
+            file_contents=file_contents,
+            file_name=file_name,
+            dataset_id=dataset_id,
+            compiled=compiled,
+            streaming=streaming,
+            on_event=on_event,
+            cancel_event=context.cancel_event
+        )
+        try:
+            executor.run()
+        except WorkflowCancelled as e:
+            raise JobCancelled(str(e)) from e
+    return executor.summary()
+
+
+JOB_HANDLERS = {
+    "analyze": run_analyze_job,
+    "workflow": run_workflow_job,
+}
+
+def execute_job(context: JobContext) -> dict:
+    """Runs a job's handler and deletes its stored upload afterwards, whatever the outcome."""
+    try:
+        return JOB_HANDLERS[context.kind](context)
+    finally:
+        _remove_input(context.input_path)
+
+
+# ----------------------------
+# Brokers
+# ----------------------------
+class _LocalJob:
+    def __init__(self, job_id: str, kind: str, context: JobContext):
+        self.job_id = job_id
+        self.kind = kind
+        self.context = context
+        self.state = QUEUED
+        self.submitted_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.finished_time = None
+        self.error = None
+        self.progress = None
+        self.result = None
+        self.future = None
+
+    def to_dict(self) -> dict:
+        return {
+            "jobId": self.job_id,
+            "kind": self.kind,
+            "status": self.state,
+            "submittedAt": self.submitted_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "progress": self.progress,
+            "error": self.error,
+        }
+
+
+class InProcessBroker:
+    """
+    Runs jobs on a thread pool in this process; job state lives in memory.
+    Jobs share the process's dataset cache, so a job for an already-parsed
+    dataset_id needs no upload. At most max_workers jobs run at once and at
+    most max_queue more wait; beyond that submit() answers 503. Finished jobs
+    are forgotten result_ttl seconds after they end.
+    """
+    shares_memory = True
+
+    def __init__(self, max_workers: int, max_queue: int, result_ttl: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="job")
+        self._jobs = {}  # job id -> _LocalJob
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        cutoff = time.time() - self.result_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished_time is not None and job.finished_time < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, job_id: str, kind: str, params: dict, input_path: str = None, file_name: str = None) -> dict:
+        with self._lock:
+            self._expire()
+            pending = sum(job.state in (QUEUED, RUNNING) for job in self._jobs.values())
+            if pending >= self.max_workers + self.max_queue:
+                _remove_input(input_path)
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many jobs are queued. Please try again shortly.",
+                    headers={"Retry-After": "30"}
+                )
+            context = JobContext(job_id, kind, params, input_path, file_name, cancel_event=threading.Event())
+            job = self._jobs[job_id] = _LocalJob(job_id, kind, context)
+            context.on_progress = lambda progress: setattr(job, 'progress', progress)
+            job.future = self._executor.submit(self._run, job)
+            return job.to_dict()
+
+    def _run(self, job: _LocalJob):
+        with self._lock:
+            if job.state != QUEUED:
+                return
+            job.state = RUNNING
+            job.started_at = _now()
+        print(f"Job {job.job_id}: running {job.kind}")
+        try:
+            result, error = execute_job(job.context), None
+            # A job that cannot stop part-way still ends as cancelled, without a result
+            state = CANCELLED if job.context.cancel_event.is_set() else SUCCEEDED
+        except JobCancelled:
+            result, state, error = None, CANCELLED, None
+        except Exception as e:
+            traceback.print_exc()
+            result, state, error = None, FAILED, str(e)
+        with self._lock:
+            job.result = result if state == SUCCEEDED else None
+            job.state, job.error = state, error
+            job.finished_at = _now()
+            job.finished_time = time.time()
+        print(f"Job {job.job_id}: {state}")
+
+    def status(self, job_id: str):
+        """The job's status dict, or None for an unknown (or expired) job."""
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def result(self, job_id: str):
+        """(status dict, result); the result is None unless the job succeeded."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None, None
+            return job.to_dict(), job.result
+
+    def cancel(self, job_id: str):
+        """
+        Cancels a job. A queued job never starts; a running workflow stops
+        before its next node, and any other running job has its result discarded.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.state == QUEUED:
+                job.future.cancel()
+                job.state = CANCELLED
+                job.finished_at = _now()
+                job.finished_time = time.time()
+                _remove_input(job.context.input_path)
+            elif job.state == RUNNING:
+                job.context.cancel_event.set()
+            return job.to_dict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {state: 0 for state in (QUEUED, RUNNING) + FINISHED_STATES}
+            for job in self._jobs.values():
+                counts[job.state] += 1
+            return counts
+
+
+class CeleryBroker:
+    """
+    Sends jobs to Celery workers, so they spread over other processes and
+    machines. Workers share nothing with this process: uploads travel as files
+    in JOBS_SPOOL_DIR (which must be shared storage) and a dataset_id without
+    an upload only works if the worker has that dataset cached. Start workers
+    from backend/ with:
+
+        JOBS_BROKER=celery celery -A app.jobs:celery_app worker
+
+    Celery reports unknown job ids as pending, so status() cannot tell them apart.
+    """
+    shares_memory = False
+
+    # Celery task states -> job states
+    _STATES = {
+        "PENDING": QUEUED, "RECEIVED": QUEUED, "RETRY": QUEUED,
+        "STARTED": RUNNING, "PROGRESS": RUNNING,
+        "SUCCESS": SUCCEEDED, "FAILURE": FAILED, "REVOKED": CANCELLED,
+    }
+
+    def __init__(self, broker_url: str, result_backend: str, result_ttl: int):
+        from celery import Celery
+
+        self.app = Celery("dataset_jobs", broker=broker_url, backend=result_backend)
+        self.app.conf.update(
+            task_serializer="json",
+            result_serializer="json",
+            accept_content=["json"],
+            task_track_started=True,
+            result_extended=True,  # Keeps each job's kind (its first argument) with its state
+            result_expires=result_ttl,
+            # Jobs are long: a worker takes the next one only when it is free
+            worker_prefetch_multiplier=1,
+            task_acks_late=True,
+        )
+        self._task = self.app.task(name="app.jobs.run_job", bind=True)(_run_celery_job)
+
+    def submit(self, job_id: str, kind: str, params: dict, input_path: str = None, file_name: str = None) -> dict:
+        self._task.apply_async(args=(kind, params, input_path, file_name), task_id=job_id)
+        return {"jobId": job_id, "kind": kind, "status": QUEUED, "submittedAt": _now(),
+                "startedAt": None, "finishedAt": None, "progress": None, "error": None}
+
+    def _status(self, async_result) -> dict:
+        state = self._STATES.get(async_result.state, QUEUED)
+        info = async_result.info
+        date_done = async_result.date_done
+        return {
+            "jobId": async_result.id,
+            "kind": (async_result.args or [None])[0],
+            "status": state,
+            "submittedAt": None,
+            "startedAt": None,
+            "finishedAt": date_done.isoformat() if date_done else None,
+            "progress": info.get("progress") if state == RUNNING and isinstance(info, dict) else None,
+            "error": str(info) if state == FAILED else None,
+        }
+
+    def status(self, job_id: str):
+        return self._status(self.app.AsyncResult(job_id))
+
+    def result(self, job_id: str):
+        async_result = self.app.AsyncResult(job_id)
+        status = self._status(async_result)
+        return status, async_result.result if status["status"] == SUCCEEDED else None
+
+    def cancel(self, job_id: str):
+        # terminate=True also stops a job a worker is already running
+        self.app.control.revoke(job_id, terminate=True)
+        return self.status(job_id)
+
+    def stats(self) -> dict:
+        return {}  # Job counts live in the result backend; see the Celery monitoring tools
+
+
+def _run_celery_job(task, kind: str, params: dict, input_path: str, file_name: str) -> dict:
+    context = JobContext(task.request.id, kind, params, input_path, file_name,
+                         on_progress=lambda progress: task.update_state(state="PROGRESS",
+                                                                        meta={"progress": progress}))
+    # Celery's JSON serializer takes plain values only (no NumPy)
+    return loads(dumps(execute_job(context)))
+
+
+def _create_broker():
+    if JOBS_BROKER == "celery":
+        try:
+            return CeleryBroker(JOBS_CELERY_BROKER_URL, JOBS_CELERY_RESULT_BACKEND, JOBS_RESULT_TTL)
+        except ImportError:
+            print("Jobs: JOBS_BROKER=celery but celery is not installed; running jobs in this process")
+    elif JOBS_BROKER != "local":
+        print(f"Jobs: unknown JOBS_BROKER '{JOBS_BROKER}'; running jobs in this process")
+    return InProcessBroker(JOBS_MAX_WORKERS, JOBS_MAX_QUEUE, JOBS_RESULT_TTL)
+
+
+# Shared by every job endpoint in this process
+job_broker = _create_broker()
+# The Celery app workers are started with (None with the local broker)
+celery_app = getattr(job_broker, "app", None)
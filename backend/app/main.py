@@ -1,12 +1,14 @@
 # backend/app/main.py
-import os
-import io
+import asyncio
 import json
+import time
 import traceback
-import logging
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from typing import List
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import uvicorn
@@ -31,22 +33,47 @@ import pandas as pd
 # Your existing imports (ensure these paths are correct in your project)
 # ----------------------------
 from app.analysis_utils import (
-    read_uploaded_file_to_df,
-    get_kpis,
-    get_actionable_insights,
-    get_data_dictionary,
-    get_column_distribution,
-    get_time_series_data,
     get_table_data,
-    get_data_health,
-    get_correlation_matrix
+    get_table_page,
+    get_dashboard_data
 )
 
 from app.core.workflow.workflow import WorkflowExecutor
 
+# content-addressed cache of parsed uploads, shared by all endpoints
+from app.dataset_cache import DatasetCache, dataset_cache
+from app.dtype_compaction import get_compaction_report
+from app.out_of_core import get_out_of_core_dataset, load_out_of_core, get_out_of_core_dashboard
+from app.config import (
+    TABLE_MAX_PAGE_SIZE,
+    COMPACT_DTYPES,
+    WORKFLOW_COMPILED,
+    WORKFLOW_STREAMING,
+    METRICS_ENABLED,
+    METRICS_TIMING_HEADERS,
+)
+from app.ingest import spool_upload
+
+# bounded thread pools that keep blocking work off the event loop
+from app.execution import analysis_pool, agent_pool
+
+# single-pass JSON responses (orjson when installed)
+from app.serialization import FastJSONResponse, dumps, accepts_arrow, arrow_response
+
+# background analyze/workflow jobs (in-process pool or Celery)
+from app.jobs import job_broker, new_job_id, save_job_input
+
+# per-panel dashboard sections, memoized per dataset
+from app.panels import get_panel, panel_payload
+from app.forecasting import FORECAST_MODELS
+
 # ai agent factory & query functions (your implementation)
 from app.ai_agent import create_agent, query_agent
 
+# latency histograms, counters and the Prometheus /metrics text
+from app import metrics
+from app.core.workflow.node_cache import node_result_cache
+
 # ----------------------------
 # Load environment
 # ----------------------------
@@ -59,7 +86,8 @@ load_dotenv(dotenv_path="../.env")
 app = FastAPI(
     title="Data Analytics Platform API",
     description="API for processing files and running analytics dashboards & pipelines.",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=FastJSONResponse
 )
 
 app.add_middleware(
@@ -70,6 +98,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ----------------------------
+# Metrics
+# ----------------------------
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    """Times every request; with METRICS_TIMING_HEADERS, lists its stages in a Server-Timing header."""
+    if not METRICS_ENABLED:
+        return await call_next(request)
+    timings = []
+    token = metrics.request_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.request_timings.reset(token)
+    elapsed = time.perf_counter() - start
+    route = request.scope.get("route")
+    metrics.request_duration.observe(elapsed, method=request.method,
+                                     route=route.path if route is not None else "unmatched",
+                                     status=response.status_code)
+    if METRICS_TIMING_HEADERS:
+        response.headers["Server-Timing"] = metrics.server_timing_header(timings + [("total", elapsed)])
+    return response
+
+def _cache_and_pool_metrics():
+    """Scrape-time samples from the stats the caches and pools already keep."""
+    caches = {"dataset": dataset_cache.stats(), "workflow_node": node_result_cache.stats()}
+    pools = {"analysis": analysis_pool.stats(), "agent": agent_pool.stats()}
+    return [
+        ("app_cache_hits_total", "Cache lookups answered from the cache.", "counter",
+         [({"cache": name}, stats["hits"]) for name, stats in caches.items()]),
+        ("app_cache_misses_total", "Cache lookups that had to compute or parse.", "counter",
+         [({"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+        ("app_cache_entries", "Entries currently held per cache.", "gauge",
+         [({"cache": name}, stats["entries"]) for name, stats in caches.items()]),
+        ("app_dataset_cache_bytes", "DataFrame memory held by the dataset cache.", "gauge",
+         [({}, caches["dataset"]["totalBytes"])]),
+        ("app_pool_in_flight", "Calls running or queued per execution pool.", "gauge",
+         [({"pool": name}, stats["inFlight"]) for name, stats in pools.items()]),
+        ("app_pool_max_workers", "Worker threads per execution pool.", "gauge",
+         [({"pool": name}, stats["maxWorkers"]) for name, stats in pools.items()]),
+        ("app_jobs", "Background jobs known to this process's broker, by status.", "gauge",
+         [({"status": status}, count) for status, count in job_broker.stats().items()]),
+        ("app_resident_memory_bytes", "Resident memory of this process.", "gauge",
+         [({}, metrics.resident_memory_bytes())]),
+    ]
+
+metrics.registry.register_collector(_cache_and_pool_metrics)
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text exposition of every recorded metric."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 # ----------------------------
 # In-memory agent storage (keeps the last created agent)
 # ----------------------------
@@ -81,42 +163,117 @@ agent_storage = {"agent": None}
 class QueryRequest(BaseModel):
     question: str
 
+# ----------------------------
+# Helper: reject unknown forecast models before any work is done
+# ----------------------------
+def check_forecast_model(forecast_model: str):
+    if forecast_model is not None and forecast_model not in FORECAST_MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown forecast model '{forecast_model}'. Use one of: {', '.join(FORECAST_MODELS)}."
+        )
+
+# ----------------------------
+# Helper: resolve an upload or a dataset id to a cached dataset
+# ----------------------------
+async def resolve_dataset(file: UploadFile = None, dataset_id: str = None, sheet_name: str = None,
+                          compact_dtypes: bool = None):
+    """
+    Returns the CachedDataset for this request. A known dataset_id skips the
+    upload entirely; otherwise the uploaded bytes are parsed (or found) in the
+    content-addressed dataset cache. 'sheet_name' picks an Excel sheet and
+    'compact_dtypes' overrides the COMPACT_DTYPES setting for the upload.
+    """
+    if dataset_id:
+        entry = dataset_cache.get(dataset_id)
+        if entry is not None:
+            return entry
+        if file is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Dataset '{dataset_id}' not found. Please upload the file again."
+            )
+
+    if file is None:
+        raise HTTPException(status_code=400, detail="Please upload a file or provide a dataset_id.")
+
+    # Hash and parse straight from the spooled upload instead of file.read(),
+    # so a large upload is never held as one bytes object.
+    upload = await spool_upload(file)
+    # Uses the robust reader (handles csv/xlsx etc.) on a cache miss; hashing
+    # and parsing are blocking, so they run on the analysis pool
+    return await analysis_pool.run(dataset_cache.get_or_load, upload, file.filename,
+                                   sheet_name=sheet_name, compact_dtypes=compact_dtypes)
+
+async def analyze_out_of_core(file: UploadFile, dataset_id: str, col_dist_target: str,
+                              col_time_target: str, forecast_model: str):
+    """The out-of-core branch of /api/v1/analyze: the DataFrame is never built."""
+    dataset = get_out_of_core_dataset(dataset_id) if dataset_id else None
+    if dataset is None:
+        if file is None:
+            raise HTTPException(
+                status_code=404 if dataset_id else 400,
+                detail="Please upload the file again." if dataset_id else "Please upload a file or provide a dataset_id."
+            )
+        upload = await spool_upload(file)
+        dataset = await analysis_pool.run(load_out_of_core, upload, file.filename)
+
+    response_data = await analysis_pool.run(
+        get_out_of_core_dashboard,
+        dataset,
+        col_dist_target=col_dist_target,
+        col_time_target=col_time_target,
+        forecast_model=forecast_model
+    )
+    return {"datasetId": dataset.dataset_id, **response_data}
+
 # ----------------------------
 # Endpoint 1: analyze file (unchanged logic, uses read_uploaded_file_to_df)
 # ----------------------------
 @app.post("/api/v1/analyze")
 async def analyze_file(
-    file: UploadFile = File(...),
+    file: UploadFile = File(None),
     col_dist_target: str = Form(None),
-    col_time_target: str = Form(None)
+    col_time_target: str = Form(None),
+    forecast_model: str = Form(None),
+    dataset_id: str = Form(None),
+    sheet_name: str = Form(None),
+    approximate: bool = Form(False),
+    out_of_core: bool = Form(False),
+    compact_dtypes: bool = Form(None)
 ):
+    """
+    Full dashboard for an upload or a cached dataset. approximate=true
+    estimates the expensive sections from sketches and a row sample and
+    reports their error bounds under "approximation". out_of_core=true
+    spills a CSV/Parquet/Feather upload to a memory-mapped Arrow file and
+    analyzes it batch by batch, for files larger than memory. compact_dtypes
+    shrinks the parsed frame's dtypes (see app.dtype_compaction).
+    """
     try:
-        contents = await file.read()
-        # Use your robust reader (handles csv/xlsx etc.)
-        df = read_uploaded_file_to_df(contents, file.filename)
-
-        # Run analysis functions
-        kpis = get_kpis(df)
-        correlation_result = get_correlation_matrix(df)
-        time_series_result = get_time_series_data(df, target_column=col_time_target)
-        insights = get_actionable_insights(df, kpis, correlation_result['matrix'])
-
-        response_data = {
-            "kpiData": kpis,
-            "insights": insights,
-            "dictionary": get_data_dictionary(df),
-            "columnDist": get_column_distribution(df, target_column=col_dist_target),
-            "timeSeries": time_series_result,
-            "tableData": get_table_data(df),
-            "dataHealth": get_data_health(df),
-            "correlationMatrix": {
-                "columns": correlation_result['columns'],
-                "data": correlation_result['data']
-            }
-        }
+        check_forecast_model(forecast_model)
+        if out_of_core:
+            return FastJSONResponse(await analyze_out_of_core(file, dataset_id, col_dist_target, col_time_target,
+                                                              forecast_model))
+
+        dataset = await resolve_dataset(file, dataset_id, sheet_name, compact_dtypes)
+        df = dataset.df
+
+        # Run analysis functions off the event loop
+        response_data = await analysis_pool.run(
+            get_dashboard_data,
+            df,
+            col_dist_target=col_dist_target,
+            col_time_target=col_time_target,
+            forecast_model=forecast_model,
+            approximate=approximate
+        )
+        response_data = {"datasetId": dataset.dataset_id, **response_data}
 
-        return response_data
+        return FastJSONResponse(response_data)
 
+    except HTTPException:
+        raise
     except Exception as e:
         # Print full traceback to console for easier debugging in dev
         traceback.print_exc()
@@ -125,46 +282,261 @@ async def analyze_file(
 # ----------------------------
 # Endpoint 2: run workflow (pipeline builder)
 # ----------------------------
+async def prepare_workflow(file: UploadFile, pipeline_json: str, dataset_id: str, sheet_name: str,
+                           compact_dtypes: bool, compiled: bool, streaming: bool,
+                           on_event=None, keep_frames: bool = False) -> WorkflowExecutor:
+    """Resolves the dataset and builds the WorkflowExecutor for a /workflow/run/ request."""
+    compiled = WORKFLOW_COMPILED if compiled is None else compiled
+    streaming = WORKFLOW_STREAMING if streaming is None else streaming
+    compact = COMPACT_DTYPES if compact_dtypes is None else compact_dtypes
+    pipeline_data = json.loads(pipeline_json)
+    nodes_list = pipeline_data.get('nodes', [])
+    edges_list = pipeline_data.get('edges', [])
+
+    upload = None
+    if ((compiled or streaming) and file is not None and sheet_name is None and not compact
+            and not (dataset_id and dataset_cache.get(dataset_id))):
+        # A compiled plan reads only the columns and rows it needs, and a
+        # streaming run reads chunk by chunk, so a new upload is not parsed
+        # up front (its load node still uses the dataset cache if the same
+        # file was parsed before)
+        upload = await spool_upload(file)
+        file_name = file.filename
+        dataset_id = await analysis_pool.run(DatasetCache.compute_id, upload, file_name)
+    else:
+        dataset = await resolve_dataset(file, dataset_id, sheet_name, compact_dtypes)
+        file_name, dataset_id = dataset.file_name, dataset.dataset_id
+
+    return WorkflowExecutor(
+        nodes=nodes_list,
+        edges=edges_list,
+        file_contents=upload,
+        file_name=file_name,
+        dataset_id=dataset_id,
+        compiled=compiled,
+        streaming=streaming,
+        on_event=on_event,
+        keep_frames=keep_frames
+    )
+
 @app.post("/workflow/run/")
 async def run_workflow(
-    file: UploadFile = File(...),
-    pipeline_json: str = Form(...)
+    file: UploadFile = File(None),
+    pipeline_json: str = Form(...),
+    dataset_id: str = Form(None),
+    sheet_name: str = Form(None),
+    compact_dtypes: bool = Form(None),
+    compiled: bool = Form(None),
+    streaming: bool = Form(None),
+    accept: str = Header(None)
 ):
+    """
+    Runs a pipeline. "results" has the output of every node without children,
+    by node id; "result" is the id of the last of them in execution order.
+    With "Accept: application/vnd.apache.arrow.stream" a table output of that
+    last node is sent alone as an Arrow IPC stream, with datasetId, cacheHits and
+    peakMemoryBytes in its "response" schema metadata; other results still
+    get the JSON response.
+    """
     try:
-        file_contents = await file.read()
-        pipeline_data = json.loads(pipeline_json)
-        nodes_list = pipeline_data.get('nodes', [])
-        edges_list = pipeline_data.get('edges', [])
-
-        executor = WorkflowExecutor(
-            nodes=nodes_list,
-            edges=edges_list,
-            file_contents=file_contents,
-            file_name=file.filename
+        arrow = accepts_arrow(accept)
+        executor = await prepare_workflow(file, pipeline_json, dataset_id, sheet_name,
+                                          compact_dtypes, compiled, streaming, keep_frames=arrow)
+
+        result = await analysis_pool.run(executor.run)
+
+        if arrow and isinstance(result, pd.DataFrame):
+            return await analysis_pool.run(arrow_response, result, {
+                "datasetId": executor.dataset_id,
+                "cacheHits": executor.cache_hits,
+                "peakMemoryBytes": executor.peak_memory_bytes,
+            })
+        return FastJSONResponse(executor.summary())
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/workflow/run/stream")
+async def run_workflow_stream(
+    file: UploadFile = File(None),
+    pipeline_json: str = Form(...),
+    dataset_id: str = Form(None),
+    sheet_name: str = Form(None),
+    compact_dtypes: bool = Form(None),
+    compiled: bool = Form(None),
+    streaming: bool = Form(None)
+):
+    """
+    Same as /workflow/run/, answered as newline-delimited JSON while the run
+    progresses: a "started" and a "finished" (or "failed") event per node,
+    with its elapsed time and row/column counts, plus the node's result as
+    soon as it is ready for nodes without children. The last line is a
+    "done" event carrying the /workflow/run/ response without "results" (the
+    outputs were already sent), or an "error" event.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    try:
+        executor = await prepare_workflow(
+            file, pipeline_json, dataset_id, sheet_name, compact_dtypes, compiled, streaming,
+            # Node threads hand their events to the event loop
+            on_event=lambda event: loop.call_soon_threadsafe(events.put_nowait, event)
         )
+    except HTTPException:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_lines():
+        run = asyncio.ensure_future(analysis_pool.run(executor.run))
+        run.add_done_callback(lambda _: events.put_nowait(None))
+        while (event := await events.get()) is not None:
+            yield dumps(event) + b"\n"
+        try:
+            run.result()
+            done = {"event": "done", **executor.summary(include_results=False)}
+        except HTTPException as e:
+            done = {"event": "error", "detail": e.detail}
+        except Exception as e:
+            traceback.print_exc()
+            done = {"event": "error", "detail": str(e)}
+        yield dumps(done) + b"\n"
+
+    return StreamingResponse(event_lines(), media_type="application/x-ndjson")
 
-        result = executor.run()
+# ----------------------------
+# Background jobs: analyze and workflow runs that outlive the request
+# ----------------------------
+async def submit_job(kind: str, file: UploadFile, dataset_id: str, params: dict) -> dict:
+    """
+    Hands a job to the broker and returns its status. The upload is copied to
+    the job spool first (the request's copy is gone once we answer), unless
+    the job runs in this process and the dataset is already cached.
+    """
+    if file is None and not dataset_id:
+        raise HTTPException(status_code=400, detail="Please upload a file or provide a dataset_id.")
+    job_id = new_job_id()
+    input_path = None
+    if file is not None and not (job_broker.shares_memory and dataset_id and dataset_cache.get(dataset_id)):
+        upload = await spool_upload(file)
+        input_path = await analysis_pool.run(save_job_input, upload, job_id, file.filename)
+    return job_broker.submit(job_id, kind, {"dataset_id": dataset_id, **params},
+                             input_path, file.filename if file is not None else None)
 
-        return {"success": True, "result": result}
+@app.post("/api/v1/jobs/analyze", status_code=202)
+async def submit_analyze_job(
+    file: UploadFile = File(None),
+    col_dist_target: str = Form(None),
+    col_time_target: str = Form(None),
+    forecast_model: str = Form(None),
+    dataset_id: str = Form(None),
+    sheet_name: str = Form(None),
+    approximate: bool = Form(False),
+    out_of_core: bool = Form(False),
+    compact_dtypes: bool = Form(None)
+):
+    """/api/v1/analyze as a background job: answers with the job's id and status straight away."""
+    try:
+        check_forecast_model(forecast_model)
+        return await submit_job("analyze", file, dataset_id, {
+            "col_dist_target": col_dist_target,
+            "col_time_target": col_time_target,
+            "forecast_model": forecast_model,
+            "sheet_name": sheet_name,
+            "approximate": approximate,
+            "out_of_core": out_of_core,
+            "compact_dtypes": compact_dtypes,
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/v1/jobs/workflow", status_code=202)
+async def submit_workflow_job(
+    file: UploadFile = File(None),
+    pipeline_json: str = Form(...),
+    dataset_id: str = Form(None),
+    sheet_name: str = Form(None),
+    compact_dtypes: bool = Form(None),
+    compiled: bool = Form(None),
+    streaming: bool = Form(None)
+):
+    """
+    /workflow/run/ as a background job. While it runs, the job's progress
+    counts finished nodes; its result is the /workflow/run/ response.
+    """
+    try:
+        json.loads(pipeline_json)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="pipeline_json is not valid JSON.")
+    try:
+        return await submit_job("workflow", file, dataset_id, {
+            "pipeline_json": pipeline_json,
+            "sheet_name": sheet_name,
+            "compact_dtypes": compact_dtypes,
+            "compiled": compiled,
+            "streaming": streaming,
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+def _job_not_found(job_id: str) -> HTTPException:
+    return HTTPException(status_code=404, detail=f"Job '{job_id}' not found. It may have expired.")
+
+@app.get("/api/v1/jobs/{job_id}")
+def job_status(job_id: str):
+    """Status of a job: queued, running, succeeded, failed or cancelled, with progress while it runs."""
+    status = job_broker.status(job_id)
+    if status is None:
+        raise _job_not_found(job_id)
+    return status
+
+@app.get("/api/v1/jobs/{job_id}/result")
+def job_result(job_id: str):
+    """The finished job's response; 409 while it is still queued or running, or if it was cancelled."""
+    status, result = job_broker.result(job_id)
+    if status is None:
+        raise _job_not_found(job_id)
+    if status["status"] == "failed":
+        raise HTTPException(status_code=500, detail=status["error"])
+    if status["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' is {status['status']}.")
+    return FastJSONResponse(result)
+
+@app.delete("/api/v1/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancels a job. A running workflow stops before its next node; returns the job's status."""
+    status = job_broker.cancel(job_id)
+    if status is None:
+        raise _job_not_found(job_id)
+    return status
+
 # ----------------------------
 # Endpoint 3: AI Chatbot (creates agent and queries it immediately)
 # This endpoint will also store the created agent in memory for later calls to /query_agent
 # ----------------------------
 @app.post("/api/v1/chat")
 async def chat_with_file(
-    file: UploadFile = File(...),
-    question: str = Form(...)
+    file: UploadFile = File(None),
+    question: str = Form(...),
+    dataset_id: str = Form(None),
+    sheet_name: str = Form(None),
+    compact_dtypes: bool = Form(None)
 ):
     try:
-        contents = await file.read()
+        dataset = await resolve_dataset(file, dataset_id, sheet_name, compact_dtypes)
 
         # Create the agent using your ai_agent.create_agent implementation
-        agent = create_agent(contents, file.filename)
+        agent = await agent_pool.run(create_agent, None, dataset.file_name, dataset=dataset)
         if agent is None:
             raise HTTPException(status_code=500, detail="Could not create AI agent.")
 
@@ -172,9 +544,11 @@ async def chat_with_file(
         agent_storage["agent"] = agent
 
         # Query the agent immediately for the returned answer
-        answer = query_agent(agent, question)
-        return {"answer": answer}
+        answer = await agent_pool.run(query_agent, agent, question)
+        return {"answer": answer, "datasetId": dataset.dataset_id}
 
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error in chat: {e}")
@@ -194,12 +568,147 @@ async def handle_agent_query(request: QueryRequest):
         )
 
     try:
-        answer = query_agent(agent, user_question)
+        answer = await agent_pool.run(query_agent, agent, user_question)
         return {"answer": answer}
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
+# ----------------------------
+# Endpoint 5: register a dataset without analyzing it
+# The dashboard then fetches only the panels it shows, by dataset id
+# ----------------------------
+@app.post("/api/v1/datasets")
+async def upload_dataset(
+    file: UploadFile = File(...),
+    sheet_name: str = Form(None),
+    compact_dtypes: bool = Form(None)
+):
+    try:
+        dataset = await resolve_dataset(file, None, sheet_name, compact_dtypes)
+        return {
+            "datasetId": dataset.dataset_id,
+            "fileName": dataset.file_name,
+            "rows": len(dataset.df),
+            "columns": [str(col) for col in dataset.df.columns],
+            "memoryBytes": dataset.nbytes,
+            "compaction": get_compaction_report(dataset.df)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ----------------------------
+# Endpoints 6-13: one dashboard panel each, computed lazily and memoized
+# per dataset and parameters
+# ----------------------------
+async def panel_response(dataset_id: str, panel: str, arrow_frame=None, **params):
+    """
+    The panel as JSON, or as an Arrow IPC stream of arrow_frame(panel result)
+    when that function is given (for clients that asked for Arrow).
+    """
+    dataset = dataset_cache.get(dataset_id)
+    if dataset is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Dataset '{dataset_id}' not found. Please upload the file again."
+        )
+    try:
+        result = await analysis_pool.run(get_panel, dataset.df, panel, **params)
+        if arrow_frame is not None:
+            return await analysis_pool.run(arrow_response, arrow_frame(result))
+        return FastJSONResponse(panel_payload(result))
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # Unknown column or other bad panel parameter
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/datasets/{dataset_id}/kpis")
+async def dataset_kpis(dataset_id: str):
+    return await panel_response(dataset_id, "kpis")
+
+@app.get("/api/v1/datasets/{dataset_id}/insights")
+async def dataset_insights(dataset_id: str):
+    return await panel_response(dataset_id, "insights")
+
+@app.get("/api/v1/datasets/{dataset_id}/dictionary")
+async def dataset_dictionary(dataset_id: str):
+    return await panel_response(dataset_id, "dictionary")
+
+@app.get("/api/v1/datasets/{dataset_id}/distribution")
+async def dataset_distribution(dataset_id: str, column: str = None):
+    return await panel_response(dataset_id, "distribution", column=column)
+
+@app.get("/api/v1/datasets/{dataset_id}/timeseries")
+async def dataset_timeseries(dataset_id: str, column: str = None, forecast_model: str = None):
+    check_forecast_model(forecast_model)
+    return await panel_response(dataset_id, "timeseries", column=column, forecast_model=forecast_model)
+
+@app.get("/api/v1/datasets/{dataset_id}/table")
+async def dataset_table(
+    dataset_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=TABLE_MAX_PAGE_SIZE),
+    sort: str = None,
+    filter: List[str] = Query(None),
+    accept: str = Header(None)
+):
+    """
+    One page of the sorted, filtered table. 'sort' is "col:asc,other:desc";
+    each 'filter' is "col:op:value" with op one of eq, ne, lt, le, gt, ge,
+    contains. Pages are not memoized (there are too many of them), but the
+    sort orders behind them are. With "Accept: application/vnd.apache.arrow.stream"
+    the page's rows come as an Arrow IPC stream, with totalRows, offset and
+    limit in its "response" schema metadata.
+    """
+    dataset = dataset_cache.get(dataset_id)
+    if dataset is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Dataset '{dataset_id}' not found. Please upload the file again."
+        )
+    try:
+        if accepts_arrow(accept):
+            page = await analysis_pool.run(
+                get_table_page, dataset.df, offset=offset, limit=limit, sort=sort, filters=filter
+            )
+            return await analysis_pool.run(arrow_response, page.pop("rows"), page)
+        return FastJSONResponse(await analysis_pool.run(
+            get_table_data, dataset.df, offset=offset, limit=limit, sort=sort, filters=filter
+        ))
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # Unknown column or malformed sort/filter spec
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/datasets/{dataset_id}/health")
+async def dataset_health(dataset_id: str):
+    return await panel_response(dataset_id, "health")
+
+@app.get("/api/v1/datasets/{dataset_id}/correlation")
+async def dataset_correlation(dataset_id: str, accept: str = Header(None)):
+    """
+    Heatmap triples as JSON. Arrow clients get the square matrix instead,
+    rounded like the triples: one column per variable, with row i belonging
+    to column i.
+    """
+    if accepts_arrow(accept):
+        return await panel_response(dataset_id, "correlation",
+                                    arrow_frame=lambda result: result["_result"]["matrix"].round(3))
+    return await panel_response(dataset_id, "correlation")
+
 # ----------------------------
 # Root health endpoint
 # ----------------------------
@@ -0,0 +1,243 @@
+# backend/app/metrics.py
+import contextvars
+import functools
+import math
+import os
+import threading
+import time
+
+import pandas as pd
+
+from app.config import METRICS_ENABLED
+
+# Latency buckets in seconds, from a cached panel lookup to a large upload
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Size buckets in bytes, 64 KiB to 16 GiB
+BYTES_BUCKETS = tuple(2 ** power for power in range(16, 35, 2))
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}  # label values -> value
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key: tuple, value) -> list:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """A value that only goes up (requests, bytes, rows)."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that goes up and down; set_max keeps the highest value seen (peak memory)."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_max(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = max(self._values.get(key, value), value)
+
+
+class Histogram(_Metric):
+    """Observations counted in cumulative buckets, plus their count and sum."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DURATION_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "count": 0, "sum": 0.0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["count"] += 1
+            state["sum"] += value
+
+    def _render_sample(self, key: tuple, state) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state["counts"]):
+            cumulative += count
+            labels = _format_labels(self.labels + ("le",), key + (_format_value(float(bound)),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labels + ("le",), key + ("+Inf",))
+        lines.append(f"{self.name}_bucket{labels} {state['count']}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {state['count']}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(state['sum'])}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The process's metrics, rendered in the Prometheus text format by /metrics.
+
+    Collectors are callables run at scrape time that return
+    (name, help, kind, [(labels dict, value), ...]) tuples; they expose
+    numbers other modules already keep (cache and pool stats) without
+    touching their hot paths.
+    """
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: tuple = ()) -> Gauge:
+        return self._add(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DURATION_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, help_text, kind, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_format_labels(names, tuple(labels[n] for n in names))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+stage_duration = registry.histogram(
+    "app_stage_duration_seconds", "Time spent in each instrumented stage.", ("stage",))
+stage_errors = registry.counter(
+    "app_stage_errors_total", "Instrumented stage calls that raised.", ("stage",))
+rows_processed = registry.counter(
+    "app_rows_processed_total", "Rows of the DataFrames each stage read or produced.", ("stage",))
+columns_processed = registry.counter(
+    "app_columns_processed_total", "Columns of the DataFrames each stage read or produced.", ("stage",))
+bytes_ingested = registry.counter(
+    "app_ingested_bytes_total", "Bytes of uploaded files parsed, by file extension.", ("format",))
+stage_peak_rss = registry.gauge(
+    "app_stage_peak_resident_bytes", "Highest process resident memory seen at the end of each stage.", ("stage",))
+workflow_peak_memory = registry.histogram(
+    "app_workflow_peak_memory_bytes", "Largest total size of the node results held at once, per workflow run.",
+    buckets=BYTES_BUCKETS)
+request_duration = registry.histogram(
+    "app_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status"))
+
+
+# --- Per-request timings ---
+# Stages finished during the current request, as (stage, seconds); read by
+# the Server-Timing middleware. Thread pools copy the context, so stages run
+# on worker threads land in the same list.
+request_timings = contextvars.ContextVar("request_timings", default=None)
+
+def resident_memory_bytes() -> int:
+    """The process's current resident set size (peak size where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+def record_stage(stage: str, seconds: float, frame: pd.DataFrame = None):
+    """Records one finished stage: its latency, the shape of 'frame' and memory."""
+    if not METRICS_ENABLED:
+        return
+    stage_duration.observe(seconds, stage=stage)
+    if isinstance(frame, pd.DataFrame):
+        rows_processed.inc(len(frame), stage=stage)
+        columns_processed.inc(len(frame.columns), stage=stage)
+    stage_peak_rss.set_max(resident_memory_bytes(), stage=stage)
+    timings = request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+def instrumented(stage: str):
+    """
+    Decorator recording a stage per call. Rows and columns are counted from
+    the DataFrame the function returns or, failing that, its first
+    DataFrame argument.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                stage_errors.inc(stage=stage)
+                raise
+            frame = result if isinstance(result, pd.DataFrame) else next(
+                (arg for arg in args if isinstance(arg, pd.DataFrame)), None)
+            record_stage(stage, time.perf_counter() - start, frame)
+            return result
+        return wrapper
+    return decorate
+
+def server_timing_header(timings: list) -> str:
+    """Server-Timing value for a request's stages, e.g. 'analysis-get_kpis;dur=12.3'."""
+    parts = []
+    for stage, seconds in timings:
+        # Metric names are tokens: no dots or colons
+        name = "".join(c if c.isalnum() or c in "-_" else "-" for c in stage)
+        parts.append(f"{name};dur={seconds * 1000:.1f}")
+    return ", ".join(parts)
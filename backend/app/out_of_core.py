@@ -0,0 +1,610 @@
+# backend/app/out_of_core.py
+import os
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.analysis_utils import (
+    get_kpis,
+    get_actionable_insights,
+    get_data_dictionary,
+    get_column_distribution,
+    get_table_data,
+    get_data_health,
+    find_strong_correlations,
+    heatmap_data,
+    format_time_series,
+    detect_datetime_column,
+    _infer_datetime_format,
+    _sample_rows,
+    _to_datetime,
+)
+from app.config import (
+    OUT_OF_CORE_SPILL_DIR,
+    OUT_OF_CORE_BATCH_ROWS,
+    OUT_OF_CORE_SPILL_COMPRESSION,
+    OUT_OF_CORE_MAX_DATASETS,
+    OUT_OF_CORE_SPILL_MAX_BYTES,
+    APPROXIMATE_SAMPLE_SIZE,
+    CORRELATION_MAX_COLUMNS,
+    CORRELATION_TOP_K,
+    HLL_PRECISION,
+    DATETIME_SAMPLE_SIZE,
+)
+from app.dataset_cache import DatasetCache
+from app.dataset_profile import DatasetProfile, is_numeric_column, is_categorical_column
+from app.ingest import open_binary_source, detect_encoding, source_size
+from app.metrics import instrumented
+from app.row_hashing import column_hashes, row_hashes
+from app import sketches
+
+OUT_OF_CORE_EXTENSIONS = ('.csv', '.parquet', '.feather', '.arrow')
+# Distinct values tracked per column when counting top values
+TOP_VALUES_CAPACITY = 10_000
+# Bytes Arrow reads (and infers column types from) per CSV block
+CSV_BLOCK_SIZE = 16 * 1024 * 1024
+# Dataset ids are DatasetCache.compute_id hashes; anything else never names a spill file
+DATASET_ID_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+
+# --- Spilling uploads to Arrow files ---
+_csv_types = weakref.WeakKeyDictionary()  # upload file -> {encoding: CSV column types}
+
+def _open_csv(file_contents, encoding: str, column_types: dict = None):
+    import pyarrow.csv as pacsv
+
+    return pacsv.open_csv(
+        open_binary_source(file_contents),
+        read_options=pacsv.ReadOptions(encoding=encoding, block_size=CSV_BLOCK_SIZE),
+        # Empty text fields are missing values, as with pandas.read_csv
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True, column_types=column_types),
+    )
+
+def _csv_column_types(file_contents, encoding: str) -> dict:
+    """
+    Column types to read a CSV with. pandas.read_csv leaves dates as text
+    (the time-series code parses them), so columns Arrow types as dates are
+    text. Arrow infers types from the first block only: a longer file is
+    parsed once up front, and a column whose later values do not convert is
+    widened as read_csv would type it (integers to floats, else to text)
+    before checking again. Known types are kept per upload.
+    """
+    import pyarrow as pa
+
+    try:
+        known = _csv_types.get(file_contents, {})
+    except TypeError:  # bytes cannot be weakly referenced
+        known = {}
+    if encoding in known:
+        return known[encoding]
+
+    schema = _open_csv(file_contents, encoding).schema
+    column_types = {
+        field.name: pa.string() for field in schema
+        if pa.types.is_date(field.type) or pa.types.is_timestamp(field.type) or pa.types.is_time(field.type)
+    }
+    while source_size(file_contents) > CSV_BLOCK_SIZE:
+        reader = _open_csv(file_contents, encoding, column_types)
+        try:
+            for _ in reader:
+                pass
+            break
+        except pa.ArrowInvalid as e:
+            match = re.match(r"In CSV column #(\d+)", str(e))
+            if match is None:
+                raise
+            field = reader.schema.field(int(match.group(1)))
+            if pa.types.is_string(field.type):
+                raise
+            column_types[field.name] = pa.float64() if pa.types.is_integer(field.type) else pa.string()
+
+    try:
+        _csv_types.setdefault(file_contents, {})[encoding] = column_types
+    except TypeError:
+        pass
+    return column_types
+
+def _iter_csv_batches(file_contents, encoding: str):
+    import pyarrow as pa
+
+    reader = _open_csv(file_contents, encoding, _csv_column_types(file_contents, encoding))
+    if any(pa.types.is_binary(field.type) or pa.types.is_large_binary(field.type) for field in reader.schema):
+        # Same check as the in-memory reader: undecodable text is not utf-8
+        raise UnicodeDecodeError(encoding, b'', 0, 1, "binary column in CSV")
+    yield from reader
+
+def _iter_upload_batches(file_contents, file_name: str):
+    """Yields the upload as Arrow record batches, never holding the whole file in memory."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    extension = Path(file_name).suffix.lower()
+    if extension == '.csv':
+        encoding = detect_encoding(file_contents)
+        try:
+            yield from _iter_csv_batches(file_contents, encoding)
+        except UnicodeDecodeError:
+            if encoding == 'latin-1':
+                raise
+            yield from _iter_csv_batches(file_contents, 'latin-1')
+    elif extension == '.parquet':
+        yield from pq.ParquetFile(open_binary_source(file_contents)).iter_batches(batch_size=OUT_OF_CORE_BATCH_ROWS)
+    elif extension in ('.feather', '.arrow'):
+        reader = pa.ipc.open_file(open_binary_source(file_contents))
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+    else:
+        raise ValueError(
+            f"Out-of-core analysis supports {', '.join(OUT_OF_CORE_EXTENSIONS)} files, not '{extension}'."
+        )
+
+def spill_upload(file_contents, file_name: str, dataset_id: str) -> Path:
+    """
+    Writes the upload to OUT_OF_CORE_SPILL_DIR as an Arrow IPC file named
+    after its dataset id, batch by batch, compressed with
+    OUT_OF_CORE_SPILL_COMPRESSION. An upload that was spilled before is
+    reused as is.
+    """
+    import pyarrow as pa
+
+    spill_dir = Path(OUT_OF_CORE_SPILL_DIR)
+    spill_dir.mkdir(parents=True, exist_ok=True)
+    path = spill_dir / f"{dataset_id}.arrow"
+    if path.exists():
+        return path
+
+    # Written under a temporary name and renamed, so a half-written file is never opened
+    partial = spill_dir / f"{dataset_id}.{threading.get_ident()}.partial"
+    writer = None
+    try:
+        for batch in _iter_upload_batches(file_contents, file_name):
+            if writer is None:
+                options = pa.ipc.IpcWriteOptions(compression=OUT_OF_CORE_SPILL_COMPRESSION or None)
+                writer = pa.ipc.new_file(str(partial), batch.schema, options=options)
+            # Re-slice large batches (e.g. whole Feather files) to a bounded size
+            for offset in range(0, max(batch.num_rows, 1), OUT_OF_CORE_BATCH_ROWS):
+                writer.write_batch(batch.slice(offset, OUT_OF_CORE_BATCH_ROWS))
+        if writer is None:
+            raise ValueError("The file appears to be empty or contains no valid data.")
+        writer.close()
+        os.replace(partial, path)
+    finally:
+        if partial.exists():
+            partial.unlink()
+    return path
+
+
+def iter_upload_chunks(file_contents, file_name: str):
+    """
+    Yields the upload as pandas DataFrames of about OUT_OF_CORE_BATCH_ROWS
+    rows, read straight from the upload one batch at a time. Row labels
+    continue from chunk to chunk, as in a frame read in one go.
+    """
+    start = 0
+    for batch in _iter_upload_batches(file_contents, file_name):
+        for offset in range(0, batch.num_rows, OUT_OF_CORE_BATCH_ROWS):
+            chunk = OutOfCoreDataset._to_pandas(batch.slice(offset, OUT_OF_CORE_BATCH_ROWS))
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+    if start == 0:
+        raise ValueError("The file appears to be empty or contains no valid data.")
+
+def spill_chunks(chunks, name: str) -> Path:
+    """
+    Writes a stream of DataFrame chunks to a new Arrow IPC file in
+    OUT_OF_CORE_SPILL_DIR, so it can be analyzed as an OutOfCoreDataset.
+    The caller deletes the file when done with it.
+    """
+    import pyarrow as pa
+
+    spill_dir = Path(OUT_OF_CORE_SPILL_DIR)
+    spill_dir.mkdir(parents=True, exist_ok=True)
+    path = spill_dir / f"{name}.{threading.get_ident()}.{os.getpid()}.arrow"
+    writer = schema = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                writer = pa.ipc.new_file(str(path), schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        if writer is None:
+            raise ValueError("The file appears to be empty or contains no valid data.")
+        writer.close()
+    except BaseException:
+        if path.exists():
+            path.unlink()
+        raise
+    return path
+
+
+# --- Memory-mapped datasets ---
+class OutOfCoreDataset:
+    """
+    A spilled upload, read through a memory map one record batch at a time.
+    The operating system pages the file in and out, so datasets larger than
+    memory can be analyzed; only the current batch is converted to pandas.
+    """
+    def __init__(self, dataset_id: str, file_name: str, path: Path):
+        import pyarrow as pa
+
+        self.dataset_id = dataset_id
+        self.file_name = file_name
+        self.path = path
+        self._reader = pa.ipc.open_file(pa.memory_map(str(path), 'r'))
+        self.schema = self._reader.schema
+        self.num_batches = self._reader.num_record_batches
+        self._profile = None
+        self._profile_lock = threading.Lock()
+
+    @cached_property
+    def num_rows(self) -> int:
+        return sum(self._reader.get_batch(i).num_rows for i in range(self.num_batches))
+
+    @staticmethod
+    def _to_pandas(data) -> pd.DataFrame:
+        # Arrow date columns become datetime64 rather than objects holding datetime.date
+        return data.to_pandas(date_as_object=False)
+
+    @cached_property
+    def dtypes(self) -> pd.Series:
+        """The pandas dtypes the batches convert to."""
+        return self._to_pandas(self.schema.empty_table()).dtypes
+
+    def iter_batches(self, columns: list = None):
+        """Yields the dataset as pandas DataFrames of at most OUT_OF_CORE_BATCH_ROWS rows."""
+        for i in range(self.num_batches):
+            batch = self._reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select(list(columns))
+            yield self._to_pandas(batch)
+
+    def head(self, n: int) -> pd.DataFrame:
+        parts, remaining = [], n
+        for chunk in self.iter_batches():
+            parts.append(chunk.iloc[:remaining])
+            remaining -= len(parts[-1])
+            if remaining <= 0:
+                break
+        return pd.concat(parts, ignore_index=True) if parts else self._to_pandas(self.schema.empty_table())
+
+    @property
+    def profile(self) -> 'StreamingProfile':
+        """The dataset's StreamingProfile, built on first use."""
+        with self._profile_lock:
+            if self._profile is None:
+                self._profile = StreamingProfile(self)
+            return self._profile
+
+
+# --- Mergeable accumulators ---
+class CorrelationAccumulator:
+    """
+    Pairwise-complete Pearson correlations from sums that add up batch by
+    batch: per pair, the joint count, sums, sums of squares and cross products.
+    Values are shifted by the first batch's means to keep the sums well
+    conditioned (a constant shift does not change a correlation).
+    """
+    def __init__(self, n_columns: int):
+        shape = (n_columns, n_columns)
+        self._shift = None
+        self.count = np.zeros(shape)
+        self.sum = np.zeros(shape)      # sum[i, j]: sum of column i where column j is present
+        self.sum_sq = np.zeros(shape)
+        self.cross = np.zeros(shape)
+
+    def add(self, values: np.ndarray):
+        if self._shift is None:
+            with np.errstate(invalid='ignore'):
+                self._shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(values.shape[1])
+        values = values - self._shift
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
+        weights = present.astype(np.float64)
+        self.count += weights.T @ weights
+        self.sum += filled.T @ weights
+        self.sum_sq += (filled * filled).T @ weights
+        self.cross += filled.T @ filled
+
+    def merge(self, other: 'CorrelationAccumulator'):
+        # Both sides must use the same shift for their sums to be compatible
+        if self._shift is None:
+            self.__dict__.update(other.__dict__)
+            return
+        for name in ('count', 'sum', 'sum_sq', 'cross'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def correlation(self) -> np.ndarray:
+        n, sum_x, sum_y = self.count, self.sum, self.sum.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covariance = n * self.cross - sum_x * sum_y
+            variance_x = n * self.sum_sq - sum_x ** 2
+            variance_y = variance_x.T
+            corr = covariance / np.sqrt(variance_x * variance_y)
+        # Fewer than two joint observations or a constant column: undefined, like pandas
+        corr[(n < 2) | (variance_x <= 0) | (variance_y <= 0)] = np.nan
+        np.clip(corr, -1.0, 1.0, out=corr)
+        diagonal = np.diagonal(corr).copy()
+        np.fill_diagonal(corr, np.where(np.isnan(diagonal), np.nan, 1.0))
+        return corr
+
+
+def _add_counts(total: pd.Series, counts: pd.Series) -> pd.Series:
+    return counts if total is None else total.add(counts, fill_value=0)
+
+
+class StreamingProfile(DatasetProfile):
+    """
+    DatasetProfile of an OutOfCoreDataset, built in one pass over its batches.
+
+    Row, null, duplicate and distinct counts and the correlation sums are
+    exact; quartiles come from a reservoir sample (so approximation() reports
+    their rank error). Passes for a single column (top values, outlier
+    counts, monthly counts) only read that column from the memory map.
+    """
+    def __init__(self, dataset: OutOfCoreDataset, sample_size: int = APPROXIMATE_SAMPLE_SIZE,
+                 max_correlation_columns: int = CORRELATION_MAX_COLUMNS):
+        self._dataset = dataset
+        self.dtypes = dataset.dtypes
+        self.columns = list(self.dtypes.index)
+        self.n_cols = len(self.columns)
+        self.numeric_columns = [col for col, dtype in self.dtypes.items() if is_numeric_column(dtype)]
+        self.categorical_columns = [col for col, dtype in self.dtypes.items() if is_categorical_column(dtype)]
+        self.correlation_columns = self.numeric_columns
+        if max_correlation_columns and len(self.correlation_columns) > max_correlation_columns:
+            self.correlation_columns = self.correlation_columns[:max_correlation_columns]
+
+        reservoir = sketches.RowReservoir(sample_size)
+        correlations = CorrelationAccumulator(len(self.correlation_columns))
+        null_counts = None
+        chunk_hashes = []  # Hashed like clean_data's, so chunks holding a column as int64 or float64 agree
+        self.n_rows = 0
+        for chunk in dataset.iter_batches():
+            self.n_rows += len(chunk)
+            null_counts = _add_counts(null_counts, chunk.isna().sum())
+            reservoir.add(chunk)
+            if self.correlation_columns:
+                correlations.add(chunk[self.correlation_columns].to_numpy(dtype='float64', na_value=np.nan))
+            if self.n_cols:
+                # 8 bytes per row, whatever the width of the rows
+                chunk_hashes.append(row_hashes(chunk))
+
+        self.total_cells = self.n_rows * self.n_cols
+        self.null_counts = (null_counts if null_counts is not None else pd.Series(0, index=self.columns)).astype('int64')
+        self.missing_values = int(self.null_counts.sum())
+        self.duplicate_count = sketches.estimate_duplicates(np.concatenate(chunk_hashes), 1.0)[0] if chunk_hashes else 0
+        self._sample = reservoir.sample()
+        self.sample_size = len(self._sample)
+        self.correlation_values = correlations.correlation()
+        self._top_value_errors = {}  # column -> largest undercount of its top values
+
+    @property
+    def sample(self) -> pd.DataFrame:
+        return self._sample
+
+    @cached_property
+    def distinct_counts(self) -> pd.Series:
+        """Estimated number of distinct non-null values per column (HyperLogLog, one pass per column)."""
+        counts = {}
+        for column in self.columns:
+            counter = sketches.HyperLogLog(HLL_PRECISION)
+            for chunk in self._dataset.iter_batches([column]):
+                counter.add_hashes(column_hashes(chunk[column].dropna()))
+            counts[column] = counter.count()
+        return pd.Series(counts, dtype='int64')
+
+    @cached_property
+    def memory_usage(self) -> pd.Series:
+        """Bytes of each column in the memory-mapped Arrow file (what a batch costs once paged in)."""
+        reader = self._dataset._reader
+        totals = np.zeros(self.n_cols, dtype=np.int64)
+        for i in range(self._dataset.num_batches):
+            batch = reader.get_batch(i)
+            totals += [column.nbytes for column in batch.columns]
+        return pd.Series(totals, index=self.columns)
+
+    def quartiles(self, column) -> tuple:
+        q1, q3 = self._sample[column].quantile([0.25, 0.75])
+        return q1, q3
+
+    def count_outside(self, column, lower, upper) -> int:
+        return sum(
+            int(((chunk[column] < lower) | (chunk[column] > upper)).sum())
+            for chunk in self._dataset.iter_batches([column])
+        )
+
+    def top_values(self, column, n: int = 10) -> pd.Series:
+        """
+        Most frequent values, counted batch by batch. Counts are exact while
+        the column has at most TOP_VALUES_CAPACITY distinct values; past that
+        only the largest counts are kept after each batch, so memory stays
+        bounded. A value that was dropped and seen again restarts from zero,
+        so each count is low by at most the sum of the largest dropped
+        counts, reported by approximation().
+        """
+        counts, pruned = None, 0
+        for chunk in self._dataset.iter_batches([column]):
+            counts = _add_counts(counts, chunk[column].value_counts())
+            if len(counts) > TOP_VALUES_CAPACITY:
+                largest = counts.sort_values(ascending=False, kind='stable')
+                pruned += int(largest.iloc[TOP_VALUES_CAPACITY])
+                counts = largest.iloc[:TOP_VALUES_CAPACITY]
+        self._top_value_errors[column] = pruned
+        if counts is None:
+            return pd.Series(dtype='int64')
+        # Stable sort so ties keep their first-seen order, like value_counts()
+        return counts.astype('int64').sort_values(ascending=False, kind='stable').head(n)
+
+    def monthly_counts(self, column, date_format: str = None) -> pd.Series:
+        """Records per month-end of a date column, counted batch by batch."""
+        counts = None
+        for chunk in self._dataset.iter_batches([column]):
+            timestamps = _to_datetime(chunk[column], date_format).dropna()
+            if len(timestamps):
+                counts = _add_counts(counts, pd.Series(0, index=pd.DatetimeIndex(timestamps)).resample('ME').size())
+        if counts is None:
+            return None
+        # Months missing from every batch count as zero, as with a single resample
+        return counts.resample('ME').sum().astype('int64')
+
+    def approximation(self, distribution_column=None) -> dict:
+        exact = self.sample_size >= self.n_rows
+        bounds = {"exact": exact, "totalRows": self.n_rows, "sampledRows": self.sample_size}
+        if not exact:
+            bounds["confidence"] = sketches.CONFIDENCE
+            # The IQR fences used for anomalies come from the sample
+            bounds["quantileRankError"] = round(sketches.quantile_rank_error(self.sample_size), 6)
+        if self._top_value_errors.get(distribution_column):
+            bounds["exact"] = False
+            bounds["distribution"] = {
+                "column": distribution_column,
+                "maxUndercount": self._top_value_errors[distribution_column],
+            }
+        return bounds
+
+
+# --- Registry ---
+_datasets = OrderedDict()  # dataset_id -> OutOfCoreDataset, least recently used first
+_datasets_lock = threading.Lock()
+
+def get_out_of_core_dataset(dataset_id: str):
+    """Returns the OutOfCoreDataset for dataset_id, reopening a spill file left by an earlier run."""
+    if not DATASET_ID_PATTERN.fullmatch(dataset_id or ''):
+        return None
+    with _datasets_lock:
+        dataset = _datasets.get(dataset_id)
+        if dataset is not None:
+            _datasets.move_to_end(dataset_id)
+    if dataset is None:
+        path = Path(OUT_OF_CORE_SPILL_DIR) / f"{dataset_id}.arrow"
+        if path.exists():
+            dataset = _register(OutOfCoreDataset(dataset_id, path.name, path))
+    return dataset
+
+def _register(dataset: OutOfCoreDataset) -> OutOfCoreDataset:
+    with _datasets_lock:
+        dataset = _datasets.setdefault(dataset.dataset_id, dataset)
+        _datasets.move_to_end(dataset.dataset_id)
+    _evict(keep=dataset.dataset_id)
+    return dataset
+
+def _evict(keep: str):
+    """
+    Deletes spill files, and unregisters their datasets, until at most
+    OUT_OF_CORE_MAX_DATASETS files within OUT_OF_CORE_SPILL_MAX_BYTES are
+    left. Files from earlier runs that were not reopened go first, then the
+    least recently used datasets; 'keep' (the one just registered) stays.
+    An analysis still reading an evicted dataset keeps its memory map.
+    """
+    spill_dir = Path(OUT_OF_CORE_SPILL_DIR)
+    files = {}
+    for path in spill_dir.glob('*.arrow'):
+        if DATASET_ID_PATTERN.fullmatch(path.stem):
+            try:
+                files[path.stem] = path.stat()
+            except FileNotFoundError:  # Evicted by another thread meanwhile
+                pass
+    with _datasets_lock:
+        registered = [dataset_id for dataset_id in _datasets if dataset_id in files]
+    unregistered = sorted(set(files) - set(registered), key=lambda dataset_id: files[dataset_id].st_mtime)
+
+    total_bytes = sum(stat.st_size for stat in files.values())
+    count = len(files)
+    for dataset_id in unregistered + registered:
+        if count <= OUT_OF_CORE_MAX_DATASETS and (OUT_OF_CORE_SPILL_MAX_BYTES <= 0
+                                                  or total_bytes <= OUT_OF_CORE_SPILL_MAX_BYTES):
+            break
+        if dataset_id == keep:
+            continue
+        with _datasets_lock:
+            _datasets.pop(dataset_id, None)
+        try:
+            (spill_dir / f"{dataset_id}.arrow").unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:  # e.g. still mapped on Windows; retried on the next eviction
+            print(f"Out-of-core: could not delete spill file {dataset_id[:12]}: {e}")
+            continue
+        print(f"Out-of-core: evicted {dataset_id[:12]} ({files[dataset_id].st_size:,} bytes)")
+        total_bytes -= files[dataset_id].st_size
+        count -= 1
+
+@instrumented("ingest.spill_upload")
+def load_out_of_core(file_contents, file_name: str) -> OutOfCoreDataset:
+    """
+    Spills an upload to a memory-mapped Arrow file and returns it as an
+    OutOfCoreDataset. The dataset id is the same content hash the in-memory
+    dataset cache uses.
+    """
+    dataset_id = DatasetCache.compute_id(file_contents, file_name)
+    dataset = get_out_of_core_dataset(dataset_id)
+    if dataset is not None:
+        return dataset
+    path = spill_upload(file_contents, file_name, dataset_id)
+    print(f"Out-of-core: spilled '{file_name}' as {dataset_id[:12]} ({path.stat().st_size:,} bytes)")
+    return _register(OutOfCoreDataset(dataset_id, file_name, path))
+
+
+# --- Dashboard ---
+def _time_series(profile: StreamingProfile, target_column=None, forecast_model: str = None):
+    empty = {"timeColumn": None, "seriesData": [], "xAxisData": []}
+    if profile.n_rows == 0:
+        return empty
+    if target_column is None:
+        # Judged on the reservoir sample, which spans the whole file
+        date_col, date_format = detect_datetime_column(profile.sample)
+    else:
+        if target_column not in profile.columns:
+            raise ValueError(f"Time column '{target_column}' not found in file.")
+        date_col = target_column
+        date_format = _infer_datetime_format(_sample_rows(profile.sample[date_col], DATETIME_SAMPLE_SIZE).dropna())
+    if date_col is None:
+        return empty
+
+    try:
+        monthly_counts = profile.monthly_counts(date_col, date_format)
+    except Exception:
+        monthly_counts = None # Conversion failed
+    if monthly_counts is None:
+        return empty
+    return format_time_series(date_col, monthly_counts, forecast_model)
+
+@instrumented("analysis.get_out_of_core_dashboard")
+def get_out_of_core_dashboard(dataset: OutOfCoreDataset, col_dist_target=None, col_time_target=None,
+                              forecast_model: str = None):
+    """
+    Same payload as analysis_utils.get_dashboard_data, computed batch by
+    batch over a memory-mapped dataset instead of a DataFrame in memory,
+    plus an "approximation" section (only the anomaly quartiles are sampled).
+    """
+    profile = dataset.profile
+    sample = profile.sample
+    kpis = get_kpis(sample, profile)
+
+    corr = profile.correlation_values
+    columns = profile.correlation_columns
+    correlation_matrix = pd.DataFrame(corr, index=columns, columns=columns)
+    rows, cols, values = find_strong_correlations(corr, top_k=CORRELATION_TOP_K)
+    strong = [(columns[i], columns[j], value) for i, j, value in zip(rows.tolist(), cols.tolist(), values.tolist())]
+    insights = get_actionable_insights(sample, kpis, correlation_matrix, profile, strong_correlations=strong)
+
+    column_dist = get_column_distribution(sample, target_column=col_dist_target, profile=profile)
+    table_data = get_table_data(dataset.head(100))
+    table_data["totalRows"] = profile.n_rows
+    return {
+        "kpiData": kpis,
+        "insights": insights,
+        "dictionary": get_data_dictionary(sample, profile),
+        "columnDist": column_dist,
+        "timeSeries": _time_series(profile, col_time_target, forecast_model),
+        "tableData": table_data,
+        "dataHealth": get_data_health(sample, profile),
+        "correlationMatrix": {"columns": list(columns), "data": heatmap_data(corr)},
+        "approximation": profile.approximation(column_dist['columnName']),
+    }
@@ -0,0 +1,88 @@
+# backend/app/panels.py
+import pandas as pd
+
+from app.analysis_utils import (
+    get_kpis,
+    get_actionable_insights,
+    get_data_dictionary,
+    get_column_distribution,
+    get_time_series_data,
+    get_table_data,
+    get_data_health,
+    get_correlation_matrix,
+)
+from app.dataset_profile import get_profile
+from app.forecasting import is_provisional
+from app.frame_memo import frame_memo
+
+
+# --- Panel builders ---
+# Each computes one dashboard section from a DataFrame and its (memoized) profile.
+def _kpis(df):
+    return get_kpis(df, get_profile(df))
+
+def _correlation(df):
+    result = get_correlation_matrix(df, get_profile(df))
+    return {"columns": result['columns'], "data": result['data'], "_result": result}
+
+def _insights(df):
+    correlation = get_panel(df, "correlation")["_result"]
+    return get_actionable_insights(df, get_panel(df, "kpis"), correlation['matrix'], get_profile(df),
+                                   strong_correlations=correlation['strong'])
+
+def _dictionary(df):
+    return get_data_dictionary(df, get_profile(df))
+
+def _distribution(df, column=None):
+    return get_column_distribution(df, target_column=column, profile=get_profile(df))
+
+def _timeseries(df, column=None, forecast_model=None):
+    return get_time_series_data(df, target_column=column, forecast_model=forecast_model)
+
+def _table(df):
+    return get_table_data(df)
+
+def _health(df):
+    return get_data_health(df, get_profile(df))
+
+PANELS = {
+    "kpis": _kpis,
+    "insights": _insights,
+    "dictionary": _dictionary,
+    "distribution": _distribution,
+    "timeseries": _timeseries,
+    "table": _table,
+    "health": _health,
+    "correlation": _correlation,
+}
+
+
+def get_panel(df: pd.DataFrame, panel: str, **params):
+    """
+    Returns one dashboard section for df, computed on first request and then
+    memoized per frame and parameters. Changing e.g. the distribution column
+    only computes that panel; everything else is served from the memo.
+    A time series whose forecast fell back to a faster model is not memoized,
+    so the requested model's forecast is served once it has been fitted.
+    """
+    builder = PANELS.get(panel)
+    if builder is None:
+        raise ValueError(f"Unknown panel '{panel}'. Available panels: {', '.join(PANELS)}.")
+    params = {key: value for key, value in params.items() if value is not None}
+    key = ('panel', panel, tuple(sorted(params.items())))
+    if panel != "timeseries":
+        return frame_memo.get_or_compute(df, key, lambda: builder(df, **params))
+
+    result = frame_memo.get(df, key)
+    if result is None:
+        result = builder(df, **params)
+        if not is_provisional(params.get('forecast_model'), result.get('forecastModel')):
+            frame_memo.set(df, key, result)
+    return result
+
+
+def panel_payload(value):
+    """Strips internal fields (prefixed with '_') before a panel is returned to the client."""
+    if isinstance(value, dict):
+        return {key: item for key, item in value.items() if not str(key).startswith('_')}
+    return value
@@ -0,0 +1,278 @@
+# backend/app/row_hashing.py
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+from app.frame_memo import frame_memo
+from app.sketches import combine_hashes
+
+
+def _hash_key(subset):
+    return ('row_hashes', tuple(subset) if subset is not None else None)
+
+
+# DataFrame.duplicated() treats every missing value (None, NaN, NA, NaT) as
+# the same value when it compares several columns, but a single column goes
+# through Series.duplicated(), which may tell them apart (pandas 3 does)
+_SERIES_MISSING_EQUAL = bool(pd.Series([None, float('nan')], dtype=object).duplicated().iloc[1])
+# Hash of a missing value in a numeric column, whatever its dtype: the hash of NaN
+_MISSING_HASH = pd.util.hash_array(np.array([np.nan]), categorize=False)[0]
+
+
+def _value_key(value) -> str:
+    """
+    A key for an object-column value outside the vectorized cases (e.g.
+    dates, tuples, integers beyond int64), equal for exactly the values
+    duplicated() treats as equal. hash_pandas_object hashes objects by
+    their str(), so 1 and '1' would collide while 2 and 2.0 would not.
+    """
+    if isinstance(value, (int, np.integer)):
+        return f"n:{int(value)}"
+    if isinstance(value, datetime):
+        return f"t:{value.isoformat()}"
+    return f"{type(value).__qualname__}:{value!r}"
+
+
+# Integers up to this size convert to float64 exactly
+_MAX_EXACT_INTEGER = 2 ** 53
+_INTEGER_TYPES = (bool, int, np.bool_, np.integer)
+# lib.infer_dtype results of object columns that convert to one NumPy dtype
+_NUMBER_DTYPES = {'boolean': np.bool_, 'integer': np.int64, 'floating': np.float64}
+# Leading values of an Arrow string column checked for repeats before hashing it
+_CARDINALITY_SAMPLE = 10_000
+# Mixed into the hashes of keys (see _tagged_hashes), so they differ from the hashes of plain strings
+_KEY_TAG = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _number_hashes(numbers: np.ndarray) -> np.ndarray:
+    """
+    Hashes of a bool, integer or float array by numeric value, so 1, 1.0
+    and True hash alike. A stream's chunks may hold one column as int64 in
+    some and float64 in others (pandas turns an integer column with a
+    missing value into floats), and equal rows must hash equally in both.
+    """
+    if numbers.dtype.kind == 'f':
+        # duplicated() treats -0.0 and 0.0 as equal, hashing does not
+        numbers = numbers.astype(np.float64) + 0.0
+        hashes = pd.util.hash_array(numbers, categorize=False)
+        # Floats this large are whole numbers; hash them like the integers they equal
+        large = (np.abs(numbers) > _MAX_EXACT_INTEGER) & (np.abs(numbers) < 2.0 ** 63)
+        if large.any():
+            hashes[large] = pd.util.hash_array(numbers[large].astype(np.int64), categorize=False)
+        return hashes
+    if numbers.dtype.kind == 'b':
+        numbers = numbers.astype(np.int64)
+    hashes = pd.util.hash_array(numbers.astype(np.float64), categorize=False)
+    exact = numbers <= _MAX_EXACT_INTEGER
+    if numbers.dtype.kind == 'i':
+        exact &= numbers >= -_MAX_EXACT_INTEGER
+    if not exact.all():
+        # Larger integers would share a float64 with their neighbours
+        hashes[~exact] = pd.util.hash_array(numbers[~exact], categorize=False)
+    return hashes
+
+
+def _string_hashes(values: pd.Series) -> tuple:
+    """
+    (hashes, missing mask) of a column of strings and missing values, of
+    object or str dtype. When a sample shows many repeats, each distinct
+    string is hashed once.
+    """
+    step = max(len(values) // _CARDINALITY_SAMPLE, 1)
+    sample = values.iloc[::step]
+    repeats = len(sample) - sample.nunique()
+    # m values sampled from n with d distinct repeat about m**2 / 2d times;
+    # below about d = n / 2 distinct values hashing each one once is cheaper
+    if repeats * len(values) <= len(sample) ** 2:
+        missing = values.isna().to_numpy()
+        return pd.util.hash_array(values.to_numpy(dtype=object), categorize=False), missing
+    codes, uniques = pd.factorize(values.array)
+    uniques = np.asarray(uniques, dtype=object)
+    hashes = pd.util.hash_array(uniques, categorize=False)[codes] if len(uniques) else np.empty(len(codes), np.uint64)
+    return hashes, codes < 0
+
+
+def _mixed_hashes(values: np.ndarray) -> np.ndarray:
+    """
+    Hashes of an object array mixing Python types, value by value: strings
+    as strings, numbers by numeric value (as in _number_hashes), anything
+    else by a key (see _value_key). 'values' holds no missing values.
+    """
+    hashes = np.empty(len(values), dtype=np.uint64)
+    kinds = np.fromiter((_value_kind(value) for value in values), dtype=np.int8, count=len(values))
+    strings, floats, integers, others = (kinds == kind for kind in range(4))
+    if strings.any():
+        hashes[strings] = pd.util.hash_array(values[strings], categorize=True)
+    if floats.any():
+        hashes[floats] = _number_hashes(np.array(values[floats].tolist(), dtype=np.float64))
+    if integers.any():
+        hashes[integers] = _number_hashes(np.array(values[integers].tolist(), dtype=np.int64))
+    if others.any():
+        keys = np.array([_value_key(value) for value in values[others]], dtype=object)
+        hashes[others] = _tagged_hashes(keys)
+    return hashes
+
+
+def _value_kind(value) -> int:
+    """0 for a string, 1 for a float, 2 for an integer (or bool) within int64, 3 for anything else."""
+    if isinstance(value, str):
+        return 0
+    if isinstance(value, (float, np.floating)):
+        return 1
+    if isinstance(value, _INTEGER_TYPES):
+        return 2 if -2 ** 63 <= value < 2 ** 63 else 3
+    return 3
+
+
+def _tagged_hashes(keys: np.ndarray) -> np.ndarray:
+    # Tagged so a key never hashes like the string it is spelled as
+    return pd.util.hash_array(keys, categorize=True) ^ _KEY_TAG
+
+
+def _object_hashes(values: pd.Series, distinct_missing: bool) -> np.ndarray:
+    """
+    Hashes of an object column. Columns of one kind of value (strings,
+    numbers, booleans) are hashed vectorized; only columns lib.infer_dtype
+    reports as mixed are hashed value by value.
+    """
+    inferred = infer_dtype(values, skipna=True)
+    if inferred == 'string':
+        hashes, missing = _string_hashes(values)
+    else:
+        missing = values.isna().to_numpy()
+        present = values[~missing] if missing.any() else values
+        hashes = np.empty(len(values), dtype=np.uint64)
+        if inferred in _NUMBER_DTYPES:
+            try:
+                hashes[~missing] = _number_hashes(present.to_numpy().astype(_NUMBER_DTYPES[inferred]))
+            except OverflowError:  # Python ints beyond int64
+                hashes[~missing] = _mixed_hashes(present.to_numpy())
+        elif inferred != 'empty':
+            hashes[~missing] = _mixed_hashes(present.to_numpy())
+    if missing.any():
+        if distinct_missing:
+            # None, NA, NaT and each float type's NaN apart
+            kinds = np.array([type(value).__name__ for value in values.to_numpy()[missing]], dtype=object)
+            hashes[missing] = _tagged_hashes(kinds)
+        else:
+            hashes[missing] = _MISSING_HASH
+    return hashes
+
+
+def column_hashes(values: pd.Series, distinct_missing: bool = False) -> np.ndarray:
+    """
+    One 64-bit hash per value of a column, equal for exactly the values
+    duplicated() treats as equal, whatever the column's dtype: numbers hash
+    by value, objects by type and value. With distinct_missing, None, NaN,
+    NA and NaT in an object column hash apart (see _SERIES_MISSING_EQUAL).
+    """
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Each category is hashed once; missing values have code -1
+        codes = values.cat.codes.to_numpy()
+        categories = column_hashes(pd.Series(dtype.categories), distinct_missing)
+        hashes = categories[codes] if len(categories) else np.empty(len(codes), dtype=np.uint64)
+        hashes[codes < 0] = _MISSING_HASH
+        return hashes
+    if dtype == object:
+        return _object_hashes(values, distinct_missing)
+    if isinstance(dtype, pd.StringDtype):
+        hashes, missing = _string_hashes(values)
+        hashes[missing] = _MISSING_HASH
+        return hashes
+    numpy_dtype = getattr(dtype, 'numpy_dtype', dtype)  # Nullable and Arrow dtypes name theirs
+    if isinstance(numpy_dtype, np.dtype) and numpy_dtype.kind in 'biuf':
+        missing = values.isna().to_numpy()
+        numbers = values.to_numpy(dtype=numpy_dtype, na_value=numpy_dtype.type(0)) if missing.any() else values.to_numpy()
+        hashes = _number_hashes(numbers)
+        hashes[missing] = _MISSING_HASH
+        return hashes
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def _compute_row_hashes(df: pd.DataFrame, subset=None) -> np.ndarray:
+    frame = df if subset is None else df[list(subset)]
+    if len(frame.columns) == 0:
+        return np.zeros(len(frame), dtype=np.uint64)
+    distinct_missing = len(frame.columns) == 1 and not _SERIES_MISSING_EQUAL
+    return combine_hashes([column_hashes(frame.iloc[:, i], distinct_missing) for i in range(len(frame.columns))])
+
+
+def row_hashes(df: pd.DataFrame, subset=None) -> np.ndarray:
+    """
+    Returns one 64-bit hash per row (over all columns, or just 'subset'),
+    computed once per frame and then reused from the frame memo.
+
+    Two rows get the same hash exactly when they are equal, up to 64-bit
+    hash collisions (about one in 10^7 for a two-million-row frame).
+    """
+    return frame_memo.get_or_compute(df, _hash_key(subset), lambda: _compute_row_hashes(df, subset))
+
+
+def duplicate_mask(df: pd.DataFrame, subset=None) -> np.ndarray:
+    """Boolean array, True for every row that repeats an earlier row (keep='first')."""
+    if len(df.columns) == 0:
+        return np.zeros(len(df), dtype=bool)
+    return pd.Series(row_hashes(df, subset)).duplicated(keep='first').to_numpy()
+
+
+def count_duplicates(df: pd.DataFrame, subset=None) -> int:
+    """Same number as df.duplicated(subset).sum(), answered from the cached row hashes."""
+    return int(duplicate_mask(df, subset).sum())
+
+
+def drop_duplicates_hashed(df: pd.DataFrame, subset=None) -> pd.DataFrame:
+    """
+    Same rows as df.drop_duplicates(subset), answered from the cached row hashes.
+
+    The result's own row hashes are seeded in the memo, so analyzing the
+    de-duplicated frame afterwards does not hash it again.
+    """
+    mask = ~duplicate_mask(df, subset)
+    if mask.all():
+        return df
+    result = df[mask]
+    frame_memo.set(result, _hash_key(subset), row_hashes(df, subset)[mask])
+    return result
+
+
+class SeenRowHashes:
+    """
+    The row hashes seen so far in a stream of chunks, for de-duplicating a
+    file that is never in memory at once: 8 bytes per distinct row, whatever
+    the width of the rows.
+
+    Kept as sorted arrays of roughly doubling sizes, merged like the digits
+    of a binary counter, so adding n hashes costs O(n log n) in total and a
+    lookup is one binary search per array.
+    """
+    def __init__(self):
+        self._levels = []  # sorted, disjoint uint64 arrays, largest first
+
+    def __len__(self) -> int:
+        return sum(len(level) for level in self._levels)
+
+    def first_seen(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Boolean array, True for every hash seen neither in earlier calls nor
+        earlier in this array (keep='first' across the stream). Those hashes
+        are added to the set.
+        """
+        unique, first = np.unique(hashes, return_index=True)
+        new = np.ones(len(unique), dtype=bool)
+        for level in self._levels:
+            positions = np.minimum(np.searchsorted(level, unique), len(level) - 1)
+            new &= level[positions] != unique
+        mask = np.zeros(len(hashes), dtype=bool)
+        mask[first[new]] = True
+        self._add(unique[new])
+        return mask
+
+    def _add(self, values: np.ndarray):
+        if len(values) == 0:
+            return
+        while self._levels and len(self._levels[-1]) <= len(values):
+            values = np.sort(np.concatenate([self._levels.pop(), values]))
+        self._levels.append(values)
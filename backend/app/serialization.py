@@ -0,0 +1,111 @@
+# backend/app/serialization.py
+import json
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the standard library encoder
+    orjson = None
+
+# NumPy arrays and scalars are written natively; int/float dict keys
+# (value counts, histogram bins) become strings as with json.dumps.
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+# Media type of the Arrow IPC streaming format, offered for tabular results
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _default(value):
+    """Values orjson does not write natively."""
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return jsonable_encoder(value)
+
+
+def _encode_array(array: np.ndarray):
+    # NaN is written as null, as orjson does
+    if array.dtype.kind == 'f':
+        return np.where(np.isnan(array), None, array).tolist()
+    return array.tolist()
+
+
+def dumps(content) -> bytes:
+    """
+    Encodes content as JSON bytes in one pass. With orjson, NumPy values need
+    no conversion beforehand and NaN/Infinity are written as null. Without it
+    (or for content orjson rejects, e.g. NumPy dict keys) this is what
+    FastAPI's JSONResponse does: jsonable_encoder, then json.dumps.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+        except TypeError:
+            pass
+    return json.dumps(jsonable_encoder(content, custom_encoder={np.ndarray: _encode_array}),
+                      ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with dumps(). FastAPI runs jsonable_encoder over
+    whatever an endpoint returns before it reaches the response class, so
+    endpoints with large payloads return a FastJSONResponse themselves to
+    skip that pass.
+    """
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+# --- Arrow IPC ---
+def accepts_arrow(accept: str) -> bool:
+    """
+    True when an Accept header asks for ARROW_STREAM_MEDIA_TYPE (and not with
+    q=0). JSON stays the answer for every other header, including */*.
+    """
+    for media_range in (accept or "").split(","):
+        media_type, *params = media_range.split(";")
+        if media_type.strip().lower() != ARROW_STREAM_MEDIA_TYPE:
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def arrow_response(df: pd.DataFrame, metadata: dict = None) -> Response:
+    """
+    df as an Arrow IPC stream, without its index. 'metadata' (e.g. the total
+    row count of a table page) travels as JSON under the schema's "response"
+    metadata key, since the body has no room for fields besides the table.
+    """
+    import pyarrow as pa
+
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Object columns mixing types (e.g. numbers and text) go out as text
+        df = df.astype({column: "string" for column in df.columns[df.dtypes == object]})
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"response": dumps(metadata)})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), media_type=ARROW_STREAM_MEDIA_TYPE)
@@ -0,0 +1,214 @@
+# backend/app/sketches.py
+import math
+
+import numpy as np
+import pandas as pd
+
+# Two-sided confidence used for every reported error bound
+CONFIDENCE = 0.95
+_Z = 1.96  # Normal quantile for CONFIDENCE
+
+
+# --- Hashing ---
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spreads every input bit over the whole 64-bit word."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+def combine_hashes(hashes: list) -> np.ndarray:
+    """Row hashes from per-column hashes, so a frame is only hashed once per column."""
+    with np.errstate(over='ignore'):
+        combined = np.zeros(len(hashes[0]), dtype=np.uint64)
+        for column in hashes:
+            combined = _mix64(combined * np.uint64(0x100000001B3) ^ column)
+    return combined
+
+
+# --- Distinct counts ---
+class HyperLogLog:
+    """
+    Distinct-value counter in 2**precision bytes, fed with 64-bit hashes.
+    The relative standard error is 1.04 / sqrt(2**precision): 0.8% at the
+    default precision of 14 (16 KiB), whatever the number of values.
+    """
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray):
+        if len(hashes) == 0:
+            return
+        shift = np.uint64(64 - self.precision)
+        buckets = (hashes >> shift).astype(np.intp)
+        # The remaining bits, plus a guard bit so an all-zero tail still has a rank
+        rest = (hashes << np.uint64(self.precision)) | np.uint64(1 << (self.precision - 1))
+        _, exponent = np.frexp(rest.astype(np.float64))
+        # float64 rounding can push a value up to the next power of two; undo that
+        too_high = (rest >> np.minimum(exponent - 1, 63).astype(np.uint64)) == 0
+        bit_length = exponent - too_high
+        ranks = (65 - bit_length).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def merge(self, other: 'HyperLogLog'):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and empty > 0:
+            # Small-range correction (linear counting)
+            estimate = self.m * math.log(self.m / empty)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self) -> float:
+        """Half-width of the CONFIDENCE interval, relative to the count."""
+        return _Z * 1.04 / math.sqrt(self.m)
+
+
+# --- Frequencies ---
+class CountMinSketch:
+    """
+    Frequency table in depth x width counters, fed with 64-bit hashes.
+    The count-min bound holds for every estimate: at most (e / width) * total
+    above the true count, with probability 1 - e**-depth.
+    """
+    def __init__(self, width: int = 65536, depth: int = 5, seed: int = 0):
+        self.bits = max(int(width - 1).bit_length(), 1)
+        self.width = 1 << self.bits
+        self.depth = depth
+        rng = np.random.default_rng(seed)
+        # Odd multipliers for multiply-shift hashing, one per row
+        self._multipliers = rng.integers(1, 2 ** 63, size=depth, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.table = np.zeros((depth, self.width), dtype=np.int64)
+        self.total = 0
+
+    def _buckets(self, row: int, hashes: np.ndarray) -> np.ndarray:
+        with np.errstate(over='ignore'):
+            return ((hashes * self._multipliers[row]) >> np.uint64(64 - self.bits)).astype(np.intp)
+
+    def add_hashes(self, hashes: np.ndarray):
+        for row in range(self.depth):
+            self.table[row] += np.bincount(self._buckets(row, hashes), minlength=self.width)
+        self.total += len(hashes)
+
+    def merge(self, other: 'CountMinSketch'):
+        self.table += other.table
+        self.total += other.total
+
+    def estimate(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Count-mean-min estimates: each counter minus its expected share of
+        the other values, median over rows, capped at the plain count-min
+        upper bound. Much closer than the minimum for values rarer than 'error'.
+        """
+        counters = np.array([self.table[row, self._buckets(row, hashes)] for row in range(self.depth)])
+        noise = (self.total - counters) / (self.width - 1)
+        estimates = np.round(np.median(counters - noise, axis=0))
+        return np.clip(estimates, 0, counters.min(axis=0)).astype(np.int64)
+
+    @property
+    def error(self) -> float:
+        """Largest overcount, in occurrences, at probability 1 - e**-depth."""
+        return math.e / self.width * self.total
+
+    @property
+    def confidence(self) -> float:
+        return 1 - math.exp(-self.depth)
+
+
+# --- Duplicates ---
+def estimate_duplicates(row_hashes: np.ndarray, fraction: float) -> tuple:
+    """
+    Estimates how many rows repeat an earlier row, returning (estimate, error).
+
+    Keeps only the rows whose hash falls in the lowest 'fraction' of the hash
+    space. Equal rows share a hash, so every group of duplicates is either
+    kept whole or dropped whole: counting duplicates exactly inside that
+    subset and scaling up is unbiased, and a file without duplicates is
+    always reported as having none.
+    """
+    if fraction >= 1:
+        counts = np.unique(row_hashes, return_counts=True)[1]
+        return int(np.sum(counts - 1)), 0
+    cutoff = np.uint64(min(int(fraction * 2 ** 64), 2 ** 64 - 1))
+    counts = np.unique(row_hashes[row_hashes < cutoff], return_counts=True)[1]
+    extra = (counts - 1).astype(np.float64)
+    estimate = extra.sum() / fraction
+    # Each duplicate group is kept independently with probability 'fraction'
+    variance = (1 - fraction) / fraction ** 2 * np.sum(extra ** 2)
+    return int(round(estimate)), int(math.ceil(_Z * math.sqrt(variance)))
+
+
+# --- Sampling ---
+def sample_positions(n_rows: int, sample_size: int, seed: int = 0) -> np.ndarray:
+    """
+    Sorted positions of a uniform random sample of sample_size rows out of
+    n_rows, without replacement (the sample a reservoir sampler ends up with,
+    drawn directly because the frame is already in memory).
+    """
+    if n_rows <= sample_size:
+        return np.arange(n_rows)
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(n_rows, size=sample_size, replace=False))
+
+class RowReservoir:
+    """
+    Uniform sample of at most 'size' rows from a stream of DataFrame chunks
+    (reservoir sampling, Algorithm R, vectorized per chunk). Only rows that
+    enter the reservoir are kept, so memory stays proportional to the sample.
+    """
+    def __init__(self, size: int, seed: int = 0):
+        self.size = size
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._parts = []  # rows that entered the reservoir, one frame per chunk
+        self._slot_part = np.full(size, -1, dtype=np.int64)
+        self._slot_row = np.zeros(size, dtype=np.int64)
+
+    def add(self, chunk: pd.DataFrame):
+        positions = np.arange(self.seen, self.seen + len(chunk))
+        self.seen += len(chunk)
+        # Row number i fills slot i while the reservoir is not full, and
+        # afterwards replaces a random slot with probability size / (i + 1)
+        slots = np.where(positions < self.size, positions,
+                         self._rng.integers(0, positions + 1) if len(positions) else positions)
+        rows = np.flatnonzero(slots < self.size)
+        slots = slots[rows]
+        # When several rows of the chunk land on one slot, the last one stays
+        _, last = np.unique(slots[::-1], return_index=True)
+        keep = np.sort(len(slots) - 1 - last)
+        rows, slots = rows[keep], slots[keep]
+        if len(rows):
+            self._slot_part[slots] = len(self._parts)
+            self._slot_row[slots] = np.arange(len(rows))
+            self._parts.append(chunk.iloc[rows])
+
+    def sample(self) -> pd.DataFrame:
+        filled = min(self.seen, self.size)
+        if filled == 0:
+            return self._parts[0] if self._parts else pd.DataFrame()
+        offsets = np.cumsum([0] + [len(part) for part in self._parts])
+        positions = offsets[self._slot_part[:filled]] + self._slot_row[:filled]
+        return pd.concat(self._parts, ignore_index=True).take(np.sort(positions)).reset_index(drop=True)
+
+def quantile_rank_error(sample_size: int) -> float:
+    """
+    Dvoretzky-Kiefer-Wolfowitz bound: with CONFIDENCE, every quantile of a
+    uniform sample of this size is within this many ranks (as a fraction of
+    the rows) of the same quantile of the full column.
+    """
+    if sample_size <= 0:
+        return 1.0
+    return math.sqrt(math.log(2 / (1 - CONFIDENCE)) / (2 * sample_size))
+
+def correlation_error(sample_size: int) -> float:
+    """Half-width of the CONFIDENCE interval of a sample correlation near 0 (the widest case)."""
+    if sample_size <= 3:
+        return 1.0
+    return math.tanh(_Z / math.sqrt(sample_size - 3))
@@ -0,0 +1,182 @@
+# backend/app/table_query.py
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype, is_bool_dtype
+
+from app.config import TABLE_SORT_CACHE_SIZE
+from app.frame_memo import frame_memo
+
+FILTER_OPERATORS = ('eq', 'ne', 'lt', 'le', 'gt', 'ge', 'contains')
+
+_sort_lock = threading.Lock()  # Guards every frame's permutation OrderedDict
+
+
+# --- Parsing query parameters ---
+def parse_sort(sort: str) -> tuple:
+    """
+    Parses "col:asc,other:desc" into ((col, True), (other, False)).
+    The direction is optional and defaults to ascending.
+    """
+    if not sort:
+        return ()
+    keys = []
+    for part in sort.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        column, _, direction = part.rpartition(':')
+        if not column or direction.lower() not in ('asc', 'desc'):
+            column, direction = part, 'asc'
+        keys.append((column, direction.lower() == 'asc'))
+    return tuple(keys)
+
+def parse_filters(filters: list) -> tuple:
+    """Parses ["col:op:value", ...] into ((col, op, value), ...); op is one of FILTER_OPERATORS."""
+    parsed = []
+    for spec in filters or []:
+        parts = spec.split(':')
+        # The column name itself may contain ':', so look for the operator token
+        op_index = next((i for i in range(1, len(parts)) if parts[i] in FILTER_OPERATORS), None)
+        if op_index is None:
+            raise ValueError(
+                f"Invalid filter '{spec}'. Use column:operator:value with operator one of {', '.join(FILTER_OPERATORS)}."
+            )
+        parsed.append((':'.join(parts[:op_index]), parts[op_index], ':'.join(parts[op_index + 1:])))
+    return tuple(parsed)
+
+
+# --- Sorting ---
+def _sort_codes(values: pd.Series, ascending: bool) -> np.ndarray:
+    """Integer rank of every row for one sort key, missing values last in both directions."""
+    try:
+        codes, uniques = pd.factorize(values, sort=True)
+    except TypeError:
+        # Mixed types (e.g. numbers and text in one object column): order them as text
+        codes, uniques = pd.factorize(values.astype(str).where(values.notna()), sort=True)
+    codes = codes.astype(np.int64)
+    missing = codes < 0
+    if not ascending:
+        codes = (len(uniques) - 1) - codes
+    codes[missing] = len(uniques)
+    return codes
+
+def sort_permutation(df: pd.DataFrame, sort_keys: tuple) -> np.ndarray:
+    """
+    Row positions of df in the order given by sort_keys (a stable multi-column
+    sort). The permutations of the TABLE_SORT_CACHE_SIZE most recently used
+    sort keys are cached per frame, so paging through a sorted view never
+    re-sorts while clicking through every column does not keep one array
+    per column.
+    """
+    permutations = frame_memo.get_or_compute(df, 'sort_permutations', OrderedDict)
+    with _sort_lock:
+        permutation = permutations.get(sort_keys)
+        if permutation is not None:
+            permutations.move_to_end(sort_keys)
+            return permutation
+
+    codes = [_sort_codes(df[column], ascending) for column, ascending in sort_keys]
+    # lexsort treats its last key as the primary one
+    permutation = np.lexsort(codes[::-1])
+    # Halve the cached array's size whenever the row count allows it
+    if len(df) < 2 ** 31:
+        permutation = permutation.astype(np.int32)
+
+    with _sort_lock:
+        permutations[sort_keys] = permutation
+        permutations.move_to_end(sort_keys)
+        while len(permutations) > max(TABLE_SORT_CACHE_SIZE, 1):
+            permutations.popitem(last=False)
+    return permutation
+
+
+# --- Filtering ---
+def _coerce_value(values: pd.Series, value: str):
+    if is_bool_dtype(values.dtype):
+        return value.strip().lower() in ('true', '1', 'yes')
+    if is_numeric_dtype(values.dtype):
+        return float(value)
+    if is_datetime64_any_dtype(values.dtype):
+        return pd.Timestamp(value)
+    return value
+
+def _condition(values: pd.Series, op: str, value: str) -> np.ndarray:
+    if op == 'contains':
+        return values.astype(str).str.contains(value, case=False, regex=False).fillna(False).to_numpy(dtype=bool)
+    target = _coerce_value(values, value)
+    comparisons = {
+        'eq': values.__eq__, 'ne': values.__ne__,
+        'lt': values.__lt__, 'le': values.__le__,
+        'gt': values.__gt__, 'ge': values.__ge__,
+    }
+    return comparisons[op](target).fillna(False).to_numpy(dtype=bool)
+
+def filter_mask(df: pd.DataFrame, filters: tuple) -> np.ndarray:
+    """Boolean mask of rows matching every filter (AND)."""
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in filters:
+        if column not in df.columns:
+            raise ValueError(f"Column '{column}' not found in file.")
+        mask &= _condition(df[column], op, value)
+    return mask
+
+
+# --- Pages ---
+def view_positions(df: pd.DataFrame, sort_keys: tuple = (), filters: tuple = ()) -> np.ndarray:
+    """
+    Row positions of the sorted, filtered view. The most recent view of each
+    frame is kept, so requesting the next page is just a slice.
+    """
+    for column, _ in sort_keys:
+        if column not in df.columns:
+            raise ValueError(f"Column '{column}' not found in file.")
+
+    view_key = (sort_keys, filters)
+    last_view = frame_memo.get(df, 'last_view')
+    if last_view is not None and last_view[0] == view_key:
+        return last_view[1]
+
+    if sort_keys:
+        positions = sort_permutation(df, sort_keys)
+        if filters:
+            positions = positions[filter_mask(df, filters)[positions]]
+    else:
+        positions = np.flatnonzero(filter_mask(df, filters))
+    frame_memo.set(df, 'last_view', (view_key, positions))
+    return positions
+
+def table_page(df: pd.DataFrame, offset: int = 0, limit: int = 100, sort: str = None, filters: list = None) -> dict:
+    """
+    Returns one page of the table: rows [offset, offset + limit) of df after
+    applying the filters and the multi-column sort, as a DataFrame under
+    "rows", plus the total number of matching rows so the grid can page
+    through all of them.
+    """
+    sort_keys = parse_sort(sort)
+    parsed_filters = parse_filters(filters)
+    offset = max(int(offset), 0)
+    limit = max(int(limit), 0)
+
+    if not sort_keys and not parsed_filters:
+        total_rows = len(df)
+        page = df.iloc[offset:offset + limit]
+    else:
+        positions = view_positions(df, sort_keys, parsed_filters)
+        total_rows = len(positions)
+        page = df.iloc[positions[offset:offset + limit]]
+
+    return {
+        "rows": page,
+        "totalRows": total_rows,
+        "offset": offset,
+        "limit": limit,
+    }
+
+def query_table(df: pd.DataFrame, offset: int = 0, limit: int = 100, sort: str = None, filters: list = None) -> dict:
+    """table_page with the rows as records ("rowData"), for JSON responses."""
+    page = table_page(df, offset=offset, limit=limit, sort=sort, filters=filters)
+    rows = page.pop("rows")
+    return {"rowData": rows.replace({np.nan: None}).to_dict(orient='records'), **page}
@@ -0,0 +1,14 @@
+import pytest
+
+from app.dataset_cache import DatasetCache
+
+
+def test_failed_parse_releases_load_lock():
+    cache = DatasetCache(max_bytes=1024 ** 2)
+    with pytest.raises(Exception):
+        cache.get_or_load(b"\x00\x01 not a workbook", "broken.xlsx")
+    assert cache._load_locks == {}
+
+    entry = cache.get_or_load(b"x,y\n1,2\n", "ok.csv")
+    assert entry.df.shape == (1, 2)
+    assert cache._load_locks == {}
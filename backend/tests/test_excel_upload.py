@@ -0,0 +1,46 @@
+import io
+
+import pytest
+from openpyxl import Workbook
+
+from app.analysis_utils import _excel_rows_to_df, read_uploaded_file_to_df
+
+
+def test_header_is_first_substantially_filled_row():
+    rows = [
+        ("Quarterly report", None, None, None),
+        (None, None, None, None),
+        ("region", "units", None, "price"),
+        ("north", 3, "x", 1.5),
+        ("south", 4),  # Read-only sheets can report ragged rows
+    ]
+    df = _excel_rows_to_df(rows)
+
+    assert list(df.columns) == ["region", "units", "Unnamed_2", "price"]
+    assert df.shape == (2, 4)
+    assert df.iloc[1].tolist()[:2] == ["south", 4]
+    assert df.iloc[1].isna().tolist()[2:] == [True, True]
+
+
+def test_empty_sheet():
+    assert _excel_rows_to_df([]).empty
+
+
+def test_xlsx_sheet_selection():
+    workbook = Workbook()
+    workbook.active.append(["ignored", "sheet"])
+    data = workbook.create_sheet("data")
+    data.append(["Exported 2024-01-01"])
+    data.append(["id", "name"])
+    data.append([1, "a"])
+    data.append([2, "b"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+
+    for sheet in ("data", 1, "1"):
+        df = read_uploaded_file_to_df(buffer.getvalue(), "book.xlsx", sheet_name=sheet)
+        assert list(df.columns) == ["id", "name"]
+        assert df["name"].tolist() == ["a", "b"]
+
+    with pytest.raises(ValueError, match="not found"):
+        read_uploaded_file_to_df(buffer.getvalue(), "book.xlsx", sheet_name="missing")
@@ -0,0 +1,31 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app import forecasting
+from app.panels import get_panel
+
+
+def test_fallback_forecast_is_not_memoized(monkeypatch):
+    release = threading.Event()
+    real_naive = forecasting._seasonal_naive
+
+    def slow_arima(series, steps):
+        release.wait(5)
+        return real_naive(series, steps) + 1
+
+    monkeypatch.setitem(forecasting._MODEL_FUNCTIONS, 'arima', slow_arima)
+    monkeypatch.setattr(forecasting, 'FORECAST_TIME_BUDGET', 0.05)
+    dates = pd.date_range("2020-01-01", periods=900, freq="D")
+    df = pd.DataFrame({"when": dates, "value": np.arange(len(dates))})
+
+    first = get_panel(df, "timeseries", column="when", forecast_model="arima")
+    assert first["forecastModel"] == forecasting.FALLBACK_MODEL
+
+    (fit,) = forecasting._pending.values()
+    release.set()
+    fit.result(timeout=5)
+    second = get_panel(df, "timeseries", column="when", forecast_model="arima")
+    assert second["forecastModel"] == "arima"
+    assert get_panel(df, "timeseries", column="when", forecast_model="arima") is second
@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app import jobs
+
+CSV = b"city,price\nparis,10\nrome,25\nparis,10\n"
+PIPELINE = {
+    "nodes": [{"id": "load", "data": {"node_type": "load_csv"}},
+              {"id": "clean", "data": {"node_type": "clean_data"}}],
+    "edges": [{"source": "load", "target": "clean"}],
+}
+
+
+def _wait(broker, job_id: str) -> dict:
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        status = broker.status(job_id)
+        if status["status"] in jobs.FINISHED_STATES:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_workflow_job_runs_and_removes_its_input(monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs, 'JOBS_SPOOL_DIR', str(tmp_path))
+    broker = jobs.InProcessBroker(max_workers=1, max_queue=1, result_ttl=60)
+    job_id = jobs.new_job_id()
+    input_path = jobs.save_job_input(CSV, job_id, "data.csv")
+
+    submitted = broker.submit(job_id, "workflow", {"pipeline_json": json.dumps(PIPELINE)}, input_path, "data.csv")
+    assert submitted["status"] in (jobs.QUEUED, jobs.RUNNING)
+
+    status = _wait(broker, job_id)
+    assert status["status"] == jobs.SUCCEEDED
+    assert status["progress"]["nodesFinished"] == 2
+    result = broker.result(job_id)[1]
+    assert result["results"][result["result"]] == [{"city": "paris", "price": 10}, {"city": "rome", "price": 25}]
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_job_reports_its_error():
+    broker = jobs.InProcessBroker(max_workers=1, max_queue=1, result_ttl=60)
+    job_id = jobs.new_job_id()
+    broker.submit(job_id, "analyze", {"dataset_id": "missing"})
+
+    status = _wait(broker, job_id)
+    assert status["status"] == jobs.FAILED
+    assert "not found" in status["error"]
+    assert broker.result(job_id) == (status, None)
+    assert broker.status("unknown") is None
+
+
+def test_full_queue_and_cancelling_a_queued_job(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "analyze", lambda context: release.wait(30) and {"ok": True})
+    broker = jobs.InProcessBroker(max_workers=1, max_queue=1, result_ttl=60)
+    running, queued = jobs.new_job_id(), jobs.new_job_id()
+    broker.submit(running, "analyze", {})
+    broker.submit(queued, "analyze", {})
+    try:
+        with pytest.raises(HTTPException) as error:
+            broker.submit(jobs.new_job_id(), "analyze", {})
+        assert error.value.status_code == 503
+
+        assert broker.cancel(queued)["status"] == jobs.CANCELLED
+    finally:
+        release.set()
+    assert _wait(broker, running)["status"] == jobs.SUCCEEDED
+    assert broker.result(running)[1] == {"ok": True}
+    assert broker.status(queued)["status"] == jobs.CANCELLED
@@ -0,0 +1,15 @@
+import numpy as np
+
+from app.core.workflow.node_cache import NodeResultCache, result_nbytes
+
+
+def test_reports_count_toward_the_byte_budget():
+    report = {"columns": ["x", "y"], "data": np.zeros((100_000, 3))}
+    assert result_nbytes(report) >= report["data"].nbytes
+
+    cache = NodeResultCache(max_entries=8, max_bytes=1024 ** 2)
+    cache.put("report", report)
+    assert cache.get("report") == (False, None)
+
+    cache.put("small", {"rows": [{"x": 1}]})
+    assert cache.get("small")[0]
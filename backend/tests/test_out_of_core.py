@@ -0,0 +1,54 @@
+import io
+
+import pandas as pd
+import pytest
+
+from app import out_of_core
+
+
+@pytest.fixture
+def spill_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(out_of_core, 'OUT_OF_CORE_SPILL_DIR', str(tmp_path / "spill"))
+    monkeypatch.setattr(out_of_core, '_datasets', type(out_of_core._datasets)())
+    return tmp_path / "spill"
+
+
+def _upload(i):
+    return io.BytesIO(pd.DataFrame({"x": range(i, i + 1000)}).to_csv(index=False).encode())
+
+
+def test_dataset_id_cannot_leave_spill_dir(spill_dir, tmp_path):
+    spill_dir.mkdir()
+    pd.DataFrame({"x": [1]}).to_feather(tmp_path / "outside.arrow")
+    assert out_of_core.get_out_of_core_dataset("../outside") is None
+    assert out_of_core.get_out_of_core_dataset("A" * 64) is None
+
+
+def test_least_recently_used_spill_files_are_deleted(spill_dir, monkeypatch):
+    monkeypatch.setattr(out_of_core, 'OUT_OF_CORE_MAX_DATASETS', 2)
+    first, second = (out_of_core.load_out_of_core(_upload(i), "d.csv") for i in (0, 1))
+    assert out_of_core.get_out_of_core_dataset(first.dataset_id) is first  # Now the most recently used
+
+    third = out_of_core.load_out_of_core(_upload(2), "d.csv")
+    assert sorted(path.stem for path in spill_dir.glob("*.arrow")) == sorted([first.dataset_id, third.dataset_id])
+    assert out_of_core.get_out_of_core_dataset(second.dataset_id) is None
+    assert third.profile.n_rows == 1000
+
+
+def test_duplicate_count_matches_duplicated_across_chunk_dtypes(spill_dir, monkeypatch):
+    monkeypatch.setattr(out_of_core, 'OUT_OF_CORE_BATCH_ROWS', 4)
+    csv = b"a,b\n1,5\n2,\n3,7\n4,8\n1,5\n3,7\n9,9\n10,10\n"
+    dataset = out_of_core.load_out_of_core(io.BytesIO(csv), "d.csv")
+    assert dataset.profile.duplicate_count == pd.read_csv(io.BytesIO(csv)).duplicated().sum() == 2
+
+
+def test_csv_column_changing_type_after_first_block(spill_dir, monkeypatch):
+    monkeypatch.setattr(out_of_core, 'CSV_BLOCK_SIZE', 1024)
+    lines = [f"{i},{i},{i}" for i in range(2000)] + ["x,2.5,7"]
+    csv = ("a,b,c\n" + "\n".join(lines) + "\n").encode()
+    expected = pd.read_csv(io.BytesIO(csv))
+
+    chunks = pd.concat(out_of_core.iter_upload_chunks(io.BytesIO(csv), "d.csv"))
+    assert chunks.dtypes.to_dict() == {"a": expected.dtypes["a"], "b": "float64", "c": "int64"}
+    assert chunks["a"].tolist() == expected["a"].tolist()
+    assert out_of_core.load_out_of_core(io.BytesIO(csv), "d.csv").profile.n_rows == 2001
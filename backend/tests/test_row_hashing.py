@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from app.row_hashing import SeenRowHashes, count_duplicates, drop_duplicates_hashed, row_hashes
+
+
+def _mixed_column():
+    # 1 and '1' differ, 2.0 and 2 are equal; missing values depend on the pandas version
+    return pd.DataFrame({"a": pd.Series([1, '1', None, np.nan, 2.0, 2, True, 'True'], dtype=object)})
+
+
+def test_mixed_object_column_matches_duplicated():
+    df = _mixed_column()
+    assert count_duplicates(df) == df.duplicated().sum()
+    pd.testing.assert_frame_equal(drop_duplicates_hashed(df), df.drop_duplicates())
+
+
+def test_mixed_object_columns_with_others_match_duplicated():
+    df = _mixed_column().assign(b=[1, 1, 1, 1, 1, 1, 1, 2], c=pd.Series(['x', 'x', pd.NA, None, 0.0, -0.0, 1, 1], dtype=object))
+    assert count_duplicates(df) == df.duplicated().sum()
+    pd.testing.assert_frame_equal(drop_duplicates_hashed(df), df.drop_duplicates())
+
+
+def test_seen_row_hashes_keeps_string_and_number_apart():
+    seen = SeenRowHashes()
+    first = pd.DataFrame({"a": pd.Series([1, 'x'], dtype=object), "b": [0, 0]})
+    second = pd.DataFrame({"a": pd.Series(['1', 1.0], dtype=object), "b": [0, 0]})
+    assert seen.first_seen(row_hashes(first)).tolist() == [True, True]
+    assert seen.first_seen(row_hashes(second)).tolist() == [True, False]
+
+
+def test_homogeneous_columns_match_duplicated():
+    # Hashed vectorized: strings (object and str dtypes, with repeats and missing values) and object booleans
+    rng = np.random.default_rng(0)
+    words = rng.choice(["x", "y", "z", None], 50_000)
+    df = pd.DataFrame({
+        "a": pd.Series(words, dtype=object),
+        "b": pd.Series(words, dtype="str"),
+        "c": pd.Series(rng.choice([True, False, None], 50_000), dtype=object),
+    })
+    for columns in (["a"], ["b"], ["c"], ["a", "c"]):
+        assert count_duplicates(df, columns) == df.duplicated(columns).sum()
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import table_query
+from app.frame_memo import frame_memo
+
+
+def test_only_recent_sort_permutations_are_kept(monkeypatch):
+    monkeypatch.setattr(table_query, 'TABLE_SORT_CACHE_SIZE', 2)
+    df = pd.DataFrame({"a": [3, 1, 2], "b": [1, 3, 2], "c": [2, 1, 3]})
+
+    by_a = table_query.sort_permutation(df, (("a", True),))
+    table_query.sort_permutation(df, (("b", False),))
+    assert table_query.sort_permutation(df, (("a", True),)) is by_a  # Served from the cache, now most recent
+    table_query.sort_permutation(df, (("c", True),))
+
+    assert list(frame_memo.get(df, 'sort_permutations')) == [(("a", True),), (("c", True),)]
+    np.testing.assert_array_equal(by_a, [1, 2, 0])
+
+
+def test_parse_sort():
+    assert table_query.parse_sort(None) == ()
+    assert table_query.parse_sort("a, b:DESC,,c:asc") == (("a", True), ("b", False), ("c", True))
+    # A trailing token that is not a direction belongs to the column name
+    assert table_query.parse_sort("time:12") == (("time:12", True),)
+
+
+def test_parse_filters():
+    assert table_query.parse_filters(None) == ()
+    assert table_query.parse_filters(["price:ge:10", "note:contains:a:b", "t:0:eq:x"]) == (
+        ("price", "ge", "10"), ("note", "contains", "a:b"), ("t:0", "eq", "x"),
+    )
+    with pytest.raises(ValueError, match="Invalid filter"):
+        table_query.parse_filters(["price>10"])
+
+
+def test_sorted_filtered_page():
+    df = pd.DataFrame({"name": ["b", "a", "c", "d"], "price": [5, 20, 15, 30]})
+    page = table_query.table_page(df, offset=1, limit=2, sort="price:desc", filters=["price:gt:10"])
+    assert page["totalRows"] == 3
+    assert page["rows"]["name"].tolist() == ["a", "c"]
+
+    with pytest.raises(ValueError, match="not found"):
+        table_query.table_page(df, filters=["missing:eq:1"])
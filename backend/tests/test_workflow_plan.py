@@ -0,0 +1,57 @@
+import io
+
+import pandas as pd
+import pytest
+
+from app.core.workflow.node_cache import node_result_cache
+from app.core.workflow.plan import LazyFrame, ScanSource
+from app.core.workflow.workflow import WorkflowExecutor
+
+CSV = b"city,price,qty\nparis,10,1\nrome,25,2\nparis,30,3\nlima,5,4\nrome,40,5\n"
+
+
+def test_optimize_pushes_filters_to_the_scan():
+    plan = (LazyFrame(ScanSource(file_name="data.csv"))
+            .filter((("qty", "gt", "1"),))
+            .select(["city", "price"])
+            .filter((("price", "ge", "20"),))
+            .select(["city"])
+            .distinct())
+    scan_columns, filters, steps = plan.optimize()
+
+    assert scan_columns == ["city", "price", "qty"]
+    assert filters == (("qty", "gt", "1"), ("price", "ge", "20"))
+    assert steps == [("select", ["city"]), ("distinct",)]
+
+
+def test_optimize_reads_every_column_before_distinct():
+    plan = LazyFrame(ScanSource(file_name="data.csv")).distinct().select(["city"])
+    assert plan.optimize()[0] is None
+
+
+def test_optimize_rejects_columns_dropped_by_a_selection():
+    plan = LazyFrame(ScanSource(file_name="data.csv")).select(["city"]).filter((("price", "gt", "1"),))
+    with pytest.raises(ValueError, match="'price' not found"):
+        plan.optimize()
+
+
+def _run(mode: dict, columns: list = ("city", "price")):
+    node_result_cache._entries.clear()
+    nodes = [{"id": "load", "data": {"node_type": "load_csv"}},
+             {"id": "filter", "data": {"node_type": "filter_rows", "filters": ["price:ge:20"]}},
+             {"id": "select", "data": {"node_type": "select_columns", "columns": list(columns)}}]
+    edges = [{"source": "load", "target": "filter"}, {"source": "filter", "target": "select"}]
+    executor = WorkflowExecutor(nodes, edges, file_contents=io.BytesIO(CSV), file_name="data.csv", **mode)
+    executor.run()
+    return pd.DataFrame(executor.sink_results["select"])
+
+
+@pytest.mark.parametrize("mode", [{}, {"compiled": True}, {"streaming": True}])
+def test_filter_and_select_nodes(mode):
+    result = _run(mode)
+    assert result.to_dict("records") == [
+        {"city": "rome", "price": 25}, {"city": "paris", "price": 30}, {"city": "rome", "price": 40},
+    ]
+
+    with pytest.raises(ValueError, match="'zip' not found"):
+        _run(mode, columns=["city", "zip"])
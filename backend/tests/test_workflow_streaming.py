@@ -0,0 +1,28 @@
+import io
+
+import pandas as pd
+
+from app import out_of_core
+from app.core.workflow.node_cache import node_result_cache
+from app.core.workflow.workflow import WorkflowExecutor
+
+# Column b is float64 in the chunk with its missing value and int64 in the next one
+CSV = b"a,b\n1,5\n2,\n3,7\n4,8\n1,5\n3,7\n9,9\n10,10\n"
+
+
+def _clean(streaming: bool):
+    node_result_cache._entries.clear()
+    nodes = [{"id": "load", "data": {"node_type": "load_csv"}},
+             {"id": "clean", "data": {"node_type": "clean_data"}}]
+    edges = [{"source": "load", "target": "clean"}]
+    executor = WorkflowExecutor(nodes, edges, file_contents=io.BytesIO(CSV), file_name="data.csv",
+                                streaming=streaming)
+    executor.run()
+    return pd.DataFrame(executor.sink_results["clean"])
+
+
+def test_streaming_dedup_matches_eager_across_chunk_dtypes(monkeypatch):
+    monkeypatch.setattr(out_of_core, 'OUT_OF_CORE_BATCH_ROWS', 4)
+    eager, streamed = _clean(streaming=False), _clean(streaming=True)
+    assert len(eager) == 6
+    pd.testing.assert_frame_equal(streamed, eager, check_dtype=False)